@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Batch Comparison
+Compares many file pairs listed in a manifest (CSV or JSON Lines) in one
+long-lived process with a pool of workers
+Completed pairs can be journaled so an interrupted run resumes where it stopped
+Reading runs ahead in I/O threads while scoring runs in worker processes
+"""
+
+import csv
+import json
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+
+from diff_engine import (DEFAULT_KERNEL, MAX_PAIR_COST, collect_line_differences, compare_lines,
+                         file_state_matches, read_file_pair)
+from fingerprints import overlap_scores
+
+# Pairs being read or scored per worker; bounds memory for manifests of any
+# size while leaving enough read-ahead to keep every worker busy
+PAIRS_IN_FLIGHT_PER_WORKER = 4
+
+# Minimum number of I/O threads reading and extracting upcoming pairs
+MIN_IO_THREADS = 4
+
+# Journal records written between two fsync calls
+JOURNAL_SYNC_INTERVAL = 100
+
+
+def read_manifest(manifest_path):
+    """
+    Read the file pairs listed in a manifest
+
+    CSV manifests have two columns (an optional "file1,file2" header is
+    skipped); JSON Lines manifests have one {"file1": ..., "file2": ...}
+    object per line. Relative paths are resolved against the manifest's
+    directory.
+
+    Args:
+        manifest_path (str): Path to a .csv or .jsonl manifest
+
+    Yields:
+        tuple: (file1, file2) as strings
+    """
+    manifest_path = Path(manifest_path)
+    base_dir = manifest_path.parent
+
+    def resolve(path):
+        return str(base_dir / path.strip())
+
+    with open(manifest_path, 'r', encoding='utf-8', newline='') as f:
+        if manifest_path.suffix.lower() in ('.jsonl', '.json', '.ndjson'):
+            for line_num, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entry = json.loads(line)
+                    yield resolve(entry['file1']), resolve(entry['file2'])
+                except (ValueError, KeyError, TypeError) as e:
+                    raise Exception(f"Invalid manifest entry on line {line_num}: {e}")
+        else:
+            for row_num, row in enumerate(csv.reader(f), 1):
+                if not row or not ''.join(row).strip():
+                    continue
+                if row_num == 1 and [cell.strip().lower() for cell in row[:2]] == ['file1', 'file2']:
+                    continue
+                if len(row) < 2:
+                    raise Exception(f"Invalid manifest entry on line {row_num}: expected two paths")
+                yield resolve(row[0]), resolve(row[1])
+
+
+class ResultJournal:
+    """
+    Append-only JSON Lines journal of completed pair comparisons
+
+    Every record is flushed as soon as it is written and the file is synced
+    to disk regularly, so a killed run loses at most the pairs that were
+    still in flight. When resuming, a journaled pair is only reused if both
+    input files still match the size/mtime/digest recorded with it and it
+    was scored with the same options (kernel, cost cap, segmentation).
+    Line differences are journaled when the run collects them (for a result
+    store), so resumed pairs keep their differing lines.
+    """
+
+    def __init__(self, path, resume=False):
+        self.path = Path(path)
+        self.completed = {}
+        self._unsynced = 0
+
+        if resume and self.path.exists():
+            self._load()
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+
+    @staticmethod
+    def _key(file1, file2):
+        return os.path.abspath(file1), os.path.abspath(file2)
+
+    def _load(self):
+        with open(self.path, 'rb+') as f:
+            complete = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                complete += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get('error') is None and 'inputs' in record:
+                    self.completed[self._key(record['file1'], record['file2'])] = record
+            # A run killed mid-write leaves a truncated last line; cut it off
+            # so the records appended by this run start on a line of their own
+            f.truncate(complete)
+
+    def lookup(self, file1, file2, options=None, with_differences=False):
+        """
+        Return the journaled record of a pair if its inputs are unchanged
+
+        Args:
+            file1 (str): First file of the pair
+            file2 (str): Second file of the pair
+            options (dict): Scoring options of the current run (see
+                scoring_options); records scored differently are not reused
+            with_differences (bool): Only reuse records that differ nowhere
+                or were journaled with their line differences
+        """
+        record = self.completed.get(self._key(file1, file2))
+        if record is None or record.get('options') != options:
+            return None
+        if with_differences and record['differences'] and 'line_differences' not in record:
+            return None
+        state1, state2 = record['inputs']
+        if file_state_matches(file1, state1) and file_state_matches(file2, state2):
+            dropped = ('options',) if with_differences else ('options', 'line_differences')
+            record = {key: value for key, value in record.items() if key not in dropped}
+            return dict(record, resumed=True)
+        return None
+
+    def append(self, record, options=None):
+        """Durably record a completed comparison and the options it was scored with"""
+        record = dict(record, options=options)
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= JOURNAL_SYNC_INTERVAL:
+            os.fsync(self._file.fileno())
+            self._unsynced = 0
+
+    def close(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def scoring_options(kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """Options that change a pair's score, as recorded in the journal"""
+    return {'kernel': kernel, 'max_cost': max_cost, 'segment': segment}
+
+
+def score_lines(lines1, lines2, collect_differences=False, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST,
+                segment=False):
+    """
+    Score an extracted pair in a worker process
+
+    Returns:
+        tuple: (similarity, differences, overlap) where differences is the
+            count, or the list from collect_line_differences, and overlap
+            is the dict from overlap_scores
+    """
+    if collect_differences:
+        similarity, differences = collect_line_differences(lines1, lines2, kernel, max_cost, segment)
+    else:
+        similarity, differences = compare_lines(lines1, lines2, kernel, max_cost, segment)
+    return similarity, differences, overlap_scores(lines1, lines2)
+
+
+def score_file_pair(file1, file2, check_identical=False, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST,
+                    segment=False):
+    """
+    Read and score one pair in a worker process
+
+    The single-pair counterpart of compare_pairs, for callers that submit
+    their own pairs to a pool (rename detection, the SimHash fallback).
+
+    Returns:
+        dict: compare_file_pair record including the shingle overlap scores
+    """
+    record, lines1, lines2 = read_file_pair(file1, file2, check_identical)
+    if lines1 is not None:
+        similarity, differences, overlap = score_lines(lines1, lines2, False, kernel, max_cost, segment)
+        record.update(overlap, similarity=similarity, differences=differences,
+                      lines1=len(lines1), lines2=len(lines2))
+    return record
+
+
+def compare_pairs(pairs, workers=None, journal=None, use_cache=False, io_threads=None,
+                  collect_differences=False, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Compare keyed file pairs, yielding records as they finish
+
+    Work is split into a two-stage pipeline: I/O threads hash and extract
+    upcoming pairs (file reads and docx decompression mostly wait on the
+    disk or network), while a process pool scores the pairs that are
+    already in memory. At most PAIRS_IN_FLIGHT_PER_WORKER pairs per worker
+    are in either stage, so reading stays a bounded distance ahead.
+
+    Args:
+        pairs: Iterable of (key, file1, file2) tuples
+        workers (int): Number of scoring processes (default: CPU count)
+        journal (ResultJournal): Optional journal; pairs it already holds
+            are yielded from it without being compared again (with their
+            line differences when collect_differences is set)
+        use_cache (bool): Reuse extractions of files that appear in several pairs
+        io_threads (int): Number of reader threads (default: max(workers, 4))
+        collect_differences (bool): Add a 'line_differences' key with the
+            (line_num, line1, line2, similarity, approximate) tuples of
+            every scored pair
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+
+    Yields:
+        tuple: (key, record) where record is a compare_file_pair record
+            including the shingle overlap scores
+    """
+    workers = workers or os.cpu_count() or 1
+    io_threads = io_threads or max(workers, MIN_IO_THREADS)
+    max_in_flight = workers * PAIRS_IN_FLIGHT_PER_WORKER
+    record_inputs = journal is not None
+    options = scoring_options(kernel, max_cost, segment)
+
+    reading = {}
+    scoring = {}
+    pairs = iter(pairs)
+    exhausted = False
+
+    with ThreadPoolExecutor(max_workers=io_threads) as io_executor, \
+            ProcessPoolExecutor(max_workers=workers) as cpu_executor:
+        while True:
+            # Keep the pipeline full
+            while not exhausted and len(reading) + len(scoring) < max_in_flight:
+                try:
+                    key, file1, file2 = next(pairs)
+                except StopIteration:
+                    exhausted = True
+                    break
+
+                record = journal.lookup(file1, file2, options, collect_differences) if journal is not None else None
+                if record is not None:
+                    yield key, record
+                    continue
+
+                future = io_executor.submit(read_file_pair, file1, file2, True, use_cache, record_inputs)
+                reading[future] = key
+
+            if not reading and not scoring:
+                break
+
+            done, _ = wait(list(reading) + list(scoring), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in reading:
+                    key = reading.pop(future)
+                    record, lines1, lines2 = future.result()
+                    if lines1 is not None:
+                        future = cpu_executor.submit(score_lines, lines1, lines2, collect_differences, kernel,
+                                                     max_cost, segment)
+                        scoring[future] = (key, record, lines1, lines2)
+                        continue
+                else:
+                    key, record, lines1, lines2 = scoring.pop(future)
+                    similarity, differences, overlap = future.result()
+                    if collect_differences:
+                        record['line_differences'] = differences
+                        differences = len(differences)
+                    record.update(overlap, similarity=similarity, differences=differences,
+                                  lines1=len(lines1), lines2=len(lines2))
+
+                if journal is not None:
+                    journal.append(record, options)
+                yield key, record
+
+
+def compare_batch(pairs, workers=None, journal=None, io_threads=None, collect_differences=False,
+                  kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Compare file pairs with the read/score pipeline, yielding records as they finish
+
+    Extractions are cached in the reading process, so files that appear in
+    several pairs are usually extracted once.
+
+    Args:
+        pairs: Iterable of (file1, file2) tuples, e.g. from read_manifest
+        workers (int): Number of scoring processes (default: CPU count)
+        journal (ResultJournal): Optional journal for checkpoint and resume
+        io_threads (int): Number of reader threads
+        collect_differences (bool): Add the per-line differences to each record
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+
+    Yields:
+        dict: compare_file_pair record with an added 'index' key (0-based
+            position of the pair in the manifest)
+    """
+    keyed_pairs = ((index, file1, file2) for index, (file1, file2) in enumerate(pairs))
+    for index, record in compare_pairs(keyed_pairs, workers=workers, journal=journal,
+                                       use_cache=True, io_threads=io_threads,
+                                       collect_differences=collect_differences, kernel=kernel,
+                                       max_cost=max_cost, segment=segment):
+        record['index'] = index
+        yield record
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Line Similarity Metric Benchmark for DiffMatcher
+Times every registered line similarity metric on the same line pairs,
+either from two files or from generated short-line and paragraph workloads
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# Add current directory to path for imports
+sys.path.append(str(Path(__file__).parent))
+
+from diff_engine import LINE_KERNELS, extract_text_from_file, score_line_pairs
+
+# Line pairs per generated workload
+DEFAULT_PAIRS = 2000
+
+# Timed runs per metric; the fastest one is reported
+DEFAULT_REPEAT = 3
+
+WORDS = ("the", "contract", "party", "shall", "deliver", "invoice", "within", "days", "of",
+         "receipt", "payment", "terms", "apply", "to", "all", "orders", "placed", "under", "this")
+
+
+def _edit(line, rng, edits):
+    """Replace a few random words of a line"""
+    words = line.split(' ')
+    for _ in range(edits):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return ' '.join(words)
+
+
+def generate_workloads(pairs=DEFAULT_PAIRS, seed=0):
+    """
+    Generate line pairs typical of log files and of long docx paragraphs
+
+    Returns:
+        dict: Workload name -> (lines1, lines2)
+    """
+    rng = random.Random(seed)
+    logs1 = [f"2024-05-{i % 28 + 1:02d} 12:{i % 60:02d}:07 INFO worker-{i % 8} handled request {i} "
+             f"in {rng.randrange(1, 900)} ms" for i in range(pairs)]
+    logs2 = [line.replace("INFO", "WARN") if i % 3 == 0 else _edit(line, rng, 1) for i, line in enumerate(logs1)]
+
+    paragraph_pairs = max(1, pairs // 20)
+    paragraphs1 = [' '.join(rng.choice(WORDS) for _ in range(150)) for _ in range(paragraph_pairs)]
+    paragraphs2 = [_edit(paragraph, rng, 5) for paragraph in paragraphs1]
+
+    return {
+        'short lines': (logs1, logs2),
+        'paragraphs': (paragraphs1, paragraphs2),
+    }
+
+
+def file_workload(file1, file2):
+    """Read two files as one workload of aligned, stripped line pairs"""
+    lines1 = extract_text_from_file(file1)
+    lines2 = extract_text_from_file(file2)
+    count = max(len(lines1), len(lines2))
+    return ([lines1[i].strip() if i < len(lines1) else '' for i in range(count)],
+            [lines2[i].strip() if i < len(lines2) else '' for i in range(count)])
+
+
+def benchmark_kernel(lines1, lines2, kernel, repeat=DEFAULT_REPEAT):
+    """
+    Time one metric on a workload
+
+    Returns:
+        tuple: (best time in seconds, average similarity percentage,
+            batched) where batched tells whether score_line_pairs used
+            the metric's batch implementation
+    """
+    best = None
+    similarities = []
+    stats = {}
+    for _ in range(repeat):
+        started = time.perf_counter()
+        similarities, _ = score_line_pairs(lines1, lines2, kernel, max_cost=None, stats=stats)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    average = sum(similarities) / len(similarities) * 100 if similarities else 0.0
+    return best, average, stats.get('batched', False)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Compare the speed of the line similarity metrics',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmark_metrics.py
+  python benchmark_metrics.py --pairs 20000 --kernels sequence lcs
+  python benchmark_metrics.py server1.log server2.log
+        """
+    )
+    parser.add_argument('file1', nargs='?', help='First file of a pair to benchmark on')
+    parser.add_argument('file2', nargs='?', help='Second file of a pair to benchmark on')
+    parser.add_argument('--kernels', nargs='+', choices=sorted(LINE_KERNELS), default=sorted(LINE_KERNELS),
+                        help='Metrics to benchmark (default: all)')
+    parser.add_argument('--pairs', type=int, default=DEFAULT_PAIRS,
+                        help=f'Line pairs per generated workload (default: {DEFAULT_PAIRS})')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f'Timed runs per metric, fastest reported (default: {DEFAULT_REPEAT})')
+    args = parser.parse_args()
+
+    if bool(args.file1) != bool(args.file2):
+        parser.error('give two files, or none to use generated workloads')
+    if args.pairs < 1 or args.repeat < 1:
+        parser.error('--pairs and --repeat must be at least 1')
+
+    if args.file1:
+        workloads = {f"{Path(args.file1).name} vs {Path(args.file2).name}": file_workload(args.file1, args.file2)}
+    else:
+        workloads = generate_workloads(args.pairs)
+
+    print("⏱️  DiffMatcher Metric Benchmark")
+    print("=" * 60)
+    for name, (lines1, lines2) in workloads.items():
+        average_length = sum(len(line) for line in lines1 + lines2) / max(1, 2 * len(lines1))
+        print(f"\n📄 {name}: {len(lines1)} line pairs, {average_length:.0f} characters per line")
+        print(f"   {'Metric':<14}{'Time (s)':>10}{'Pairs/s':>12}{'Similarity':>12}")
+        for kernel in args.kernels:
+            elapsed, average, batched = benchmark_kernel(lines1, lines2, kernel, args.repeat)
+            rate = len(lines1) / elapsed if elapsed else float('inf')
+            label = kernel + (' (batch)' if batched else '')
+            print(f"   {label:<14}{elapsed:>10.4f}{rate:>12.0f}{average:>11.2f}%")
+
+
+if __name__ == "__main__":
+    main()
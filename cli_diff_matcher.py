@@ -6,9 +6,26 @@ Supports text files and Microsoft Word documents (.docx)
 """
 
 import argparse
+import json
 import sys
 from pathlib import Path
-from difflib import SequenceMatcher
+
+from batch_compare import ResultJournal, compare_batch, read_manifest
+from comparison_result import ComparisonResult
+from corpus_similarity import DEFAULT_TOP_N, corpus_top_matches, shortlist_pairs
+from dedupe import DEDUPE_THRESHOLD, find_duplicate_clusters
+from diff_engine import (DEFAULT_KERNEL, LINE_KERNELS, MAX_PAIR_COST, extract_text_from_file,
+                         iter_line_similarities)
+from directory_compare import (collect_files, compare_directories, detect_renames, pair_directories,
+                               summarize_directory_results)
+from html_report import get_assessment, write_html_report
+from fingerprints import SHINGLE_TYPES, overlap_scores
+from line_index import LineIndex
+from result_store import ResultStore
+from segmentation import SEGMENT_MIN_LENGTH
+from simhash import approximate_compare
+from similarity_estimate import DEFAULT_CONFIDENCE, DEFAULT_PRECISION, estimate_similarity
+from similarity_matrix import compute_similarity_matrix, write_matrix
 
 # Import for Word document support
 try:
@@ -18,58 +35,35 @@ except ImportError:
     DOCX_AVAILABLE = False
 
 
-def extract_text_from_file(file_path):
+# Largest matrix printed to the terminal, and number of closest pairs listed
+MATRIX_PRINT_LIMIT = 10
+MATRIX_TOP_PAIRS = 10
+
+# Changed sentences printed per long line in verbose --segment output
+SEGMENT_PRINT_LIMIT = 5
+
+
+def print_segment_differences(line1, line2, differences):
     """
-    Extract text content from different file types
-    
+    Print the changed sentences of a long line instead of the whole line
+
     Args:
-        file_path (str): Path to the file
-        
-    Returns:
-        list: List of lines from the file
+        line1 (str): Line of the first file
+        line2 (str): Line of the second file
+        differences (list): (sentence1, sentence2, similarity) tuples from
+            the scoring pass (see diff_engine.line_similarity)
     """
-    file_path = Path(file_path)
-    
-    try:
-        if file_path.suffix.lower() == '.docx':
-            if not DOCX_AVAILABLE:
-                raise Exception("python-docx library is not installed. Cannot read .docx files.\nInstall with: pip install python-docx")
-            
-            # Extract text from Word document
-            doc = Document(file_path)
-            lines = []
-            
-            # Extract text from paragraphs
-            for paragraph in doc.paragraphs:
-                lines.append(paragraph.text + '\n')
-            
-            # If no paragraphs found, try tables
-            if not lines:
-                for table in doc.tables:
-                    for row in table.rows:
-                        for cell in row.cells:
-                            if cell.text.strip():
-                                lines.append(cell.text + '\n')
-            
-            return lines
-        
-        else:
-            # Handle text files (including .txt, .py, etc.)
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.readlines()
-                
-    except UnicodeDecodeError:
-        # Try with different encoding
-        try:
-            with open(file_path, 'r', encoding='latin-1') as f:
-                return f.readlines()
-        except:
-            raise Exception(f"Could not decode file: {file_path}")
-    except Exception as e:
-        raise Exception(f"Error reading file {file_path}: {str(e)}")
+    print(f"   {len(line1)} vs {len(line2)} characters, {len(differences)} sentence(s) changed:")
+    for sentence1, sentence2, similarity in differences[:SEGMENT_PRINT_LIMIT]:
+        print(f"   - {sentence1 if sentence1 is not None else '(missing)'}")
+        print(f"   + {sentence2 if sentence2 is not None else '(missing)'}")
+        print(f"     ({round(similarity * 100, 2)}%)")
+    if len(differences) > SEGMENT_PRINT_LIMIT:
+        print(f"   ... and {len(differences) - SEGMENT_PRINT_LIMIT} more")
 
 
-def compare_files_line_by_line(file1, file2, verbose=True):
+def compare_files_line_by_line(file1, file2, verbose=True, html_report=None, kernel=DEFAULT_KERNEL,
+                               max_cost=MAX_PAIR_COST, segment=False):
     """
     Compare two files line by line and return similarity percentage
     Supports text files and Word documents (.docx)
@@ -78,6 +72,10 @@ def compare_files_line_by_line(file1, file2, verbose=True):
         file1 (str): Path to first file
         file2 (str): Path to second file
         verbose (bool): Whether to print detailed differences
+        html_report (str): Optional path of an HTML report to write
+        kernel (str): Name of the line similarity kernel (see LINE_KERNELS)
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
     
     Returns:
         float: Average similarity percentage
@@ -95,6 +93,9 @@ def compare_files_line_by_line(file1, file2, verbose=True):
     total_similarity = 0
     lines_compared = 0
     differences_count = 0
+    approximate_count = 0
+    # Compact columns for the HTML report; difference dicts are built per row as it is written
+    result = ComparisonResult(lines1, lines2) if html_report else None
 
     max_lines = max(len(lines1), len(lines2))
 
@@ -107,20 +108,28 @@ def compare_files_line_by_line(file1, file2, verbose=True):
     print(f"   File 2: {Path(file2).name} ({file2_type}, {len(lines2)} lines)")
     print(f"   Total lines to compare: {max_lines}")
 
-    for i in range(max_lines):
-        line1 = lines1[i].strip() if i < len(lines1) else ''
-        line2 = lines2[i].strip() if i < len(lines2) else ''
-        similarity = SequenceMatcher(None, line1, line2).ratio()
+    # Changed sentences of long lines, kept by the scoring pass for printing
+    sentence_differences = {} if verbose and segment else None
+    
+    for i, line1, line2, similarity, approximate in iter_line_similarities(lines1, lines2, kernel, max_cost, segment,
+                                                                           sentence_differences):
         total_similarity += similarity
         lines_compared += 1
+        approximate_count += approximate
+        if result is not None:
+            result.add_line(similarity, approximate)
 
         if similarity < 1.0:
             differences_count += 1
             if verbose:
                 print(f"\n🛑 Line {i + 1} differs:")
-                print(f"   File 1: {line1 if line1 else '(empty line)'}")
-                print(f"   File 2: {line2 if line2 else '(empty line)'}")
-                print(f"   Similarity: {round(similarity * 100, 2)}%")
+                if segment and max(len(line1), len(line2)) > SEGMENT_MIN_LENGTH:
+                    print_segment_differences(line1, line2, sentence_differences.pop(i, []))
+                else:
+                    print(f"   File 1: {line1 if line1 else '(empty line)'}")
+                    print(f"   File 2: {line2 if line2 else '(empty line)'}")
+                print(f"   Similarity: {round(similarity * 100, 2)}%"
+                      + (" (approximate, line too long for the metric)" if approximate else ""))
 
     if lines_compared == 0:
         print("⚠️ No lines to compare")
@@ -128,23 +137,594 @@ def compare_files_line_by_line(file1, file2, verbose=True):
 
     avg_similarity = (total_similarity / lines_compared) * 100
     
+    overlap = overlap_scores(lines1, lines2)
+    
     print(f"\n📈 RESULTS:")
     print(f"   Differences found: {differences_count}")
+    if approximate_count:
+        print(f"   ≈ Lines scored approximately (over --max-line-cost): {approximate_count}")
     print(f"   Average similarity: {round(avg_similarity, 2)}%")
+    print(f"   Text of file 1 found in file 2: {overlap['containment_1_in_2']}%")
+    print(f"   Text of file 2 found in file 1: {overlap['containment_2_in_1']}%")
+    print(f"   Shared text overall (Jaccard): {overlap['jaccard']}%")
     
     # Provide interpretation
-    if avg_similarity >= 95:
-        print("   ✅ Files are nearly identical!")
-    elif avg_similarity >= 80:
-        print("   ⚠️ Files are quite similar with some differences")
-    elif avg_similarity >= 50:
-        print("   🔶 Files have moderate similarity")
-    else:
-        print("   ❌ Files are significantly different")
+    print(f"   {get_assessment(avg_similarity)}")
+    
+    if html_report:
+        try:
+            write_html_report(html_report, file1, file2, round(avg_similarity, 2),
+                              result, len(lines1), len(lines2))
+            print(f"   📝 HTML report written to: {html_report}")
+        except OSError as e:
+            print(f"❌ Error writing HTML report: {e}")
     
     return round(avg_similarity, 2)
 
 
+def estimate_file_similarity(file1, file2, precision=DEFAULT_PRECISION, confidence=DEFAULT_CONFIDENCE,
+                             kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Estimate the similarity of two large files from a sample of lines
+    
+    Args:
+        file1 (str): Path to first file
+        file2 (str): Path to second file
+        precision (float): Target half-width of the confidence interval in points
+        confidence (float): Confidence level in percent
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+    
+    Returns:
+        float: Estimated average similarity percentage (None on error)
+    """
+    try:
+        lines1 = extract_text_from_file(file1)
+        lines2 = extract_text_from_file(file2)
+    except Exception as e:
+        print(f"❌ Error reading files: {e}")
+        return None
+
+    print(f"\n📊 SAMPLED COMPARISON:")
+    print(f"   File 1: {Path(file1).name} ({len(lines1)} lines)")
+    print(f"   File 2: {Path(file2).name} ({len(lines2)} lines)")
+    print(f"   Target precision: ±{precision} points at {confidence}% confidence")
+
+    estimate = estimate_similarity(lines1, lines2, precision=precision, confidence=confidence,
+                                   kernel=kernel, max_cost=max_cost, segment=segment)
+
+    print(f"\n📈 RESULTS:")
+    if estimate['exact']:
+        print(f"   Files are small enough to score every line")
+        print(f"   Average similarity: {estimate['similarity']}%")
+    else:
+        print(f"   Lines sampled: {estimate['samples']} of {estimate['total_lines']}")
+        print(f"   Estimated similarity: {estimate['similarity']}% "
+              f"(±{estimate['half_width']}, {confidence}% interval "
+              f"{estimate['lower']}% - {estimate['upper']}%)")
+    print(f"   {get_assessment(estimate['similarity'])}")
+
+    return estimate['similarity']
+
+
+def compare_files_approximately(file1, file2, save_fingerprints=False, kernel=DEFAULT_KERNEL,
+                                max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Compare two files by SimHash fingerprint, falling back to the exact engine
+    when the fingerprints are neither clearly alike nor clearly different
+    
+    Args:
+        file1 (str): Path to first file
+        file2 (str): Path to second file
+        save_fingerprints (bool): Save fingerprints next to the files for later runs
+        kernel (str): Line similarity kernel used for borderline pairs
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+    
+    Returns:
+        float: Similarity percentage (None on error)
+    """
+    record = approximate_compare(file1, file2, save=save_fingerprints, kernel=kernel, max_cost=max_cost,
+                                 segment=segment)
+    if record['error'] is not None:
+        print(f"❌ Error: {record['error']}")
+        return None
+
+    print(f"\n📊 APPROXIMATE COMPARISON:")
+    print(f"   File 1: {file1}")
+    print(f"   File 2: {file2}")
+    print(f"   Fingerprint distance: {record['distance']} of 64 bits")
+    print(f"   Matching paragraph blocks: {record['block_similarity']}%")
+
+    print(f"\n📈 RESULTS:")
+    if record['approximate']:
+        print(f"   Estimated similarity: {record['similarity']}% (from fingerprints)")
+    else:
+        print(f"   Fingerprints not conclusive, compared line by line")
+        print(f"   Differences found: {record['differences']}")
+        print(f"   Similarity: {record['similarity']}%")
+    print(f"   {get_assessment(record['similarity'])}")
+
+    return record['similarity']
+
+
+def get_status_icon(similarity):
+    """Return the status icon for a similarity percentage"""
+    if similarity >= 95:
+        return "✅"
+    elif similarity >= 80:
+        return "⚠️"
+    elif similarity >= 50:
+        return "🔶"
+    else:
+        return "❌"
+
+
+def print_pair_record(record):
+    """Print the one-line summary of a compared file pair"""
+    if record.get('resumed'):
+        print(f"   ⏩ {record['similarity']:5.1f}%   {record['path']} (from journal)")
+    elif record['error'] is not None:
+        print(f"   ❌  error   {record['path']}: {record['error']}")
+    elif 'renamed_from' in record:
+        print(f"   🔀 {record['similarity']:5.1f}%   {record['path']} (renamed)")
+    elif record['identical']:
+        print(f"   ✅ 100.0%   {record['path']} (identical)")
+    else:
+        icon = get_status_icon(record['similarity'])
+        print(f"   {icon} {record['similarity']:5.1f}%   {record['path']} "
+              f"({record['differences']} differences)")
+
+
+def compare_directories_line_by_line(dir1, dir2, verbose=True, workers=None, detect_moves=True,
+                                     journal=None, io_threads=None, store=None, kernel=DEFAULT_KERNEL,
+                                     max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Compare two directory trees file by file
+    Files are paired by relative path and compared in parallel worker processes
+    
+    Args:
+        dir1 (str): First directory
+        dir2 (str): Second directory
+        verbose (bool): Whether to print a line per compared file
+        workers (int): Number of worker processes (default: CPU count)
+        detect_moves (bool): Whether to match unpaired files by content
+        journal (ResultJournal): Optional journal for checkpoint and resume
+        io_threads (int): Number of threads reading files ahead of the workers
+        store (ResultStore): Optional database receiving every record and
+            its differing lines
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+    
+    Returns:
+        float: Average similarity percentage over the paired files
+    """
+    pairs, only_in_dir1, only_in_dir2 = pair_directories(dir1, dir2)
+
+    print(f"\n📂 DIRECTORY COMPARISON:")
+    print(f"   Directory 1: {dir1} ({len(pairs) + len(only_in_dir1)} files)")
+    print(f"   Directory 2: {dir2} ({len(pairs) + len(only_in_dir2)} files)")
+    print(f"   Files paired by path: {len(pairs)}")
+    print()
+
+    records = []
+    for record in compare_directories(pairs, workers=workers, journal=journal, io_threads=io_threads,
+                                      collect_differences=store is not None, kernel=kernel,
+                                      max_cost=max_cost, segment=segment):
+        if store:
+            store.add(record)
+        records.append(record)
+        if verbose or record['error'] is not None:
+            print_pair_record(record)
+
+    if detect_moves and only_in_dir1 and only_in_dir2:
+        renamed, only_in_dir1, only_in_dir2 = detect_renames(dir1, dir2, only_in_dir1, only_in_dir2,
+                                                             workers=workers, kernel=kernel,
+                                                             max_cost=max_cost, segment=segment)
+        for record in renamed:
+            if store:
+                store.add(record)
+            records.append(record)
+            if verbose:
+                print_pair_record(record)
+
+    if verbose:
+        for rel in only_in_dir1:
+            print(f"   ➖ only in directory 1: {rel}")
+        for rel in only_in_dir2:
+            print(f"   ➕ only in directory 2: {rel}")
+
+    summary = summarize_directory_results(records, only_in_dir1, only_in_dir2)
+    if store:
+        store.finish(summary)
+
+    print(f"\n📈 RESULTS:")
+    print(f"   Files compared: {summary['compared']} ({summary['identical']} identical, "
+          f"{summary['renamed']} renamed)")
+    resumed_count = sum(1 for record in records if record.get('resumed'))
+    if resumed_count:
+        print(f"   Taken from journal: {resumed_count}")
+    print(f"   Only in directory 1: {summary['only_in_dir1']}")
+    print(f"   Only in directory 2: {summary['only_in_dir2']}")
+    if summary['errors']:
+        print(f"   Errors: {summary['errors']}")
+    print(f"   Differences found: {summary['differences']}")
+    print(f"   Average similarity: {summary['similarity']}%")
+    if summary['compared']:
+        print(f"   {get_assessment(summary['similarity'])}")
+
+    return summary['similarity']
+
+
+def compare_batch_manifest(manifest, verbose=True, workers=None, output=None, journal=None,
+                           io_threads=None, store=None, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Compare every file pair listed in a manifest in one process
+    
+    Args:
+        manifest (str): Path to a CSV or JSON Lines manifest of file pairs
+        verbose (bool): Whether to print a line per compared pair
+        workers (int): Number of worker processes (default: CPU count)
+        output (str): Optional JSON Lines file receiving one record per pair
+        journal (ResultJournal): Optional journal for checkpoint and resume
+        io_threads (int): Number of threads reading files ahead of the workers
+        store (ResultStore): Optional database receiving every record and
+            its differing lines
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+    
+    Returns:
+        float: Average similarity percentage over the compared pairs
+    """
+    print(f"\n📋 BATCH COMPARISON:")
+    print(f"   Manifest: {manifest}")
+    if output:
+        print(f"   Results: {output}")
+    print()
+
+    records = []
+    output_file = open(output, 'w', encoding='utf-8') if output else None
+    try:
+        for record in compare_batch(read_manifest(manifest), workers=workers, journal=journal,
+                                    io_threads=io_threads, collect_differences=store is not None,
+                                    kernel=kernel, max_cost=max_cost, segment=segment):
+            record['path'] = f"{record['file1']} vs {record['file2']}"
+            if store:
+                store.add(record)
+            records.append({key: record.get(key) for key in ('similarity', 'differences', 'error', 'resumed')})
+            if output_file:
+                output_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+                output_file.flush()
+            if verbose or record['error'] is not None:
+                print_pair_record(record)
+    finally:
+        if output_file:
+            output_file.close()
+
+    scored = [record for record in records if record['error'] is None]
+    avg_similarity = sum(record['similarity'] for record in scored) / len(scored) if scored else 0.0
+    differences_count = sum(record['differences'] for record in scored)
+    if store:
+        store.finish({'compared': len(scored), 'errors': len(records) - len(scored),
+                      'differences': differences_count, 'similarity': round(avg_similarity, 2)})
+
+    print(f"\n📈 RESULTS:")
+    print(f"   Pairs compared: {len(scored)}")
+    resumed_count = sum(1 for record in records if record['resumed'])
+    if resumed_count:
+        print(f"   Taken from journal: {resumed_count}")
+    if len(scored) < len(records):
+        print(f"   Errors: {len(records) - len(scored)}")
+    print(f"   Differences found: {differences_count}")
+    print(f"   Average similarity: {round(avg_similarity, 2)}%")
+    if scored:
+        print(f"   {get_assessment(avg_similarity)}")
+
+    return round(avg_similarity, 2) if scored else None
+
+
+def compare_matrix(documents, verbose=True, workers=None, output=None, kernel=DEFAULT_KERNEL,
+                   max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Compare every pair of a list of documents
+    
+    Args:
+        documents (list): Paths of the documents to compare
+        verbose (bool): Whether to print the matrix (for up to MATRIX_PRINT_LIMIT
+            documents) and every pair
+        workers (int): Number of worker processes (default: CPU count)
+        output (str): Optional .csv or .json file receiving the matrix
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+    
+    Returns:
+        float: Average similarity percentage over all document pairs
+    """
+    print(f"\n🧮 SIMILARITY MATRIX:")
+    print(f"   Documents: {len(documents)}")
+    print(f"   Pairs to compare: {len(documents) * (len(documents) - 1) // 2}")
+    if output:
+        print(f"   Results: {output}")
+    print()
+
+    matrix, errors = compute_similarity_matrix(documents, workers=workers, kernel=kernel, max_cost=max_cost,
+                                               segment=segment)
+    for index, error in errors.items():
+        print(f"   ❌  error   {documents[index]}: {error}")
+
+    if output:
+        write_matrix(output, documents, matrix)
+
+    if verbose and len(documents) <= MATRIX_PRINT_LIMIT:
+        print("         " + "".join(f"{index + 1:>8}" for index in range(len(documents))))
+        for index, row in enumerate(matrix):
+            cells = "".join(f"{'-' if value is None else f'{value:.1f}':>8}" for value in row)
+            print(f"   {index + 1:>4}  {cells}   {documents[index]}")
+        print()
+
+    pairs = sorted(
+        ((matrix[i][j], documents[i], documents[j])
+         for i in range(len(documents)) for j in range(i + 1, len(documents))
+         if matrix[i][j] is not None),
+        key=lambda pair: pair[0], reverse=True
+    )
+    if verbose:
+        print("   Most similar pairs:")
+        for similarity, doc1, doc2 in pairs[:MATRIX_TOP_PAIRS]:
+            print(f"   {get_status_icon(similarity)} {similarity:5.1f}%   {doc1} vs {doc2}")
+
+    avg_similarity = sum(pair[0] for pair in pairs) / len(pairs) if pairs else 0.0
+
+    print(f"\n📈 RESULTS:")
+    print(f"   Pairs compared: {len(pairs)}")
+    if errors:
+        print(f"   Errors: {len(errors)}")
+    print(f"   Average similarity: {round(avg_similarity, 2)}%")
+
+    return round(avg_similarity, 2) if pairs else None
+
+
+def expand_documents(paths):
+    """Replace directories in a list of paths by all files below them"""
+    documents = []
+    for path in paths:
+        if Path(path).is_dir():
+            documents.extend(str(file_path) for file_path in collect_files(path).values())
+        else:
+            documents.append(path)
+    return documents
+
+
+def compare_corpus(documents, verbose=True, workers=None, output=None, top_n=DEFAULT_TOP_N,
+                   verify=True, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Screen a corpus with TF-IDF cosine similarity and compare the shortlist exactly
+    
+    Args:
+        documents (list): Paths of the documents to screen
+        verbose (bool): Whether to print every shortlisted pair
+        workers (int): Number of worker processes for the exact comparison
+        output (str): Optional JSON Lines file receiving one record per shortlisted pair
+        top_n (int): Most similar documents shortlisted per document
+        verify (bool): Whether to run the line-by-line comparison on the shortlist
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+    
+    Returns:
+        float: Average similarity percentage over the shortlisted pairs
+            (line-by-line when verified, cosine otherwise)
+    """
+    print(f"\n📚 CORPUS SCREENING:")
+    print(f"   Documents: {len(documents)}")
+    print(f"   Matches per document: {top_n}")
+    if output:
+        print(f"   Results: {output}")
+    print()
+
+    matches, errors = corpus_top_matches(documents, top_n=top_n)
+    for index, error in errors.items():
+        print(f"   ❌  error   {documents[index]}: {error}")
+
+    shortlist = shortlist_pairs(matches)
+    cosines = {(documents[i], documents[j]): cosine for i, j, cosine in shortlist}
+
+    if verify:
+        records = compare_batch([(documents[i], documents[j]) for i, j, _ in shortlist], workers=workers,
+                                kernel=kernel, max_cost=max_cost, segment=segment)
+    else:
+        records = ({'file1': documents[i], 'file2': documents[j], 'similarity': None,
+                    'differences': None, 'error': None} for i, j, _ in shortlist)
+
+    scored = []
+    output_file = open(output, 'w', encoding='utf-8') if output else None
+    try:
+        for record in records:
+            record['cosine'] = cosines[(record['file1'], record['file2'])]
+            record['path'] = f"{record['file1']} vs {record['file2']}"
+            if output_file:
+                output_file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            if record['error'] is not None:
+                print_pair_record(record)
+                continue
+            scored.append(record)
+            if verbose and verify:
+                print(f"   {get_status_icon(record['similarity'])} {record['similarity']:5.1f}%   "
+                      f"{record['path']} (cosine {record['cosine']}%)")
+            elif verbose:
+                print(f"   {get_status_icon(record['cosine'])} cosine {record['cosine']:5.1f}%   "
+                      f"{record['path']}")
+    finally:
+        if output_file:
+            output_file.close()
+
+    key = 'similarity' if verify else 'cosine'
+    avg_similarity = sum(record[key] for record in scored) / len(scored) if scored else 0.0
+
+    print(f"\n📈 RESULTS:")
+    print(f"   Pairs shortlisted: {len(shortlist)}")
+    if errors:
+        print(f"   Unreadable documents: {len(errors)}")
+    if verify:
+        print(f"   Pairs compared: {len(scored)}")
+    print(f"   Average {'similarity' if verify else 'cosine similarity'}: {round(avg_similarity, 2)}%")
+
+    return round(avg_similarity, 2) if scored else None
+
+
+def dedupe_documents(documents, verbose=True, workers=None, output=None,
+                     threshold=DEDUPE_THRESHOLD, shingle_type='lines'):
+    """
+    Report clusters of near-duplicate documents
+    
+    Args:
+        documents (list): Paths of the documents to check
+        verbose (bool): Whether to list the members of every cluster
+        workers (int): Number of worker processes (default: CPU count)
+        output (str): Optional JSON Lines file receiving one record per cluster
+        threshold (float): Minimum estimated similarity percentage
+        shingle_type (str): 'lines' or 'words' shingles
+    
+    Returns:
+        list: Clusters from find_duplicate_clusters
+    """
+    print(f"\n🧬 NEAR-DUPLICATE DETECTION:")
+    print(f"   Documents: {len(documents)}")
+    print(f"   Threshold: {threshold}% estimated similarity (shingles: {shingle_type})")
+    if output:
+        print(f"   Results: {output}")
+    print()
+
+    clusters, skipped = find_duplicate_clusters(documents, threshold=threshold, workers=workers,
+                                                shingle_type=shingle_type)
+
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            for number, cluster in enumerate(clusters, 1):
+                members = [{'path': path, 'similarity': similarity} for path, similarity in cluster]
+                f.write(json.dumps({'cluster': number, 'members': members}, ensure_ascii=False) + '\n')
+
+    if verbose:
+        for number, cluster in enumerate(clusters, 1):
+            print(f"   🗂️  Cluster {number} ({len(cluster)} documents):")
+            for path, similarity in cluster:
+                print(f"      {similarity:5.1f}%   {path}")
+
+    print(f"\n📈 RESULTS:")
+    print(f"   Duplicate clusters: {len(clusters)}")
+    print(f"   Documents in clusters: {sum(len(cluster) for cluster in clusters)}")
+    if skipped:
+        print(f"   Skipped (unreadable or empty): {len(skipped)}")
+
+    return clusters
+
+
+def add_to_library(library, documents):
+    """
+    Index documents into a library for --closest queries
+    
+    Args:
+        library (str): Line index database
+        documents (list): Paths of the documents to index
+    """
+    with LineIndex(library) as index:
+        added, unchanged, errors = index.add_documents(documents)
+        total = len(index)
+
+    print(f"\n📥 LIBRARY: {library}")
+    for path, error in errors.items():
+        print(f"   ❌  error   {path}: {error}")
+    print(f"   Documents indexed: {added}")
+    if unchanged:
+        print(f"   Already indexed (unchanged): {unchanged}")
+    if errors:
+        print(f"   Errors: {len(errors)}")
+    print(f"   Library size: {total} documents")
+
+
+def find_closest(library, file_path, verbose=True, top_n=DEFAULT_TOP_N, kernel=DEFAULT_KERNEL,
+                 max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Find the library documents closest to a file
+    
+    Args:
+        library (str): Line index database
+        file_path (str): Query document
+        verbose (bool): Whether to print every compared candidate
+        top_n (int): Candidates compared line by line
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+    
+    Returns:
+        float: Similarity percentage of the closest document
+    """
+    print(f"\n📚 LIBRARY SEARCH: {library}")
+    print(f"   Document: {file_path}")
+    print()
+
+    with LineIndex(library) as index:
+        records = index.query(file_path, limit=top_n, kernel=kernel, max_cost=max_cost, segment=segment)
+
+    if not records:
+        print("   No library document shares a line with this document")
+        return None
+
+    for rank, record in enumerate(records, 1):
+        if rank > 1 and not verbose:
+            break
+        if record['error'] is not None:
+            print(f"   ❌  error   {record['path']}: {record['error']}")
+        else:
+            print(f"   {get_status_icon(record['similarity'])} {record['similarity']:5.1f}%   "
+                  f"{record['path']} ({record['shared_lines']} shared lines)")
+
+    best = records[0]
+    print(f"\n📈 RESULTS:")
+    print(f"   Candidates compared: {len(records)}")
+    if best['similarity'] is not None:
+        print(f"   Closest document: {best['path']}")
+        print(f"   {get_assessment(best['similarity'])}")
+    return best['similarity']
+
+
+def query_result_store(database, below=None, text=None):
+    """
+    Print stored results of the latest run in a result database
+    
+    Args:
+        database (str): SQLite database written with --db
+        below (float): List the pairs scoring below this similarity percentage
+        text (str): List the differing lines containing this text
+    """
+    with ResultStore(database) as store:
+        run_id = store.latest_run()
+        if run_id is None:
+            print(f"❌ Error: '{database}' does not contain any runs")
+            return
+
+        print(f"\n🗄️  RESULT DATABASE: {database} (run {run_id})")
+
+        if below is not None:
+            pairs = store.pairs_below(below, run_id)
+            print(f"\n📉 Pairs below {below}% similarity: {len(pairs)}")
+            for path, similarity, differences in pairs:
+                print(f"   {get_status_icon(similarity)} {similarity:5.1f}%   {path} "
+                      f"({differences} differences)")
+
+        if text is not None:
+            lines = store.search_differences(text, run_id)
+            print(f"\n🔎 Differing lines containing '{text}': {len(lines)}")
+            for path, line_num, line1, line2, similarity in lines:
+                print(f"   {path}, line {line_num} ({similarity}% similar):")
+                print(f"      File 1: {line1}")
+                print(f"      File 2: {line2}")
+
+
 def create_sample_files():
     """Create sample files for testing"""
     sample_dir = Path("sample_files")
@@ -228,24 +808,136 @@ Examples:
   python cli_diff_matcher.py file1.txt file2.txt
   python cli_diff_matcher.py document1.docx document2.docx
   python cli_diff_matcher.py file1.txt document2.docx --quiet
+  python cli_diff_matcher.py file1.txt file2.txt --html report.html
+  python cli_diff_matcher.py release1/ release2/ --workers 8
+  python cli_diff_matcher.py --batch pairs.csv --output results.jsonl
+  python cli_diff_matcher.py --batch pairs.csv --journal run.journal --resume
+  python cli_diff_matcher.py --batch pairs.csv --db results.sqlite
+  python cli_diff_matcher.py --db results.sqlite --below 90 --find "Total"
+  python cli_diff_matcher.py file1.docx file2.docx --approx --save-fingerprints
+  python cli_diff_matcher.py huge1.txt huge2.txt --estimate --precision 0.5
+  python cli_diff_matcher.py --matrix drafts/*.docx --output matrix.csv
+  python cli_diff_matcher.py --corpus archive/ --top 3 --output shortlist.jsonl
+  python cli_diff_matcher.py --dedupe archive/ --threshold 90 --shingles words
+  python cli_diff_matcher.py --library templates.idx --add templates/
+  python cli_diff_matcher.py --library templates.idx --closest incoming.docx
+  python cli_diff_matcher.py long1.docx long2.docx --kernel lcs
+  python cli_diff_matcher.py contract1.docx contract2.docx --segment
   python cli_diff_matcher.py --sample
 
 Supported file types:
   • Text files (.txt, .py, etc.)
   • Microsoft Word documents (.docx) - requires python-docx
+
+When both arguments are directories, files are paired by relative path and
+compared in parallel; byte-identical files are skipped.
+
+Batch manifests list one pair per line, either as CSV ("file1,file2") or as
+JSON Lines ({"file1": ..., "file2": ...}); relative paths are resolved against
+the manifest's directory.
         """
     )
     
-    parser.add_argument('file1', nargs='?', help='First file to compare')
-    parser.add_argument('file2', nargs='?', help='Second file to compare')
+    parser.add_argument('file1', nargs='?', help='First file (or directory) to compare')
+    parser.add_argument('file2', nargs='?', help='Second file (or directory) to compare')
     parser.add_argument('--quiet', '-q', action='store_true', 
                        help='Suppress detailed output, show only summary')
     parser.add_argument('--sample', '-s', action='store_true',
                        help='Create sample files and compare them')
+    parser.add_argument('--html', metavar='REPORT',
+                       help='Write an HTML report of the comparison to REPORT')
+    parser.add_argument('--approx', action='store_true',
+                       help='Compare two files by SimHash fingerprint; only borderline pairs are '
+                            'compared line by line')
+    parser.add_argument('--save-fingerprints', action='store_true',
+                       help='With --approx, save fingerprints next to the files for later runs')
+    parser.add_argument('--estimate', action='store_true',
+                       help='Estimate the similarity of two large files from a random sample of lines')
+    parser.add_argument('--precision', type=float, default=DEFAULT_PRECISION, metavar='PCT',
+                       help=f'With --estimate, sample until the confidence interval is within '
+                            f'±PCT points (default: {DEFAULT_PRECISION})')
+    parser.add_argument('--confidence', type=float, default=DEFAULT_CONFIDENCE, metavar='PCT',
+                       help=f'With --estimate, confidence level of the interval (default: {DEFAULT_CONFIDENCE})')
+    parser.add_argument('--batch', '-b', metavar='MANIFEST',
+                       help='Compare all file pairs listed in a CSV or JSON Lines manifest')
+    parser.add_argument('--output', '-o', metavar='RESULTS',
+                       help='In batch and corpus mode, write one JSON record per pair to RESULTS; '
+                            'in matrix mode, write the matrix as CSV (or JSON for .json); '
+                            'in dedupe mode, write one JSON record per cluster')
+    parser.add_argument('--matrix', '-m', nargs='+', metavar='DOC',
+                       help='Compare every pair of the given documents and print the similarity matrix')
+    parser.add_argument('--corpus', nargs='+', metavar='DOC',
+                       help='Screen documents (or directories of documents) with TF-IDF cosine '
+                            'similarity and compare the most similar pairs line by line')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP_N, metavar='N',
+                       help=f'In corpus mode, shortlist the N most similar documents per document; '
+                            f'in library mode, compare the N best candidates (default: {DEFAULT_TOP_N})')
+    parser.add_argument('--screen-only', action='store_true',
+                       help='In corpus mode, only report cosine similarities')
+    parser.add_argument('--dedupe', nargs='+', metavar='DOC',
+                       help='Report clusters of near-duplicates among documents (or directories)')
+    parser.add_argument('--threshold', type=float, default=DEDUPE_THRESHOLD, metavar='PCT',
+                       help=f'In dedupe mode, minimum estimated similarity (default: {DEDUPE_THRESHOLD})')
+    parser.add_argument('--shingles', choices=sorted(SHINGLE_TYPES), default='lines',
+                       help='In dedupe mode, fingerprint runs of lines or of words (default: lines)')
+    parser.add_argument('--library', metavar='INDEX',
+                       help='Line index of stored documents used by --add and --closest')
+    parser.add_argument('--add', nargs='+', metavar='DOC',
+                       help='Index documents (or directories of documents) into the library')
+    parser.add_argument('--closest', metavar='DOC',
+                       help='Find the library documents closest to DOC; the --top candidates '
+                            'sharing the most lines are compared line by line')
+    parser.add_argument('--db', metavar='DATABASE',
+                       help='In batch and directory mode, store pairs and differing lines in '
+                            'the SQLite database DATABASE')
+    parser.add_argument('--below', type=float, metavar='PCT',
+                       help='With --db alone, list stored pairs below PCT%% similarity')
+    parser.add_argument('--find', metavar='TEXT',
+                       help='With --db alone, list stored differing lines containing TEXT')
+    parser.add_argument('--journal', metavar='JOURNAL',
+                       help='In batch and directory mode, append each completed pair to JOURNAL')
+    parser.add_argument('--resume', action='store_true',
+                       help='Skip pairs already in the journal whose files are unchanged')
+    parser.add_argument('--kernel', choices=sorted(LINE_KERNELS), default=DEFAULT_KERNEL,
+                       help='Line similarity metric: difflib\'s SequenceMatcher ratio (sequence), exact '
+                            'LCS ratio (lcs), normalized edit distance (levenshtein) or word-set '
+                            'Jaccard overlap (tokens) (default: sequence)')
+    parser.add_argument('--max-line-cost', type=int, default=MAX_PAIR_COST, metavar='COST',
+                       help='Estimated cost (about characters x characters) above which a line pair is '
+                            'scored with a cheap word-overlap approximation and flagged; 0 scores every '
+                            f'pair exactly (default: {MAX_PAIR_COST})')
+    parser.add_argument('--segment', action='store_true',
+                       help=f'Split lines longer than {SEGMENT_MIN_LENGTH} characters (long Word paragraphs) '
+                            'into sentences, align them and score them separately')
+    parser.add_argument('--workers', '-w', type=int, metavar='N',
+                       help='Worker processes for directory, batch, matrix and dedupe mode (default: CPU count)')
+    parser.add_argument('--io-threads', type=int, metavar='N',
+                       help='Threads reading and extracting files ahead of the workers '
+                            '(default: number of workers, at least 4)')
+    parser.add_argument('--no-renames', action='store_true',
+                       help='In directory mode, do not match unpaired files by content')
     parser.add_argument('--version', '-v', action='version', version='DiffMatcher CLI 2.0 (with Word support)')
     
     args = parser.parse_args()
     
+    if args.resume and not args.journal:
+        parser.error("--resume requires --journal")
+    if (args.below is not None or args.find is not None) and not args.db:
+        parser.error("--below and --find require --db")
+    if (args.add or args.closest) and not args.library:
+        parser.error("--add and --closest require --library")
+    if args.library and not (args.add or args.closest):
+        parser.error("--library requires --add or --closest")
+    if args.save_fingerprints and not args.approx:
+        parser.error("--save-fingerprints requires --approx")
+    if args.estimate and args.approx:
+        parser.error("--estimate and --approx cannot be combined")
+    if not 0 < args.confidence < 100:
+        parser.error("--confidence must be between 0 and 100")
+    if args.max_line_cost < 0:
+        parser.error("--max-line-cost must not be negative")
+    max_cost = args.max_line_cost or None
+    
     print("🔍 DiffMatcher CLI - File Comparison Tool")
     if DOCX_AVAILABLE:
         print("📄 Word document support: ✅ Enabled")
@@ -257,7 +949,106 @@ Supported file types:
         print("📝 Creating sample files...")
         file1, file2 = create_sample_files()
         print(f"\n🚀 Comparing sample files...")
-        similarity = compare_files_line_by_line(file1, file2, verbose=not args.quiet)
+        similarity = compare_files_line_by_line(file1, file2, verbose=not args.quiet,
+                                                html_report=args.html, kernel=args.kernel, max_cost=max_cost,
+                                                segment=args.segment)
+        
+    elif args.matrix:
+        if len(args.matrix) < 2:
+            print("❌ Error: --matrix needs at least two documents")
+            sys.exit(1)
+        
+        print(f"🚀 Comparing documents pairwise...")
+        similarity = compare_matrix(args.matrix, verbose=not args.quiet, workers=args.workers,
+                                    output=args.output, kernel=args.kernel, max_cost=max_cost, segment=args.segment)
+        
+    elif args.corpus:
+        documents = expand_documents(args.corpus)
+        if len(documents) < 2:
+            print("❌ Error: --corpus needs at least two documents")
+            sys.exit(1)
+        
+        print(f"🚀 Screening corpus...")
+        similarity = compare_corpus(documents, verbose=not args.quiet, workers=args.workers,
+                                    output=args.output, top_n=args.top, verify=not args.screen_only,
+                                    kernel=args.kernel, max_cost=max_cost, segment=args.segment)
+        
+    elif args.dedupe:
+        print(f"🚀 Fingerprinting documents...")
+        dedupe_documents(expand_documents(args.dedupe), verbose=not args.quiet, workers=args.workers,
+                         output=args.output, threshold=args.threshold, shingle_type=args.shingles)
+        sys.exit(0)
+        
+    elif args.library:
+        similarity = None
+        if args.add:
+            print(f"🚀 Indexing documents...")
+            add_to_library(args.library, expand_documents(args.add))
+            if not args.closest:
+                sys.exit(0)
+        
+        if not Path(args.closest).exists():
+            print(f"❌ Error: File '{args.closest}' does not exist")
+            sys.exit(1)
+        
+        print(f"🚀 Searching library...")
+        try:
+            similarity = find_closest(args.library, args.closest, verbose=not args.quiet, top_n=args.top,
+                                      kernel=args.kernel, max_cost=max_cost, segment=args.segment)
+        except Exception as e:
+            print(f"❌ Error: {e}")
+        
+    elif args.db and not args.batch and not (args.file1 and args.file2):
+        if not Path(args.db).exists():
+            print(f"❌ Error: Database '{args.db}' does not exist")
+            sys.exit(1)
+        
+        query_result_store(args.db, below=args.below, text=args.find)
+        sys.exit(0)
+        
+    elif args.batch:
+        if not Path(args.batch).exists():
+            print(f"❌ Error: Manifest '{args.batch}' does not exist")
+            sys.exit(1)
+        
+        print(f"🚀 Comparing batch...")
+        journal = ResultJournal(args.journal, resume=args.resume) if args.journal else None
+        store = ResultStore(args.db) if args.db else None
+        if store:
+            store.start_run('batch', args.batch)
+        try:
+            similarity = compare_batch_manifest(args.batch, verbose=not args.quiet,
+                                                workers=args.workers, output=args.output,
+                                                journal=journal, io_threads=args.io_threads,
+                                                store=store, kernel=args.kernel, max_cost=max_cost,
+                                                segment=args.segment)
+        except Exception as e:
+            print(f"❌ Error: {e}")
+            similarity = None
+        finally:
+            if journal:
+                journal.close()
+            if store:
+                store.close()
+        
+    elif args.file1 and args.file2 and Path(args.file1).is_dir() and Path(args.file2).is_dir():
+        print(f"🚀 Comparing directories...")
+        journal = ResultJournal(args.journal, resume=args.resume) if args.journal else None
+        store = ResultStore(args.db) if args.db else None
+        if store:
+            store.start_run('directory', f"{args.file1} vs {args.file2}")
+        try:
+            similarity = compare_directories_line_by_line(args.file1, args.file2, verbose=not args.quiet,
+                                                          workers=args.workers,
+                                                          detect_moves=not args.no_renames,
+                                                          journal=journal, io_threads=args.io_threads,
+                                                          store=store, kernel=args.kernel, max_cost=max_cost,
+                                                          segment=args.segment)
+        finally:
+            if journal:
+                journal.close()
+            if store:
+                store.close()
         
     elif args.file1 and args.file2:
         # Validate files exist
@@ -278,11 +1069,24 @@ Supported file types:
             print("   Install with: pip install python-docx")
             sys.exit(1)
         
-        print(f"🚀 Comparing files...")
-        similarity = compare_files_line_by_line(args.file1, args.file2, verbose=not args.quiet)
+        if args.estimate:
+            print(f"🚀 Sampling lines...")
+            similarity = estimate_file_similarity(args.file1, args.file2, precision=args.precision,
+                                                  confidence=args.confidence, kernel=args.kernel,
+                                                  max_cost=max_cost, segment=args.segment)
+        elif args.approx:
+            print(f"🚀 Comparing fingerprints...")
+            similarity = compare_files_approximately(args.file1, args.file2,
+                                                     save_fingerprints=args.save_fingerprints,
+                                                     kernel=args.kernel, max_cost=max_cost, segment=args.segment)
+        else:
+            print(f"🚀 Comparing files...")
+            similarity = compare_files_line_by_line(args.file1, args.file2, verbose=not args.quiet,
+                                                    html_report=args.html, kernel=args.kernel,
+                                                    max_cost=max_cost, segment=args.segment)
         
     else:
-        print("❌ Error: Please provide two files to compare or use --sample flag")
+        print("❌ Error: Please provide two files to compare or use --sample, --batch, --matrix or --corpus")
         parser.print_help()
         sys.exit(1)
     
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Comparison Result
+Holds a scored line-by-line comparison in compact column form
+Differences are materialized one at a time, only when they are displayed
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+
+from diff_engine import WORD_PATTERN
+
+# NumPy is optional; it speeds up filtering of very large results
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+
+class ComparisonResult:
+    """
+    Scored comparison of two files
+
+    Per-line similarity ratios are stored in a flat array and the differing
+    lines as an array of indices into the extracted lines, so a result with
+    millions of differences costs a few bytes per line instead of a dict each.
+    Indexing the result returns difference dicts in the same format as the
+    original list-based results (line_num, line1, line2, similarity),
+    plus an 'approximate' flag.
+    """
+
+    def __init__(self, lines1, lines2):
+        self.lines1 = lines1
+        self.lines2 = lines2
+        self.similarities = array('d')
+        self.diff_indices = array('q')
+        self.total_similarity = 0.0
+
+        # Indices of lines scored approximately because they exceeded the
+        # engine's cost cap
+        self.approximate = set()
+
+        # Shingle overlap scores (fingerprints.overlap_scores), set by the caller
+        self.overlap = None
+
+        # Built on first use by filter()
+        self._whitespace_only = None
+        self._word_index = None
+        self._vocabulary = None
+        self._index_lock = threading.Lock()
+
+    @property
+    def lines1_count(self):
+        return len(self.lines1)
+
+    @property
+    def lines2_count(self):
+        return len(self.lines2)
+
+    @property
+    def similarity(self):
+        """Average similarity percentage over all compared lines"""
+        if not self.similarities:
+            return 0.0
+        return round(self.total_similarity / len(self.similarities) * 100, 2)
+
+    def add_line(self, similarity, approximate=False):
+        """Record the similarity ratio (0-1) of the next compared line"""
+        self._whitespace_only = None
+        self._word_index = None
+        index = len(self.similarities)
+        if approximate:
+            self.approximate.add(index)
+        self.similarities.append(similarity)
+        self.total_similarity += similarity
+        if similarity < 1.0:
+            self.diff_indices.append(index)
+
+    def get_line(self, index):
+        """Return the stripped lines of both files at a 0-based line index"""
+        line1 = self.lines1[index].strip() if index < len(self.lines1) else ''
+        line2 = self.lines2[index].strip() if index < len(self.lines2) else ''
+        return line1, line2
+
+    def __len__(self):
+        return len(self.diff_indices)
+
+    def __getitem__(self, position):
+        index = self.diff_indices[position]
+        line1, line2 = self.get_line(index)
+        return {
+            'line_num': index + 1,
+            'line1': line1,
+            'line2': line2,
+            'similarity': round(self.similarities[index] * 100, 2),
+            'approximate': index in self.approximate
+        }
+
+    def __iter__(self):
+        for position in range(len(self.diff_indices)):
+            yield self[position]
+
+    def find_line(self, line_num):
+        """Return the position of the first difference at or after a 1-based line number"""
+        return bisect_left(self.diff_indices, line_num - 1)
+
+    def _build_whitespace_mask(self):
+        """Flag differences whose lines only differ in whitespace"""
+        mask = array('b')
+        for index in self.diff_indices:
+            line1, line2 = self.get_line(index)
+            mask.append(''.join(line1.split()) == ''.join(line2.split()))
+        self._whitespace_only = mask
+
+    def build_search_index(self):
+        """
+        Map every lowercase word of both lines to the differences containing it
+
+        Safe to call from a background thread to warm the index up before the
+        first search; concurrent callers wait for the same build.
+        """
+        with self._index_lock:
+            if self._word_index is None:
+                self._build_word_index()
+
+    def _build_word_index(self):
+        index = {}
+        for position, line_index in enumerate(self.diff_indices):
+            line1, line2 = self.get_line(line_index)
+            words = set(WORD_PATTERN.findall(line1.lower()))
+            words.update(WORD_PATTERN.findall(line2.lower()))
+            for word in words:
+                postings = index.get(word)
+                if postings is None:
+                    index[word] = postings = array('q')
+                postings.append(position)
+        self._word_index = index
+        self._vocabulary = sorted(index)
+
+    def search(self, text):
+        """
+        Return the positions of differences matching every word of a query
+
+        Each query word matches words that start with it, so results update
+        sensibly while the user is still typing. Uses the word index, which is
+        built once per result.
+        """
+        self.build_search_index()
+
+        matches = None
+        for query_word in set(WORD_PATTERN.findall(text.lower())):
+            positions = set()
+            vocabulary = self._vocabulary
+            start = bisect_left(vocabulary, query_word)
+            while start < len(vocabulary) and vocabulary[start].startswith(query_word):
+                positions.update(self._word_index[vocabulary[start]])
+                start += 1
+            matches = positions if matches is None else matches & positions
+            if not matches:
+                break
+
+        return set() if matches is None else matches
+
+    def filter(self, max_similarity=None, hide_whitespace=False, text=None):
+        """
+        Select differences without recomputing the comparison
+
+        Args:
+            max_similarity (float): Only keep lines below this similarity percentage
+            hide_whitespace (bool): Drop lines that only differ in whitespace
+            text (str): Only keep lines matching every word of this query
+
+        Returns:
+            ResultView: Filtered view with the same interface as the result
+        """
+        count = len(self.diff_indices)
+
+        if hide_whitespace and self._whitespace_only is None:
+            self._build_whitespace_mask()
+        matches = self.search(text) if text and text.strip() else None
+
+        if NUMPY_AVAILABLE:
+            keep = np.ones(count, dtype=bool)
+            if max_similarity is not None:
+                diff_indices = np.frombuffer(self.diff_indices, dtype=np.int64)
+                similarities = np.frombuffer(self.similarities, dtype=np.float64)
+                keep &= similarities[diff_indices] < max_similarity / 100
+            if hide_whitespace:
+                keep &= ~np.frombuffer(self._whitespace_only, dtype=np.int8).astype(bool)
+            if matches is not None:
+                found = np.zeros(count, dtype=bool)
+                found[np.fromiter(matches, dtype=np.int64, count=len(matches))] = True
+                keep &= found
+            positions = array('q', np.flatnonzero(keep).astype(np.int64).tobytes())
+        else:
+            candidates = sorted(matches) if matches is not None else range(count)
+            threshold = max_similarity / 100 if max_similarity is not None else None
+            positions = array('q', (
+                position for position in candidates
+                if (threshold is None or self.similarities[self.diff_indices[position]] < threshold)
+                and not (hide_whitespace and self._whitespace_only[position])
+            ))
+
+        return ResultView(self, positions)
+
+
+class ResultView:
+    """Subset of a ComparisonResult's differences, in line order"""
+
+    def __init__(self, result, positions):
+        self.result = result
+        self.positions = positions
+
+        # Line indices of the kept differences, built on first use by find_line()
+        self._diff_indices = None
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __getitem__(self, position):
+        return self.result[self.positions[position]]
+
+    def __iter__(self):
+        for position in self.positions:
+            yield self.result[position]
+
+    def find_line(self, line_num):
+        """Return the position of the first difference at or after a 1-based line number"""
+        if self._diff_indices is None:
+            diff_indices = self.result.diff_indices
+            self._diff_indices = array('q', (diff_indices[position] for position in self.positions))
+        return bisect_left(self._diff_indices, line_num - 1)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Corpus Similarity
+Screens large document collections with TF-IDF weighted term vectors
+Cosine similarities are computed in batches, and the top matches of each
+document are shortlisted for the exact line-by-line comparison
+"""
+
+import math
+from collections import Counter
+
+from diff_engine import WORD_PATTERN
+from similarity_matrix import extract_documents
+
+# NumPy is optional; it computes the cosine similarities in batched products
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Most similar documents reported per document
+DEFAULT_TOP_N = 5
+
+# Upper bound on the number of products, and of scores, held in memory at once
+BATCH_ELEMENTS = 1 << 24
+
+
+def document_terms(lines, shingle_size=1):
+    """
+    Count the terms of a document
+
+    Args:
+        lines (list): Lines as returned by extract_text_from_file
+        shingle_size (int): 1 for lowercase words, more for runs of that many
+            consecutive words (word shingles)
+
+    Returns:
+        Counter: Term -> number of occurrences
+    """
+    words = WORD_PATTERN.findall(' '.join(lines).lower())
+    if shingle_size <= 1:
+        return Counter(words)
+    if len(words) < shingle_size:
+        return Counter([' '.join(words)]) if words else Counter()
+    return Counter(' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1))
+
+
+def tfidf_vectors(term_counts):
+    """
+    Weight term counts with TF-IDF and normalize each vector to unit length
+
+    Term frequencies are damped logarithmically (1 + log tf) and rare terms
+    get a higher inverse document frequency, so boilerplate shared by the
+    whole corpus barely contributes to the similarity.
+
+    Args:
+        term_counts (list): Counter of terms per document
+
+    Returns:
+        tuple: (vocabulary, vectors) where vocabulary maps terms to column
+            numbers and each vector is a dict of column -> weight
+    """
+    document_frequency = Counter()
+    for counts in term_counts:
+        document_frequency.update(counts.keys())
+
+    vocabulary = {term: column for column, term in enumerate(sorted(document_frequency))}
+    count = len(term_counts)
+    idf = {term: math.log((1 + count) / (1 + frequency)) + 1
+           for term, frequency in document_frequency.items()}
+
+    vectors = []
+    for counts in term_counts:
+        vector = {vocabulary[term]: (1 + math.log(tf)) * idf[term] for term, tf in counts.items()}
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        vectors.append({column: weight / norm for column, weight in vector.items()} if norm else {})
+    return vocabulary, vectors
+
+
+def _top_matches(scores, index, top_n):
+    """Pick the best other documents from a list of (document, score) tuples"""
+    ranked = sorted(((score, other) for other, score in scores if other != index and score > 0),
+                    key=lambda item: (-item[0], item[1]))
+    return [(other, round(min(score, 1.0) * 100, 2)) for score, other in ranked[:top_n]]
+
+
+def _cosine_top_n_python(vectors, top_n):
+    postings = {}
+    for document, vector in enumerate(vectors):
+        for column, weight in vector.items():
+            postings.setdefault(column, []).append((document, weight))
+
+    matches = []
+    for index, vector in enumerate(vectors):
+        scores = Counter()
+        for column, weight in vector.items():
+            for other, other_weight in postings[column]:
+                scores[other] += weight * other_weight
+        matches.append(_top_matches(scores.items(), index, top_n))
+    return matches
+
+
+def _cosine_top_n_numpy(vectors, vocabulary_size, top_n):
+    # Store all vectors as one CSR matrix: row i holds the columns
+    # indices[indptr[i]:indptr[i + 1]] with weights data[...]
+    lengths = np.fromiter((len(vector) for vector in vectors), dtype=np.int64, count=len(vectors))
+    indptr = np.zeros(len(vectors) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=indptr[1:])
+    indices = np.fromiter((column for vector in vectors for column in vector),
+                          dtype=np.int64, count=int(indptr[-1]))
+    data = np.fromiter((weight for vector in vectors for weight in vector.values()),
+                       dtype=np.float64, count=int(indptr[-1]))
+    rows = np.repeat(np.arange(len(vectors)), lengths)
+
+    # The same entries sorted by column (an inverted index): column c is
+    # held by the documents posting_rows[column_ptr[c]:column_ptr[c + 1]]
+    order = np.argsort(indices, kind='stable')
+    posting_rows = rows[order]
+    posting_data = data[order]
+    column_ptr = np.zeros(vocabulary_size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(indices, minlength=vocabulary_size), out=column_ptr[1:])
+
+    count = len(vectors)
+    batch_size = max(1, min(count, BATCH_ELEMENTS // count))
+    matches = []
+
+    for batch_start in range(0, count, batch_size):
+        batch_end = min(batch_start + batch_size, count)
+        batch_rows = batch_end - batch_start
+
+        # Multiply the batch's entries only with the postings of their own
+        # columns, a chunk of entries at a time so that at most
+        # BATCH_ELEMENTS products exist at once, and sum the products per
+        # (batch row, stored document)
+        entries = slice(indptr[batch_start], indptr[batch_end])
+        entry_rows = rows[entries] - batch_start
+        entry_columns = indices[entries]
+        entry_data = data[entries]
+        postings = column_ptr[entry_columns + 1] - column_ptr[entry_columns]
+        ends = np.cumsum(postings)
+
+        scores = np.zeros(batch_rows * count)
+        chunk_start = 0
+        while chunk_start < len(postings):
+            done = int(ends[chunk_start - 1]) if chunk_start else 0
+            chunk_end = max(chunk_start + 1, int(np.searchsorted(ends, done + BATCH_ELEMENTS, side='right')))
+            chunk = slice(chunk_start, chunk_end)
+            repeats = postings[chunk]
+            entry = np.repeat(np.arange(chunk_end - chunk_start), repeats)
+            offsets = np.arange(int(repeats.sum())) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+            positions = column_ptr[entry_columns[chunk]][entry] + offsets
+            scores += np.bincount(entry_rows[chunk][entry] * count + posting_rows[positions],
+                                  weights=entry_data[chunk][entry] * posting_data[positions],
+                                  minlength=batch_rows * count)
+            chunk_start = chunk_end
+        scores = scores.reshape(batch_rows, count)
+
+        for row in range(batch_rows):
+            index = batch_start + row
+            row_scores = scores[row]
+            row_scores[index] = 0.0
+            if top_n < count:
+                candidates = np.argpartition(row_scores, -top_n)[-top_n:]
+            else:
+                candidates = np.arange(count)
+            matches.append(_top_matches(((int(other), float(row_scores[other])) for other in candidates),
+                                        index, top_n))
+    return matches
+
+
+def cosine_top_n(vectors, vocabulary_size, top_n=DEFAULT_TOP_N):
+    """
+    Find the most similar documents of every document by cosine similarity
+
+    With NumPy, vectors are packed into sparse row and column (inverted
+    index) arrays and scored a batch of documents at a time: each batch
+    entry is multiplied only with the documents sharing its term, in
+    vectorized chunks of at most BATCH_ELEMENTS products, and the batch's
+    score block also stays below BATCH_ELEMENTS values. Without NumPy,
+    shared terms are accumulated through an inverted index in Python.
+
+    Args:
+        vectors (list): Unit-length vectors from tfidf_vectors
+        vocabulary_size (int): Number of columns
+        top_n (int): Matches kept per document
+
+    Returns:
+        list: For each document, up to top_n (other_index, cosine percentage)
+            tuples, best first; documents sharing no term are left out
+    """
+    if NUMPY_AVAILABLE and vectors:
+        return _cosine_top_n_numpy(vectors, vocabulary_size, top_n)
+    return _cosine_top_n_python(vectors, top_n)
+
+
+def corpus_top_matches(paths, top_n=DEFAULT_TOP_N, shingle_size=1):
+    """
+    Screen a corpus for similar documents
+
+    Args:
+        paths (list): Document paths
+        top_n (int): Matches kept per document
+        shingle_size (int): Words per term (see document_terms)
+
+    Returns:
+        tuple: (matches, errors) where matches lists the (other_index,
+            cosine percentage) tuples of each document and errors maps
+            indices of unreadable documents to error messages
+    """
+    documents, errors = extract_documents(paths)
+    term_counts = [document_terms(lines, shingle_size) if lines is not None else Counter()
+                   for lines in documents]
+    vocabulary, vectors = tfidf_vectors(term_counts)
+    return cosine_top_n(vectors, len(vocabulary), top_n), errors
+
+
+def shortlist_pairs(matches):
+    """
+    Turn per-document matches into unique unordered pairs
+
+    Returns:
+        list: (index1, index2, cosine percentage) tuples with index1 < index2,
+            most similar first
+    """
+    pairs = {}
+    for index, document_matches in enumerate(matches):
+        for other, score in document_matches:
+            pairs[(min(index, other), max(index, other))] = score
+    return sorted(((i, j, score) for (i, j), score in pairs.items()), key=lambda pair: (-pair[2], pair[0], pair[1]))
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Deduplication
+Finds clusters of near-duplicate documents in large collections
+MinHash signatures are bucketed with LSH so only documents sharing a band
+are ever compared, instead of every pair
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from fingerprints import MinHashLSH, estimate_jaccard, file_signature
+
+# Minimum estimated similarity percentage for two documents to be duplicates
+DEDUPE_THRESHOLD = 80.0
+
+# Documents fingerprinted per worker task
+SIGNATURE_CHUNK_SIZE = 64
+
+
+class _DisjointSet:
+    """Union-find over document indices"""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, item1, item2):
+        root1, root2 = self.find(item1), self.find(item2)
+        if root1 != root2:
+            self.parent[max(root1, root2)] = min(root1, root2)
+
+
+def compute_signatures(paths, workers=None, shingle_type='lines'):
+    """
+    Compute the MinHash signature of every document in a pool of workers
+
+    Returns:
+        list: Signature per path (None for unreadable or empty documents)
+    """
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(partial(file_signature, shingle_type=shingle_type), paths,
+                                 chunksize=SIGNATURE_CHUNK_SIZE))
+
+
+def find_duplicate_clusters(paths, threshold=DEDUPE_THRESHOLD, workers=None, shingle_type='lines'):
+    """
+    Group documents whose estimated similarity reaches a threshold
+
+    Identical signatures (exact copies) are grouped with a dict first, and
+    one signature per group is inserted into an LSH index and queried once;
+    only the candidates sharing a band and not already in the same cluster
+    are checked with the MinHash estimate, and confirmed pairs are merged
+    into clusters (so A~B and B~C puts A, B and C in one cluster). A group
+    of k copies therefore costs O(k), not O(k^2) comparisons.
+
+    Args:
+        paths (list): Document paths
+        threshold (float): Minimum estimated Jaccard similarity percentage
+        workers (int): Number of worker processes (default: CPU count)
+        shingle_type (str): 'lines' or 'words' shingles
+
+    Returns:
+        tuple: (clusters, unreadable) where clusters is a list of lists of
+            (path, estimated similarity to the first member) tuples, largest
+            cluster first, and unreadable lists paths without a signature
+    """
+    signatures = compute_signatures(paths, workers=workers, shingle_type=shingle_type)
+
+    clusters = _DisjointSet(len(paths))
+    representatives = {}
+    for index, signature in enumerate(signatures):
+        if signature is not None:
+            clusters.union(representatives.setdefault(tuple(signature), index), index)
+
+    lsh = MinHashLSH()
+    for index in representatives.values():
+        lsh.insert(index, signatures[index])
+
+    for index in representatives.values():
+        for other in lsh.query(signatures[index]):
+            if other <= index or clusters.find(other) == clusters.find(index):
+                continue
+            if estimate_jaccard(signatures[index], signatures[other]) * 100 >= threshold:
+                clusters.union(index, other)
+
+    members = {}
+    for index, signature in enumerate(signatures):
+        if signature is not None:
+            members.setdefault(clusters.find(index), []).append(index)
+
+    result = []
+    for root, indices in members.items():
+        if len(indices) < 2:
+            continue
+        result.append([(paths[index], round(estimate_jaccard(signatures[root], signatures[index]) * 100, 2))
+                       for index in indices])
+    result.sort(key=lambda cluster: (-len(cluster), cluster[0][0]))
+
+    unreadable = [path for path, signature in zip(paths, signatures) if signature is None]
+    return result, unreadable
@@ -0,0 +1,612 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Engine - Text extraction and line-by-line scoring
+Shared by the CLI and the directory comparison workers
+Supports text files and Microsoft Word documents (.docx)
+"""
+
+import hashlib
+import os
+import re
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache, partial
+from pathlib import Path
+
+from segmentation import SEGMENT_MIN_LENGTH, segmented_similarity
+from vectorized_scoring import BATCH_LINE_LENGTH, BATCH_MIN_PAIRS, NUMPY_AVAILABLE, batch_lcs_ratios
+
+# Import for Word document support
+try:
+    from docx import Document
+    DOCX_AVAILABLE = True
+except ImportError:
+    DOCX_AVAILABLE = False
+
+# Read size used when hashing files
+DIGEST_CHUNK_SIZE = 1024 * 1024
+
+# Number of extracted files kept per process by extract_text_cached
+EXTRACTION_CACHE_SIZE = 32
+
+# Words, as used by the token metrics, fingerprints, corpus screening and result search
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def extract_text_from_file(file_path):
+    """
+    Extract text content from different file types
+
+    Args:
+        file_path (str): Path to the file
+
+    Returns:
+        list: List of lines from the file
+    """
+    file_path = Path(file_path)
+
+    try:
+        if file_path.suffix.lower() == '.docx':
+            if not DOCX_AVAILABLE:
+                raise Exception("python-docx library is not installed. Cannot read .docx files.\nInstall with: pip install python-docx")
+
+            # Extract text from Word document
+            doc = Document(file_path)
+            lines = []
+
+            # Extract text from paragraphs
+            for paragraph in doc.paragraphs:
+                lines.append(paragraph.text + '\n')
+
+            # If no paragraphs found, try tables
+            if not lines:
+                for table in doc.tables:
+                    for row in table.rows:
+                        for cell in row.cells:
+                            if cell.text.strip():
+                                lines.append(cell.text + '\n')
+
+            return lines
+
+        else:
+            # Handle text files (including .txt, .py, etc.)
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return f.readlines()
+
+    except UnicodeDecodeError:
+        # Try with different encoding
+        try:
+            with open(file_path, 'r', encoding='latin-1') as f:
+                return f.readlines()
+        except:
+            raise Exception(f"Could not decode file: {file_path}")
+    except Exception as e:
+        raise Exception(f"Error reading file {file_path}: {str(e)}")
+
+
+@lru_cache(maxsize=EXTRACTION_CACHE_SIZE)
+def _extract_text_cached(file_path, size, mtime_ns):
+    return extract_text_from_file(file_path)
+
+
+def extract_text_cached(file_path):
+    """
+    Extract a file, reusing the lines of a recent extraction of the same version
+
+    Files are identified by absolute path, size and modification time. The
+    returned list is shared between callers and must not be modified.
+    """
+    stat = os.stat(file_path)
+    return _extract_text_cached(os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+def sequence_ratio(line1, line2):
+    """Similarity of two lines with difflib's SequenceMatcher (0-1)"""
+    return SequenceMatcher(None, line1, line2).ratio()
+
+
+def lcs_length(text1, text2):
+    """
+    Length of the longest common subsequence of two strings
+
+    Bit-parallel algorithm (Hyyrö): the shorter string is encoded as one
+    match bit mask per character, held in Python integers, and each
+    character of the longer string updates the whole DP row with a few
+    integer operations, for about O(n * m / w) word operations.
+    """
+    if len(text1) < len(text2):
+        text1, text2 = text2, text1
+    if not text2:
+        return 0
+
+    masks = {}
+    bit = 1
+    for char in text2:
+        masks[char] = masks.get(char, 0) | bit
+        bit <<= 1
+    full = bit - 1
+
+    row = full
+    for char in text1:
+        matches = row & masks.get(char, 0)
+        row = ((row + matches) | (row - matches)) & full
+    return len(text2) - bin(row).count('1')
+
+
+def lcs_ratio(line1, line2):
+    """
+    Similarity of two lines from their exact LCS (0-1)
+
+    Uses the same 2 * matches / total_length form as SequenceMatcher.ratio,
+    but the matches are the true longest common subsequence, with no
+    junk heuristic for long lines.
+    """
+    if line1 == line2:
+        return 1.0
+    return 2 * lcs_length(line1, line2) / (len(line1) + len(line2))
+
+
+def levenshtein_distance(text1, text2):
+    """
+    Edit distance (insertions, deletions and substitutions) of two strings
+
+    Bit-parallel algorithm (Myers, in Hyyrö's formulation for whole
+    strings): the vertical score deltas of a DP column are held in two
+    Python integers and updated per character of the longer string.
+    """
+    if len(text1) < len(text2):
+        text1, text2 = text2, text1
+    if not text2:
+        return len(text1)
+
+    masks = {}
+    bit = 1
+    for char in text2:
+        masks[char] = masks.get(char, 0) | bit
+        bit <<= 1
+    full = bit - 1
+    last = bit >> 1
+
+    positive = full
+    negative = 0
+    distance = len(text2)
+    for char in text1:
+        matches = masks.get(char, 0)
+        vertical = matches | negative
+        horizontal = (((matches & positive) + positive) ^ positive) | matches
+        horizontal_positive = negative | (~(horizontal | positive) & full)
+        horizontal_negative = positive & horizontal
+        if horizontal_positive & last:
+            distance += 1
+        elif horizontal_negative & last:
+            distance -= 1
+        horizontal_positive = ((horizontal_positive << 1) | 1) & full
+        horizontal_negative = (horizontal_negative << 1) & full
+        positive = horizontal_negative | (~(vertical | horizontal_positive) & full)
+        negative = horizontal_positive & vertical
+    return distance
+
+
+def levenshtein_ratio(line1, line2):
+    """Similarity of two lines as 1 - edit distance / longer length (0-1)"""
+    if line1 == line2:
+        return 1.0
+    return 1 - levenshtein_distance(line1, line2) / max(len(line1), len(line2))
+
+
+def token_jaccard(line1, line2):
+    """
+    Similarity of two lines as the Jaccard overlap of their lowercase words (0-1)
+
+    Ignores word order and punctuation; lines without words only match
+    when they are equal.
+    """
+    tokens1 = set(WORD_PATTERN.findall(line1.lower()))
+    tokens2 = set(WORD_PATTERN.findall(line2.lower()))
+    if not tokens1 and not tokens2:
+        return 1.0 if line1 == line2 else 0.0
+    return len(tokens1 & tokens2) / len(tokens1 | tokens2)
+
+
+def word_overlap_ratio(line1, line2):
+    """
+    Cheap approximate similarity of two lines (0-1)
+
+    Share of the characters of both lines that belong to words found in
+    both, counting repeated words as often as they occur in each. Linear
+    in the line lengths; ignores word order.
+    """
+    counts1 = Counter(line1.split())
+    counts2 = Counter(line2.split())
+    total = sum(len(word) * count for word, count in counts1.items())
+    total += sum(len(word) * count for word, count in counts2.items())
+    if not total:
+        return 1.0 if line1 == line2 else 0.0
+    shared = sum(len(word) * min(count, counts2[word]) for word, count in counts1.items() if word in counts2)
+    return 2 * shared / total
+
+
+def quadratic_cost(line1, line2):
+    """Estimated cost of a dynamic-programming kernel: one unit per pair of characters"""
+    return len(line1) * len(line2)
+
+
+def linear_cost(line1, line2):
+    """Estimated cost of a kernel that reads each line once"""
+    return len(line1) + len(line2)
+
+
+def _lcs_batch(lines1, lines2):
+    """LCS ratios of many pairs, vectorizing the short ones"""
+    similarities = [None] * len(lines1)
+    short = [i for i, (line1, line2) in enumerate(zip(lines1, lines2))
+             if len(line1) <= BATCH_LINE_LENGTH and len(line2) <= BATCH_LINE_LENGTH]
+    if len(short) >= BATCH_MIN_PAIRS:
+        for i, similarity in zip(short, batch_lcs_ratios([lines1[i] for i in short], [lines2[i] for i in short])):
+            similarities[i] = similarity
+    return [lcs_ratio(line1, line2) if similarity is None else similarity
+            for line1, line2, similarity in zip(lines1, lines2, similarities)]
+
+
+# Per-line similarity kernels selectable by name
+LINE_KERNELS = {
+    'sequence': sequence_ratio,
+    'lcs': lcs_ratio,
+    'levenshtein': levenshtein_ratio,
+    'tokens': token_jaccard,
+}
+
+DEFAULT_KERNEL = 'sequence'
+
+# Cost estimate of each kernel for one line pair; kernels not listed are
+# assumed quadratic
+KERNEL_COSTS = {
+    'tokens': linear_cost,
+}
+
+# Line pairs whose estimated cost exceeds this (about 2000 x 2000
+# characters for quadratic kernels) are scored with word_overlap_ratio
+# instead and flagged as approximate; None scores every pair exactly
+MAX_PAIR_COST = 4_000_000
+
+# Batch implementations of kernels: called with two lists of lines and
+# returning the similarity of every pair, so they can vectorize
+BATCH_KERNELS = {}
+if NUMPY_AVAILABLE:
+    BATCH_KERNELS['lcs'] = _lcs_batch
+
+# Line positions scored together when a batch kernel is used
+BATCH_CHUNK_LINES = 65536
+
+
+def register_kernel(name, ratio, batch_ratios=None, cost=None):
+    """
+    Add a custom line similarity kernel
+
+    Kernels registered at import time of a module loaded by the worker
+    processes are available in every mode; the CLI lists the kernels
+    registered before it parses its arguments.
+
+    Args:
+        name (str): Name used to select the kernel
+        ratio (callable): ratio(line1, line2) returning a similarity in 0-1
+        batch_ratios (callable): Optional batch_ratios(lines1, lines2)
+            returning the list of similarities of many pairs at once
+        cost (callable): Optional cost(line1, line2) estimate compared with
+            the max_cost of a comparison (default: quadratic_cost)
+    """
+    if name in LINE_KERNELS:
+        raise ValueError(f"Line similarity kernel already registered: {name}")
+    LINE_KERNELS[name] = ratio
+    if batch_ratios is not None:
+        BATCH_KERNELS[name] = batch_ratios
+    if cost is not None:
+        KERNEL_COSTS[name] = cost
+
+
+def line_similarity(line1, line2, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False,
+                    sentence_differences=None):
+    """
+    Score one line pair, approximately when it is too costly
+
+    With segment set, pairs longer than SEGMENT_MIN_LENGTH characters are
+    split into sentences, aligned and scored sentence by sentence (see
+    segmentation.segmented_similarity); the cost cap then applies to each
+    sentence pair.
+
+    Args:
+        line1 (str): First line
+        line2 (str): Second line
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per pair (None for no cap)
+        segment (bool): Score lines longer than SEGMENT_MIN_LENGTH sentence by sentence
+        sentence_differences (list): Optional list receiving the
+            (sentence1, sentence2, similarity) of the aligned sentences
+            that differ, when the pair is scored sentence by sentence
+
+    Returns:
+        tuple: (similarity in 0-1, approximate) where approximate is True
+            when the pair (or one of its sentences) exceeded max_cost and
+            was scored with word_overlap_ratio
+    """
+    if line1 == line2:
+        return 1.0, False
+    if segment and max(len(line1), len(line2)) > SEGMENT_MIN_LENGTH:
+        similarity, approximate, differences = segmented_similarity(
+            line1, line2, partial(line_similarity, kernel=kernel, max_cost=max_cost)
+        )
+        if sentence_differences is not None:
+            sentence_differences.extend(differences)
+        return similarity, approximate
+    if max_cost is not None and KERNEL_COSTS.get(kernel, quadratic_cost)(line1, line2) > max_cost:
+        return word_overlap_ratio(line1, line2), True
+    return LINE_KERNELS[kernel](line1, line2), False
+
+
+def score_line_pairs(lines1, lines2, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False,
+                     sentence_differences=None, stats=None):
+    """
+    Score many line pairs with a kernel
+
+    Equal lines score 1.0 without calling the kernel, and pairs over
+    max_cost are scored with word_overlap_ratio. When the kernel has a
+    batch implementation and at least BATCH_MIN_PAIRS of the remaining
+    pairs differ, they are scored in one batch call; otherwise one pair
+    at a time. With segment set, long pairs are scored sentence by
+    sentence first (see line_similarity).
+
+    Args:
+        lines1 (list): First line of each pair
+        lines2 (list): Second line of each pair, same length as lines1
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per pair (None for no cap)
+        segment (bool): Split pairs longer than SEGMENT_MIN_LENGTH into sentences
+        sentence_differences (dict): Optional dict receiving, for each pair
+            scored sentence by sentence with changed sentences, its index ->
+            list of differences (see line_similarity)
+        stats (dict): Optional dict receiving 'batched', True when the
+            differing pairs were scored with the batch implementation
+
+    Returns:
+        tuple: (similarities, approximate) where similarities lists the
+            similarity per pair (0-1) and approximate the indices of the
+            pairs scored approximately
+    """
+    ratio = LINE_KERNELS[kernel]
+    batch_ratios = BATCH_KERNELS.get(kernel)
+    cost = KERNEL_COSTS.get(kernel, quadratic_cost)
+    similarities = [1.0 if line1 == line2 else None for line1, line2 in zip(lines1, lines2)]
+    approximate = []
+    for i, similarity in enumerate(similarities):
+        if similarity is not None:
+            continue
+        if segment and max(len(lines1[i]), len(lines2[i])) > SEGMENT_MIN_LENGTH:
+            sentences = []
+            similarities[i], segment_approximate = line_similarity(lines1[i], lines2[i], kernel, max_cost, True,
+                                                                   sentences)
+            if segment_approximate:
+                approximate.append(i)
+            if sentences and sentence_differences is not None:
+                sentence_differences[i] = sentences
+        elif max_cost is not None and cost(lines1[i], lines2[i]) > max_cost:
+            similarities[i] = word_overlap_ratio(lines1[i], lines2[i])
+            approximate.append(i)
+    differing = [i for i, similarity in enumerate(similarities) if similarity is None]
+    batched = batch_ratios is not None and len(differing) >= BATCH_MIN_PAIRS
+    if stats is not None:
+        stats['batched'] = batched
+    if batched:
+        scores = batch_ratios([lines1[i] for i in differing], [lines2[i] for i in differing])
+    else:
+        scores = [ratio(lines1[i], lines2[i]) for i in differing]
+    for i, similarity in zip(differing, scores):
+        similarities[i] = similarity
+    return similarities, approximate
+
+
+def iter_line_similarities(lines1, lines2, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False,
+                           sentence_differences=None):
+    """
+    Score two lists of lines position by position
+
+    Kernels listed in BATCH_KERNELS score large files a chunk of positions
+    at a time with score_line_pairs; otherwise every pair is scored as it
+    is yielded.
+
+    Args:
+        lines1 (list): Lines of the first file
+        lines2 (list): Lines of the second file
+        kernel (str): Name of the line similarity kernel (see LINE_KERNELS)
+        max_cost (int): Cost cap per line pair (see line_similarity)
+        segment (bool): Score long lines sentence by sentence (see line_similarity)
+        sentence_differences (dict): Optional dict receiving line_index ->
+            changed sentences of the lines scored sentence by sentence,
+            filled before the line is yielded
+
+    Yields:
+        tuple: (line_index, line1, line2, similarity, approximate) with
+            similarity in 0-1
+    """
+    total = max(len(lines1), len(lines2))
+
+    if kernel not in BATCH_KERNELS or total < BATCH_MIN_PAIRS:
+        for i in range(total):
+            line1 = lines1[i].strip() if i < len(lines1) else ''
+            line2 = lines2[i].strip() if i < len(lines2) else ''
+            sentences = [] if sentence_differences is not None else None
+            scored = line_similarity(line1, line2, kernel, max_cost, segment, sentences)
+            if sentences and sentence_differences is not None:
+                sentence_differences[i] = sentences
+            yield (i, line1, line2) + scored
+        return
+
+    for start in range(0, total, BATCH_CHUNK_LINES):
+        positions = range(start, min(start + BATCH_CHUNK_LINES, total))
+        chunk1 = [lines1[i].strip() if i < len(lines1) else '' for i in positions]
+        chunk2 = [lines2[i].strip() if i < len(lines2) else '' for i in positions]
+        chunk_sentences = {} if sentence_differences is not None else None
+        similarities, approximate = score_line_pairs(chunk1, chunk2, kernel, max_cost, segment, chunk_sentences)
+        if chunk_sentences:
+            sentence_differences.update((start + offset, sentences) for offset, sentences in chunk_sentences.items())
+        approximate = set(approximate)
+        for offset, (line1, line2, similarity) in enumerate(zip(chunk1, chunk2, similarities)):
+            yield start + offset, line1, line2, similarity, offset in approximate
+
+
+def compare_lines(lines1, lines2, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Compare two lists of lines without printing anything
+
+    Returns:
+        tuple: (average similarity percentage, number of differing lines)
+    """
+    total_similarity = 0
+    lines_compared = 0
+    differences_count = 0
+
+    for _, _, _, similarity, _ in iter_line_similarities(lines1, lines2, kernel, max_cost, segment):
+        total_similarity += similarity
+        lines_compared += 1
+        if similarity < 1.0:
+            differences_count += 1
+
+    if lines_compared == 0:
+        return 0.0, 0
+
+    return round(total_similarity / lines_compared * 100, 2), differences_count
+
+
+def collect_line_differences(lines1, lines2, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Compare two lists of lines and keep every differing line
+
+    Returns:
+        tuple: (average similarity percentage, list of
+            (line_num, line1, line2, similarity percentage, approximate) tuples)
+    """
+    total_similarity = 0
+    lines_compared = 0
+    differences = []
+
+    for i, line1, line2, similarity, approximate in iter_line_similarities(lines1, lines2, kernel, max_cost, segment):
+        total_similarity += similarity
+        lines_compared += 1
+        if similarity < 1.0:
+            differences.append((i + 1, line1, line2, round(similarity * 100, 2), approximate))
+
+    if lines_compared == 0:
+        return 0.0, differences
+
+    return round(total_similarity / lines_compared * 100, 2), differences
+
+
+def file_digest(file_path):
+    """Return the SHA-256 hex digest of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(DIGEST_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_state(file_path):
+    """Return the size, modification time and digest identifying a file version"""
+    stat = os.stat(file_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': file_digest(file_path)}
+
+
+def file_state_matches(file_path, state):
+    """
+    Check whether a file still has the version described by file_state
+
+    Size and modification time are checked first; the digest is only
+    recomputed when the size matches but the file was touched.
+    """
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+    if stat.st_size != state['size']:
+        return False
+    if stat.st_mtime_ns == state['mtime_ns']:
+        return True
+    return file_digest(file_path) == state['digest']
+
+
+def read_file_pair(file1, file2, check_identical=False, use_cache=False, record_inputs=False):
+    """
+    Read both files of a pair and start its summary record
+
+    This is the I/O half of compare_file_pair; it never raises, errors are
+    reported in the record instead.
+
+    Args:
+        file1 (str): Path to first file
+        file2 (str): Path to second file
+        check_identical (bool): Skip extraction when both files have the same
+            size and digest
+        use_cache (bool): Reuse extractions of files seen earlier in this process
+        record_inputs (bool): Add an 'inputs' key with the file_state of both files
+
+    Returns:
+        tuple: (record, lines1, lines2); the lines are None when the record
+            is already final (identical files or an error)
+    """
+    record = {
+        'file1': str(file1),
+        'file2': str(file2),
+        'similarity': None,
+        'differences': None,
+        'lines1': None,
+        'lines2': None,
+        'identical': False,
+        'error': None,
+        'containment_1_in_2': None,
+        'containment_2_in_1': None,
+        'jaccard': None,
+    }
+
+    try:
+        if record_inputs:
+            states = [file_state(file1), file_state(file2)]
+            record['inputs'] = states
+            same_content = states[0]['digest'] == states[1]['digest']
+        elif check_identical:
+            same_content = (os.path.getsize(file1) == os.path.getsize(file2)
+                            and file_digest(file1) == file_digest(file2))
+        else:
+            same_content = False
+
+        if check_identical and same_content:
+            record.update(similarity=100.0, differences=0, identical=True, containment_1_in_2=100.0,
+                          containment_2_in_1=100.0, jaccard=100.0)
+            return record, None, None
+
+        extract = extract_text_cached if use_cache else extract_text_from_file
+        return record, extract(file1), extract(file2)
+    except Exception as e:
+        record['error'] = str(e)
+        return record, None, None
+
+
+def compare_file_pair(file1, file2, check_identical=False, use_cache=False, record_inputs=False,
+                      kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Compare two files and return a summary record
+
+    Designed to run in worker processes: never raises, errors are reported
+    in the record instead. Arguments are the same as read_file_pair, plus
+    the name of the line similarity kernel, the cost cap per line pair and
+    whether long lines are scored sentence by sentence.
+
+    Returns:
+        dict: file1, file2, similarity, differences, lines1, lines2,
+            identical and error, plus the shingle overlap keys of
+            read_file_pair (only set for identical files here)
+    """
+    record, lines1, lines2 = read_file_pair(file1, file2, check_identical, use_cache, record_inputs)
+    if lines1 is not None:
+        similarity, differences_count = compare_lines(lines1, lines2, kernel, max_cost, segment)
+        record.update(similarity=similarity, differences=differences_count,
+                      lines1=len(lines1), lines2=len(lines2))
+    return record
@@ -1,9 +1,19 @@
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, scrolledtext
-from difflib import SequenceMatcher
+from tkinter import ttk, filedialog, messagebox
 import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from comparison_result import ComparisonResult
+from diff_engine import DEFAULT_KERNEL, LINE_KERNELS, score_line_pairs
+from fingerprints import overlap_scores
+from html_report import write_html_report
+from results_view import SideBySideView, SimilarityMinimap, VirtualResultsView
+
 # Import for Word document support
 try:
     from docx import Document
@@ -11,6 +21,25 @@ try:
 except ImportError:
     DOCX_AVAILABLE = False
 
+# How often the worker thread's progress is drained on the Tk main thread (ms)
+PROGRESS_POLL_INTERVAL = 50
+
+# Number of progress updates reported by the engine over a whole comparison
+PROGRESS_STEPS = 200
+
+# Delay before a typed path is prefetched, so extraction does not start on every keystroke (ms)
+PREFETCH_DELAY = 400
+
+# Number of extracted files kept in memory
+EXTRACTION_CACHE_SIZE = 4
+
+# Delay before filter changes are applied to the results view (ms)
+FILTER_DELAY = 150
+
+
+class ComparisonCancelled(Exception):
+    """Raised by the comparison engine when the user cancels a comparison"""
+
 
 class DiffMatcher:
     def __init__(self, root):
@@ -23,7 +52,42 @@ class DiffMatcher:
         self.file1_path = tk.StringVar()
         self.file2_path = tk.StringVar()
         
+        # Line similarity metric used by the next comparison
+        self.kernel_var = tk.StringVar(value=DEFAULT_KERNEL)
+        
+        # Whether long paragraphs are scored sentence by sentence
+        self.segment_var = tk.BooleanVar(value=False)
+        
+        # Last comparison, kept for exporting reports
+        self.last_comparison = None
+        
+        # Background comparison state
+        self.worker_thread = None
+        self.worker_queue = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.comparison_started = None
+        
+        # Files are extracted in the background as soon as they are selected,
+        # so a comparison usually only has to score the cached lines
+        self.prefetch_executor = ThreadPoolExecutor(max_workers=2)
+        self.extraction_cache = OrderedDict()
+        self.extraction_lock = threading.Lock()
+        self.prefetch_jobs = {}
+        
+        # Result filters, applied in memory to the last comparison
+        self.filter_similarity_var = tk.StringVar(value="100")
+        self.hide_whitespace_var = tk.BooleanVar(value=False)
+        self.search_var = tk.StringVar()
+        self.filter_status_var = tk.StringVar()
+        self.filter_job = None
+        
         self.create_widgets()
+        
+        self.file1_path.trace_add('write', lambda *args: self.schedule_prefetch(self.file1_path))
+        self.file2_path.trace_add('write', lambda *args: self.schedule_prefetch(self.file2_path))
+        for filter_var in (self.filter_similarity_var, self.hide_whitespace_var, self.search_var):
+            filter_var.trace_add('write', lambda *args: self.schedule_filter())
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def create_widgets(self):
         """Create and arrange all GUI widgets"""
@@ -69,35 +133,80 @@ class DiffMatcher:
         buttons_frame.grid(row=3, column=0, columnspan=3, pady=20)
         
         # Compare button
-        compare_btn = ttk.Button(buttons_frame, text="Compare Files", 
-                               command=self.compare_files, style="Accent.TButton")
-        compare_btn.pack(side=tk.LEFT, padx=5)
+        self.compare_btn = ttk.Button(buttons_frame, text="Compare Files", 
+                                    command=self.compare_files, style="Accent.TButton")
+        self.compare_btn.pack(side=tk.LEFT, padx=5)
+        
+        # Cancel button (enabled while a comparison is running)
+        self.cancel_btn = ttk.Button(buttons_frame, text="Cancel", 
+                                   command=self.cancel_comparison, state=tk.DISABLED)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
         
         # Clear button
         clear_btn = ttk.Button(buttons_frame, text="Clear Results", 
                              command=self.clear_results)
         clear_btn.pack(side=tk.LEFT, padx=5)
         
+        # Export HTML report button
+        export_btn = ttk.Button(buttons_frame, text="Export HTML Report", 
+                              command=self.export_html_report)
+        export_btn.pack(side=tk.LEFT, padx=5)
+        
         # Create sample files button
         sample_btn = ttk.Button(buttons_frame, text="Create Sample Files", 
                               command=self.create_sample_files)
         sample_btn.pack(side=tk.LEFT, padx=5)
         
+        # Line similarity metric selector
+        ttk.Label(buttons_frame, text="Metric:").pack(side=tk.LEFT, padx=(15, 0))
+        ttk.Combobox(buttons_frame, textvariable=self.kernel_var, values=sorted(LINE_KERNELS),
+                     state="readonly", width=12).pack(side=tk.LEFT, padx=5)
+        ttk.Checkbutton(buttons_frame, text="Split long paragraphs",
+                        variable=self.segment_var).pack(side=tk.LEFT, padx=5)
+        
         # Results area
         results_frame = ttk.LabelFrame(main_frame, text="Comparison Results", padding="10")
         results_frame.grid(row=4, column=0, columnspan=3, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(10, 0))
         results_frame.columnconfigure(0, weight=1)
-        results_frame.rowconfigure(0, weight=1)
+        results_frame.rowconfigure(2, weight=1)
+        
+        # Text widget for the summary
+        self.results_text = tk.Text(results_frame, 
+                                    wrap=tk.WORD, 
+                                    height=10,
+                                    font=("Consolas", 10))
+        self.results_text.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        
+        # Filter bar for the list of differences
+        filter_frame = ttk.Frame(results_frame)
+        filter_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+        ttk.Label(filter_frame, text="Similarity below:").pack(side=tk.LEFT)
+        ttk.Spinbox(filter_frame, from_=0, to=100, increment=5, width=5,
+                    textvariable=self.filter_similarity_var).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(filter_frame, text="%").pack(side=tk.LEFT, padx=(2, 10))
+        ttk.Checkbutton(filter_frame, text="Hide whitespace-only changes",
+                        variable=self.hide_whitespace_var).pack(side=tk.LEFT, padx=(0, 10))
+        ttk.Label(filter_frame, text="Search:").pack(side=tk.LEFT)
+        ttk.Entry(filter_frame, textvariable=self.search_var, width=25).pack(side=tk.LEFT, padx=5)
+        ttk.Label(filter_frame, textvariable=self.filter_status_var,
+                  foreground="#666").pack(side=tk.RIGHT)
         
-        # Text widget for results
-        self.results_text = scrolledtext.ScrolledText(results_frame, 
-                                                     wrap=tk.WORD, 
-                                                     height=20,
-                                                     font=("Consolas", 10))
-        self.results_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        # Result views: virtualized list of differences and side-by-side panes
+        results_notebook = ttk.Notebook(results_frame)
+        results_notebook.grid(row=2, column=0, sticky=(tk.W, tk.E, tk.N, tk.S), pady=(5, 0))
+        
+        self.results_view = VirtualResultsView(results_notebook)
+        results_notebook.add(self.results_view, text="Differences")
+        
+        self.side_by_side_view = SideBySideView(results_notebook)
+        results_notebook.add(self.side_by_side_view, text="Side by side")
+        
+        # Similarity overview of the whole document; click to jump
+        self.minimap = SimilarityMinimap(results_frame, on_jump=self.jump_to_line)
+        self.minimap.grid(row=2, column=1, sticky=(tk.N, tk.S), padx=(5, 0), pady=(5, 0))
         
         # Progress bar
-        self.progress = ttk.Progressbar(main_frame, mode='indeterminate')
+        self.progress = ttk.Progressbar(main_frame, mode='determinate', maximum=100)
         self.progress.grid(row=5, column=0, columnspan=3, sticky=(tk.W, tk.E), pady=(10, 0))
         
         # Status bar
@@ -203,43 +312,110 @@ class DiffMatcher:
         except Exception as e:
             raise Exception(f"Error reading file {file_path}: {str(e)}")
     
-    def compare_files_line_by_line(self, file1, file2):
+    def _cache_key(self, file_path):
+        """Identify a file version by its absolute path, size and modification time"""
+        stat = os.stat(file_path)
+        return (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    
+    def _extraction_future(self, file_path):
+        """Return the cached extraction job for a file, starting one if needed"""
+        key = self._cache_key(file_path)
+        with self.extraction_lock:
+            future = self.extraction_cache.get(key)
+            if future is None:
+                future = self.prefetch_executor.submit(self.extract_text_from_file, file_path)
+                self.extraction_cache[key] = future
+                while len(self.extraction_cache) > EXTRACTION_CACHE_SIZE:
+                    self.extraction_cache.popitem(last=False)
+            else:
+                self.extraction_cache.move_to_end(key)
+            return future
+    
+    def get_file_lines(self, file_path):
+        """
+        Return the extracted lines of a file, reusing a prefetched extraction
+        
+        Blocks until a prefetch that is still running has finished.
+        Failed extractions are dropped from the cache so they can be retried.
+        """
+        future = self._extraction_future(file_path)
+        try:
+            return future.result()
+        except Exception:
+            with self.extraction_lock:
+                for key, cached in list(self.extraction_cache.items()):
+                    if cached is future:
+                        del self.extraction_cache[key]
+            raise
+    
+    def schedule_prefetch(self, file_var):
+        """Prefetch the file in a path variable once the user stops typing"""
+        job = self.prefetch_jobs.pop(str(file_var), None)
+        if job is not None:
+            self.root.after_cancel(job)
+        self.prefetch_jobs[str(file_var)] = self.root.after(
+            PREFETCH_DELAY, lambda: self.prefetch_file(file_var.get())
+        )
+    
+    def prefetch_file(self, file_path):
+        """Start extracting a file in the background; errors surface when comparing"""
+        if file_path and os.path.isfile(file_path):
+            try:
+                self._extraction_future(file_path)
+            except OSError:
+                pass
+    
+    def compare_files_line_by_line(self, file1, file2, progress_callback=None, cancel_event=None,
+                                   kernel=DEFAULT_KERNEL, segment=False):
         """
         Compare two files line by line and return detailed results
         Based on the original function with GUI integration and multi-format support
+        
+        Args:
+            file1 (str): Path to first file
+            file2 (str): Path to second file
+            progress_callback (callable): Optional callback receiving
+                (lines_processed, total_lines) while scoring
+            cancel_event (threading.Event): Optional event that stops the
+                comparison with ComparisonCancelled when set
+            kernel (str): Name of the line similarity metric (see LINE_KERNELS)
+            segment (bool): Score long paragraphs sentence by sentence
         """
         try:
-            lines1 = self.extract_text_from_file(file1)
-            lines2 = self.extract_text_from_file(file2)
+            lines1 = self.get_file_lines(file1)
+            lines2 = self.get_file_lines(file2)
         except Exception as e:
             raise Exception(f"Error reading files: {str(e)}")
 
-        total_similarity = 0
-        lines_compared = 0
-        differences = []
+        result = ComparisonResult(lines1, lines2)
 
         max_lines = max(len(lines1), len(lines2))
+        progress_step = max(1, max_lines // PROGRESS_STEPS)
+
+        # Lines are scored a progress step at a time, so metrics with a batch
+        # implementation can vectorize each step
+        for start in range(0, max_lines, progress_step):
+            if cancel_event is not None and cancel_event.is_set():
+                raise ComparisonCancelled()
+            if progress_callback is not None:
+                progress_callback(start, max_lines)
 
-        for i in range(max_lines):
-            line1 = lines1[i].strip() if i < len(lines1) else ''
-            line2 = lines2[i].strip() if i < len(lines2) else ''
-            similarity = SequenceMatcher(None, line1, line2).ratio()
-            total_similarity += similarity
-            lines_compared += 1
+            positions = range(start, min(start + progress_step, max_lines))
+            chunk1 = [lines1[i].strip() if i < len(lines1) else '' for i in positions]
+            chunk2 = [lines2[i].strip() if i < len(lines2) else '' for i in positions]
+            similarities, approximate = score_line_pairs(chunk1, chunk2, kernel, segment=segment)
+            approximate = set(approximate)
+            for offset, similarity in enumerate(similarities):
+                result.add_line(similarity, offset in approximate)
 
-            if similarity < 1.0:
-                differences.append({
-                    'line_num': i + 1,
-                    'line1': line1,
-                    'line2': line2,
-                    'similarity': round(similarity * 100, 2)
-                })
+        result.overlap = overlap_scores(lines1, lines2)
 
-        if lines_compared == 0:
-            return 0.0, differences, 0, 0
+        if progress_callback is not None:
+            progress_callback(max_lines, max_lines)
 
-        avg_similarity = (total_similarity / lines_compared) * 100
-        return round(avg_similarity, 2), differences, len(lines1), len(lines2)
+        # Differences are returned as a ComparisonResult, which behaves like a
+        # list of difference dicts but is rendered lazily by the results view
+        return result.similarity, result, len(lines1), len(lines2)
     
     def compare_files(self):
         """Compare the selected files and display results"""
@@ -259,30 +435,116 @@ class DiffMatcher:
             messagebox.showerror("Error", f"File 2 does not exist: {file2}")
             return
         
-        # Start progress bar
-        self.progress.start()
-        self.status_var.set("Comparing files...")
-        self.root.update()
+        # Run the comparison in a worker thread so the window stays responsive
+        self.cancel_event.clear()
+        self.comparison_started = time.monotonic()
+        self.progress['value'] = 0
+        self.compare_btn.config(state=tk.DISABLED)
+        self.cancel_btn.config(state=tk.NORMAL)
+        self.status_var.set("Reading files...")
+        
+        self.worker_thread = threading.Thread(
+            target=self._run_comparison, args=(file1, file2, self.kernel_var.get(), self.segment_var.get()),
+            daemon=True
+        )
+        self.worker_thread.start()
+        self.root.after(PROGRESS_POLL_INTERVAL, self._poll_worker)
+    
+    def _run_comparison(self, file1, file2, kernel=DEFAULT_KERNEL, segment=False):
+        """Worker thread body; reports back to the main thread through worker_queue"""
+        def report_progress(done, total):
+            self.worker_queue.put(('progress', done, total))
+        
+        try:
+            result = self.compare_files_line_by_line(
+                file1, file2,
+                progress_callback=report_progress,
+                cancel_event=self.cancel_event,
+                kernel=kernel,
+                segment=segment
+            )
+            self.worker_queue.put(('done', file1, file2, result))
+        except ComparisonCancelled:
+            self.worker_queue.put(('cancelled',))
+        except Exception as e:
+            self.worker_queue.put(('error', e))
+    
+    def _poll_worker(self):
+        """Apply queued worker messages on the Tk main thread"""
+        finished = False
+        latest_progress = None
         
         try:
-            # Perform comparison
-            similarity, differences, lines1_count, lines2_count = self.compare_files_line_by_line(file1, file2)
+            while True:
+                message = self.worker_queue.get_nowait()
+                if message[0] == 'progress':
+                    # Only the most recent progress update matters
+                    latest_progress = message
+                else:
+                    finished = True
+                    self._finish_comparison(message)
+        except queue.Empty:
+            pass
+        
+        if not finished:
+            if latest_progress is not None:
+                self._update_progress(latest_progress[1], latest_progress[2])
+            self.root.after(PROGRESS_POLL_INTERVAL, self._poll_worker)
+    
+    def _update_progress(self, done, total):
+        """Show determinate progress and an ETA for the running comparison"""
+        percent = (done / total * 100) if total else 100
+        self.progress['value'] = percent
+        
+        elapsed = time.monotonic() - self.comparison_started
+        if done and done < total:
+            remaining = elapsed / done * (total - done)
+            eta = f" - about {remaining:.0f}s remaining" if remaining >= 1 else " - almost done"
+        else:
+            eta = ""
+        self.status_var.set(f"Comparing files... {done}/{total} lines ({percent:.0f}%){eta}")
+    
+    def _finish_comparison(self, message):
+        """Handle the final message from the worker thread"""
+        self.worker_thread = None
+        self.compare_btn.config(state=tk.NORMAL)
+        self.cancel_btn.config(state=tk.DISABLED)
+        
+        if message[0] == 'done':
+            file1, file2, (similarity, differences, lines1_count, lines2_count) = message[1:]
+            self.progress['value'] = 100
             
             # Display results
+            self.last_comparison = (file1, file2, similarity, differences, lines1_count, lines2_count)
             self.display_results(file1, file2, similarity, differences, lines1_count, lines2_count)
             
-            self.status_var.set(f"Comparison complete - {similarity}% similarity")
-            
-        except Exception as e:
-            messagebox.showerror("Error", f"An error occurred during comparison:\n{str(e)}")
-            self.status_var.set("Error occurred during comparison")
+            elapsed = time.monotonic() - self.comparison_started
+            self.status_var.set(f"Comparison complete - {similarity}% similarity ({elapsed:.1f}s)")
+        
+        elif message[0] == 'cancelled':
+            self.progress['value'] = 0
+            self.status_var.set("Comparison cancelled")
         
-        finally:
-            # Stop progress bar
-            self.progress.stop()
+        else:
+            self.progress['value'] = 0
+            messagebox.showerror("Error", f"An error occurred during comparison:\n{str(message[1])}")
+            self.status_var.set("Error occurred during comparison")
+    
+    def on_close(self):
+        """Stop background work and close the window"""
+        self.cancel_event.set()
+        self.prefetch_executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+    
+    def cancel_comparison(self):
+        """Ask the running comparison to stop"""
+        if self.worker_thread is not None:
+            self.cancel_event.set()
+            self.cancel_btn.config(state=tk.DISABLED)
+            self.status_var.set("Cancelling comparison...")
     
     def display_results(self, file1, file2, similarity, differences, lines1_count, lines2_count):
-        """Display comparison results in the text widget"""
+        """Display the summary and hand the differences to the virtualized view"""
         self.results_text.delete(1.0, tk.END)
         
         # Header
@@ -294,7 +556,14 @@ class DiffMatcher:
         result_text += f"   • File 1 lines: {lines1_count}\n"
         result_text += f"   • File 2 lines: {lines2_count}\n"
         result_text += f"   • Average similarity: {similarity}%\n"
-        result_text += f"   • Differences found: {len(differences)}\n\n"
+        if differences.overlap is not None:
+            result_text += f"   • Text of file 1 found in file 2: {differences.overlap['containment_1_in_2']}%\n"
+            result_text += f"   • Text of file 2 found in file 1: {differences.overlap['containment_2_in_1']}%\n"
+            result_text += f"   • Shared text overall (Jaccard): {differences.overlap['jaccard']}%\n"
+        result_text += f"   • Differences found: {len(differences)}\n"
+        if differences.approximate:
+            result_text += f"   • Lines scored approximately (too long for the metric): {len(differences.approximate)}\n"
+        result_text += "\n"
         
         # Overall assessment
         if similarity >= 95:
@@ -306,23 +575,98 @@ class DiffMatcher:
         else:
             result_text += f"❌ Files are significantly different.\n\n"
         
-        # Detailed differences
+        # Detailed differences are rendered on demand by the results view
         if differences:
-            result_text += f"🛑 DETAILED DIFFERENCES:\n"
-            result_text += f"-" * 30 + "\n\n"
-            
-            for diff in differences:  # Show all differences
-                result_text += f"Line {diff['line_num']} (Similarity: {diff['similarity']}%):\n"
-                result_text += f"  File 1: {diff['line1'] or '(empty line)'}\n"
-                result_text += f"  File 2: {diff['line2'] or '(empty line)'}\n\n"
+            result_text += f"🛑 DETAILED DIFFERENCES: see the list below\n"
         else:
             result_text += f"✨ No differences found - files are identical!\n"
         
         self.results_text.insert(1.0, result_text)
+        self.apply_filters(differences)
+        self.side_by_side_view.set_result(differences)
+        self.minimap.set_result(differences)
+        
+        # Build the search index in the background so the first search is instant
+        self.prefetch_executor.submit(differences.build_search_index)
+    
+    def jump_to_line(self, line_num):
+        """Show a 1-based line number in both result views"""
+        self.results_view.show_line(line_num)
+        self.side_by_side_view.show_line(line_num)
+        self.status_var.set(f"Showing line {line_num}")
+    
+    def schedule_filter(self):
+        """Re-filter the results shortly after the filter controls change"""
+        if self.filter_job is not None:
+            self.root.after_cancel(self.filter_job)
+        self.filter_job = self.root.after(FILTER_DELAY, self.apply_filters)
+    
+    def apply_filters(self, differences=None):
+        """Show the differences of the last comparison that match the filter bar"""
+        self.filter_job = None
+        if differences is None:
+            if self.last_comparison is None:
+                return
+            differences = self.last_comparison[3]
+        
+        try:
+            max_similarity = float(self.filter_similarity_var.get())
+        except ValueError:
+            max_similarity = 100.0
+        hide_whitespace = self.hide_whitespace_var.get()
+        search_text = self.search_var.get().strip()
+        
+        if max_similarity >= 100 and not hide_whitespace and not search_text:
+            self.results_view.set_source(differences)
+            self.filter_status_var.set("")
+            return
+        
+        started = time.monotonic()
+        filtered = differences.filter(
+            max_similarity=max_similarity if max_similarity < 100 else None,
+            hide_whitespace=hide_whitespace,
+            text=search_text or None
+        )
+        elapsed_ms = (time.monotonic() - started) * 1000
+        
+        self.results_view.set_source(filtered)
+        self.filter_status_var.set(
+            f"Showing {len(filtered):,} of {len(differences):,} differences ({elapsed_ms:.0f} ms)"
+        )
+    
+    def export_html_report(self):
+        """Save the last comparison as an HTML report"""
+        if self.last_comparison is None:
+            messagebox.showerror("Error", "Please compare two files before exporting a report")
+            return
+        
+        file1, file2 = self.last_comparison[:2]
+        filename = filedialog.asksaveasfilename(
+            title="Save HTML report",
+            defaultextension=".html",
+            initialfile=f"{Path(file1).stem}_vs_{Path(file2).stem}.html",
+            filetypes=[("HTML files", "*.html"), ("All files", "*.*")]
+        )
+        if not filename:
+            return
+        
+        try:
+            self.status_var.set("Writing HTML report...")
+            self.root.update()
+            write_html_report(filename, *self.last_comparison)
+            self.status_var.set(f"HTML report saved to {Path(filename).name}")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to write HTML report:\n{str(e)}")
+            self.status_var.set("Error occurred while writing report")
     
     def clear_results(self):
         """Clear the results area"""
         self.results_text.delete(1.0, tk.END)
+        self.results_view.clear()
+        self.side_by_side_view.clear()
+        self.minimap.set_result(None)
+        self.filter_status_var.set("")
+        self.last_comparison = None
         self.file1_path.set("")
         self.file2_path.set("")
         self.status_var.set("Ready to compare files")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Directory Comparison
+Pairs files from two directory trees by relative path and compares the
+pairs in a pool of worker processes
+Unpaired files are matched by content to detect renames and moves
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from batch_compare import compare_pairs, score_file_pair
+from diff_engine import DEFAULT_KERNEL, MAX_PAIR_COST
+from fingerprints import MinHashLSH, estimate_jaccard, file_signature
+
+# Minimum engine similarity for an unpaired file to count as renamed
+RENAME_THRESHOLD = 50.0
+
+# Candidates per unpaired file that are confirmed with the full engine
+MAX_RENAME_CANDIDATES = 3
+
+
+def collect_files(root):
+    """
+    List all files below a directory
+
+    Args:
+        root (str): Directory to walk
+
+    Returns:
+        dict: Relative POSIX path -> absolute Path, in sorted order
+    """
+    root = Path(root)
+    files = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            path = Path(dirpath) / filename
+            files[path.relative_to(root).as_posix()] = path
+    return files
+
+
+def pair_directories(dir1, dir2):
+    """
+    Pair the files of two directory trees by relative path
+
+    Returns:
+        tuple: (pairs, only_in_dir1, only_in_dir2) where pairs is a list of
+            (relative_path, path1, path2) and the others are lists of
+            relative paths
+    """
+    files1 = collect_files(dir1)
+    files2 = collect_files(dir2)
+
+    pairs = [(rel, files1[rel], files2[rel]) for rel in files1 if rel in files2]
+    only_in_dir1 = [rel for rel in files1 if rel not in files2]
+    only_in_dir2 = [rel for rel in files2 if rel not in files1]
+    return pairs, only_in_dir1, only_in_dir2
+
+
+def compare_directories(pairs, workers=None, journal=None, io_threads=None,
+                        collect_differences=False, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Compare paired files with the read/score pipeline, yielding records as they finish
+
+    Pairs with equal size and digest are reported as identical without
+    being extracted.
+
+    Args:
+        pairs (list): (relative_path, path1, path2) tuples from pair_directories
+        workers (int): Number of worker processes (default: CPU count)
+        journal (ResultJournal): Optional journal for checkpoint and resume
+        io_threads (int): Number of reader threads
+        collect_differences (bool): Add the per-line differences to each record
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+
+    Yields:
+        dict: compare_file_pair record with an added 'path' key
+    """
+    if not pairs:
+        return
+
+    keyed_pairs = ((rel, str(path1), str(path2)) for rel, path1, path2 in pairs)
+    for rel, record in compare_pairs(keyed_pairs, workers=workers, journal=journal,
+                                     io_threads=io_threads, collect_differences=collect_differences,
+                                     kernel=kernel, max_cost=max_cost, segment=segment):
+        record['path'] = rel
+        yield record
+
+
+def detect_renames(dir1, dir2, only_in_dir1, only_in_dir2, workers=None,
+                   threshold=RENAME_THRESHOLD, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Match files that only exist on one side by content similarity
+
+    MinHash signatures of all unpaired files are computed in parallel and
+    indexed with LSH, so each file from dir1 is only checked against the few
+    files from dir2 that share a signature band. The best candidates are then
+    confirmed with the full line-by-line engine and matched greedily, best
+    similarity first.
+
+    Args:
+        dir1 (str): First directory
+        dir2 (str): Second directory
+        only_in_dir1 (list): Relative paths without a counterpart in dir2
+        only_in_dir2 (list): Relative paths without a counterpart in dir1
+        workers (int): Number of worker processes (default: CPU count)
+        threshold (float): Minimum engine similarity percentage for a rename
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+
+    Returns:
+        tuple: (records, still_only_in_dir1, still_only_in_dir2) where each
+            record is a compare_file_pair record with the shingle overlap
+            scores and 'path', 'renamed_from' and 'renamed_to' keys
+    """
+    if not only_in_dir1 or not only_in_dir2:
+        return [], list(only_in_dir1), list(only_in_dir2)
+
+    dir1, dir2 = Path(dir1), Path(dir2)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        paths1 = [str(dir1 / rel) for rel in only_in_dir1]
+        paths2 = [str(dir2 / rel) for rel in only_in_dir2]
+        signatures1 = list(executor.map(file_signature, paths1, chunksize=16))
+        signatures2 = list(executor.map(file_signature, paths2, chunksize=16))
+
+        lsh = MinHashLSH()
+        for index, signature in enumerate(signatures2):
+            if signature is not None:
+                lsh.insert(index, signature)
+
+        futures = {}
+        for index1, signature1 in enumerate(signatures1):
+            if signature1 is None:
+                continue
+            ranked = sorted(
+                ((estimate_jaccard(signature1, signatures2[index2]), index2)
+                 for index2 in lsh.query(signature1)),
+                reverse=True
+            )
+            for _, index2 in ranked[:MAX_RENAME_CANDIDATES]:
+                future = executor.submit(score_file_pair, paths1[index1], paths2[index2], True,
+                                         kernel=kernel, max_cost=max_cost, segment=segment)
+                futures[future] = (index1, index2)
+
+        confirmed = []
+        for future in as_completed(futures):
+            record = future.result()
+            if record['error'] is None and record['similarity'] >= threshold:
+                confirmed.append((record['similarity'], futures[future], record))
+
+    records = []
+    matched1 = set()
+    matched2 = set()
+    for _, (index1, index2), record in sorted(confirmed, key=lambda item: item[0], reverse=True):
+        if index1 in matched1 or index2 in matched2:
+            continue
+        matched1.add(index1)
+        matched2.add(index2)
+        record['renamed_from'] = only_in_dir1[index1]
+        record['renamed_to'] = only_in_dir2[index2]
+        record['path'] = f"{only_in_dir1[index1]} → {only_in_dir2[index2]}"
+        records.append(record)
+
+    still_only_in_dir1 = [rel for index, rel in enumerate(only_in_dir1) if index not in matched1]
+    still_only_in_dir2 = [rel for index, rel in enumerate(only_in_dir2) if index not in matched2]
+    return records, still_only_in_dir1, still_only_in_dir2
+
+
+def summarize_directory_results(records, only_in_dir1, only_in_dir2):
+    """
+    Build the overall totals of a directory comparison
+
+    Returns:
+        dict: compared, identical, renamed, errors, only_in_dir1,
+            only_in_dir2, differences and average similarity over the
+            compared files
+    """
+    scored = [record for record in records if record['error'] is None]
+    similarities = [record['similarity'] for record in scored]
+
+    return {
+        'compared': len(scored),
+        'identical': sum(1 for record in scored if record['similarity'] == 100.0),
+        'renamed': sum(1 for record in scored if 'renamed_from' in record),
+        'errors': len(records) - len(scored),
+        'only_in_dir1': len(only_in_dir1),
+        'only_in_dir2': len(only_in_dir2),
+        'differences': sum(record['differences'] for record in scored),
+        'similarity': round(sum(similarities) / len(similarities), 2) if similarities else 0.0,
+    }
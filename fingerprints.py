@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Fingerprints - Cheap content fingerprints for candidate search
+MinHash signatures over line shingles estimate how similar two documents are
+without comparing them, and LSH banding finds likely matches without
+looking at every pair
+"""
+
+import hashlib
+import random
+
+from diff_engine import WORD_PATTERN, extract_text_from_file
+
+# Number of consecutive lines in a shingle
+SHINGLE_SIZE = 2
+
+# Number of consecutive words in a word shingle
+WORD_SHINGLE_SIZE = 5
+
+# MinHash signature length; must equal LSH_BANDS * LSH_ROWS
+NUM_PERMUTATIONS = 64
+
+# 16 bands of 4 rows make pairs above ~50% estimated Jaccard likely candidates
+LSH_BANDS = 16
+LSH_ROWS = 4
+
+# Mersenne prime used by the universal hash family
+_PRIME = (1 << 61) - 1
+
+# Fixed seed so signatures computed in different processes (or stored on
+# disk) are comparable
+_rng = random.Random(20240601)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME))
+                 for _ in range(NUM_PERMUTATIONS)]
+
+
+def stable_hash(text):
+    """64-bit hash of a string that is the same in every process"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def normalize_lines(lines):
+    """Strip lines, collapse inner whitespace and drop empty lines"""
+    normalized = []
+    for line in lines:
+        line = ' '.join(line.split())
+        if line:
+            normalized.append(line)
+    return normalized
+
+
+def line_shingles(lines, size=SHINGLE_SIZE):
+    """
+    Hash every run of `size` consecutive non-empty lines
+
+    Args:
+        lines (list): Lines as returned by extract_text_from_file
+        size (int): Number of lines per shingle
+
+    Returns:
+        set: 64-bit shingle hashes (a document shorter than `size`
+            lines becomes a single shingle)
+    """
+    lines = normalize_lines(lines)
+    if not lines:
+        return set()
+    if len(lines) < size:
+        return {stable_hash('\n'.join(lines))}
+    return {stable_hash('\n'.join(lines[i:i + size])) for i in range(len(lines) - size + 1)}
+
+
+def word_shingles(lines, size=WORD_SHINGLE_SIZE):
+    """
+    Hash every run of `size` consecutive lowercase words
+
+    Unlike line shingles these ignore how the text is broken into lines, so
+    re-wrapped or re-flowed copies of a document still match.
+
+    Returns:
+        set: 64-bit shingle hashes
+    """
+    words = WORD_PATTERN.findall(' '.join(lines).lower())
+    if not words:
+        return set()
+    if len(words) < size:
+        return {stable_hash(' '.join(words))}
+    return {stable_hash(' '.join(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+
+# Shingle functions selectable by name
+SHINGLE_TYPES = {
+    'lines': line_shingles,
+    'words': word_shingles,
+}
+
+
+def overlap_scores(lines1, lines2, shingle_type='words'):
+    """
+    Set-based overlap of two documents' hashed shingles
+
+    Unlike the positional line average these ignore where text moved to:
+    containment of 1 in 2 answers how much of the first document survives
+    somewhere in the second.
+
+    Args:
+        lines1 (list): Lines of the first document
+        lines2 (list): Lines of the second document
+        shingle_type (str): 'lines' or 'words' (see SHINGLE_TYPES)
+
+    Returns:
+        dict: 'containment_1_in_2', 'containment_2_in_1' and 'jaccard'
+            percentages (100 for two documents without text)
+    """
+    shingles1 = SHINGLE_TYPES[shingle_type](lines1)
+    shingles2 = SHINGLE_TYPES[shingle_type](lines2)
+    shared = len(shingles1 & shingles2)
+    union = len(shingles1) + len(shingles2) - shared
+
+    def percentage(part, whole):
+        return round(part / whole * 100, 2) if whole else 100.0
+
+    return {
+        'containment_1_in_2': percentage(shared, len(shingles1)),
+        'containment_2_in_1': percentage(shared, len(shingles2)),
+        'jaccard': percentage(shared, union),
+    }
+
+
+def minhash_signature(shingles):
+    """
+    Compute the MinHash signature of a set of shingle hashes
+
+    Returns:
+        tuple: NUM_PERMUTATIONS minimum hash values, or None for an empty set
+    """
+    if not shingles:
+        return None
+    return tuple(min((a * x + b) % _PRIME for x in shingles) for a, b in _PERMUTATIONS)
+
+
+def estimate_jaccard(signature1, signature2):
+    """Estimate the Jaccard similarity of two shingle sets from their signatures"""
+    matches = sum(1 for h1, h2 in zip(signature1, signature2) if h1 == h2)
+    return matches / len(signature1)
+
+
+def file_signature(file_path, shingle_type='lines'):
+    """
+    Extract a file and return its MinHash signature
+
+    Designed to run in worker processes: returns None for unreadable or
+    empty files instead of raising.
+
+    Args:
+        file_path (str): Document to fingerprint
+        shingle_type (str): 'lines' or 'words' (see SHINGLE_TYPES)
+    """
+    try:
+        return minhash_signature(SHINGLE_TYPES[shingle_type](extract_text_from_file(file_path)))
+    except Exception:
+        return None
+
+
+class MinHashLSH:
+    """
+    Locality-sensitive hash index over MinHash signatures
+
+    Signatures are split into bands; two signatures become candidates when
+    any band is identical, so each query only looks at a few buckets
+    instead of every stored signature.
+    """
+
+    def __init__(self, bands=LSH_BANDS, rows=LSH_ROWS):
+        self.bands = bands
+        self.rows = rows
+        self.buckets = [{} for _ in range(bands)]
+
+    def _band_keys(self, signature):
+        for band in range(self.bands):
+            start = band * self.rows
+            yield band, signature[start:start + self.rows]
+
+    def insert(self, key, signature):
+        """Add a signature under a key"""
+        for band, band_key in self._band_keys(signature):
+            self.buckets[band].setdefault(band_key, []).append(key)
+
+    def query(self, signature):
+        """Return the keys that share at least one band with a signature"""
+        candidates = set()
+        for band, band_key in self._band_keys(signature):
+            candidates.update(self.buckets[band].get(band_key, ()))
+        return candidates
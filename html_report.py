@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher HTML Report Writer
+Streams comparison results to a standalone HTML file in a single pass
+Large reports are split into collapsible sections that the browser renders on demand
+"""
+
+import html
+from difflib import SequenceMatcher
+from pathlib import Path
+
+# Number of difference rows per collapsible section
+SECTION_SIZE = 500
+
+REPORT_STYLE = """
+body { font-family: Arial, sans-serif; background: #f0f0f0; color: #333; margin: 20px; }
+h1 { font-size: 20px; }
+.summary { background: #fff; border: 1px solid #ccc; padding: 10px 15px; margin-bottom: 15px; }
+.summary li { margin: 2px 0; }
+details { background: #fff; border: 1px solid #ccc; margin-bottom: 6px; }
+details > summary { cursor: pointer; padding: 6px 10px; font-weight: bold; }
+table { border-collapse: collapse; width: 100%; font-family: Consolas, monospace; font-size: 13px; }
+td { border-top: 1px solid #eee; padding: 3px 6px; vertical-align: top; }
+td.num, td.sim { white-space: nowrap; text-align: right; color: #666; }
+td.text div { white-space: pre-wrap; word-break: break-all; }
+tr.hunk td { background: #eef3f8; color: #557; }
+.old { color: #8a1f11; }
+.new { color: #1d6b1d; }
+del { background: #f8cbcb; text-decoration: none; }
+ins { background: #c8f0c8; text-decoration: none; }
+"""
+
+# Renders a section the first time it is expanded, so the browser only has to
+# lay out the rows the reader actually looks at
+REPORT_SCRIPT = """
+document.addEventListener('toggle', function (event) {
+  var section = event.target;
+  if (!section.open || section.dataset.rendered) { return; }
+  var source = section.querySelector('script[type="text/x-diff-section"]');
+  section.querySelector('tbody').innerHTML = source.textContent;
+  section.dataset.rendered = '1';
+}, true);
+"""
+
+
+def highlight_line_changes(line1, line2):
+    """
+    Mark the characters that differ between two lines
+
+    Args:
+        line1 (str): Line from the first file
+        line2 (str): Line from the second file
+
+    Returns:
+        tuple: (old_html, new_html) with changes wrapped in <del>/<ins>
+    """
+    old_parts = []
+    new_parts = []
+
+    for tag, i1, i2, j1, j2 in SequenceMatcher(None, line1, line2).get_opcodes():
+        old_text = html.escape(line1[i1:i2])
+        new_text = html.escape(line2[j1:j2])
+        if tag == 'equal':
+            old_parts.append(old_text)
+            new_parts.append(new_text)
+        else:
+            if old_text:
+                old_parts.append(f"<del>{old_text}</del>")
+            if new_text:
+                new_parts.append(f"<ins>{new_text}</ins>")
+
+    return ''.join(old_parts), ''.join(new_parts)
+
+
+def render_difference_row(diff):
+    """Render a single difference as a table row with intra-line highlighting"""
+    line1 = diff['line1']
+    line2 = diff['line2']
+    old_html, new_html = highlight_line_changes(line1, line2)
+
+    return (
+        f"<tr><td class=\"num\">{diff['line_num']}</td>"
+        f"<td class=\"sim\">{'≈ ' if diff.get('approximate') else ''}{diff['similarity']}%</td>"
+        f"<td class=\"text\">"
+        f"<div class=\"old\">- {old_html or '<em>(empty line)</em>'}</div>"
+        f"<div class=\"new\">+ {new_html or '<em>(empty line)</em>'}</div>"
+        f"</td></tr>\n"
+    )
+
+
+def get_assessment(similarity):
+    """Return the overall assessment text for a similarity percentage"""
+    if similarity >= 95:
+        return "✅ Files are nearly identical!"
+    elif similarity >= 80:
+        return "⚠️ Files are quite similar with some differences."
+    elif similarity >= 50:
+        return "🔶 Files have moderate similarity."
+    else:
+        return "❌ Files are significantly different."
+
+
+def _write_section(f, index, rows, count, first_line, last_line):
+    """Write one collapsible section; only the first one is rendered eagerly"""
+    title = f"Lines {first_line}–{last_line} ({count} differences)"
+    body = ''.join(rows)
+
+    if index == 0:
+        f.write(f"<details open data-rendered=\"1\"><summary>{title}</summary>\n"
+                f"<table><tbody>\n{body}</tbody></table></details>\n")
+    else:
+        # Rows are HTML-escaped, so the markup can never contain "</script"
+        f.write(f"<details><summary>{title}</summary>\n"
+                f"<table><tbody></tbody></table>\n"
+                f"<script type=\"text/x-diff-section\">\n{body}</script></details>\n")
+
+
+def write_html_report(output_path, file1, file2, similarity, differences,
+                      lines1_count, lines2_count, section_size=SECTION_SIZE):
+    """
+    Stream a comparison report to an HTML file
+
+    Differences are written section by section as they are consumed, so only
+    one section of rendered rows is held at a time. Pass a ComparisonResult to
+    keep the input compact as well: it builds each difference dict only when
+    its row is written, where a list of dicts holds all of them up front.
+
+    Args:
+        output_path (str): Path of the HTML file to write
+        file1 (str): Path to first file
+        file2 (str): Path to second file
+        similarity (float): Average similarity percentage
+        differences: Sized iterable of difference dicts
+            (line_num, line1, line2, similarity), e.g. a ComparisonResult
+        lines1_count (int): Number of lines in the first file
+        lines2_count (int): Number of lines in the second file
+        section_size (int): Number of difference rows per section
+
+    Returns:
+        str: Path of the written report
+    """
+    output_path = Path(output_path)
+    name1 = html.escape(Path(file1).name)
+    name2 = html.escape(Path(file2).name)
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write("<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">\n")
+        f.write(f"<title>DiffMatcher - {name1} vs {name2}</title>\n")
+        f.write(f"<style>{REPORT_STYLE}</style>\n")
+        f.write(f"<script>{REPORT_SCRIPT}</script>\n</head><body>\n")
+
+        f.write("<h1>🔍 File Comparison Results</h1>\n<div class=\"summary\"><ul>\n")
+        f.write(f"<li>📁 File 1: {name1} ({lines1_count} lines)</li>\n")
+        f.write(f"<li>📁 File 2: {name2} ({lines2_count} lines)</li>\n")
+        f.write(f"<li>📊 Average similarity: {similarity}%</li>\n")
+        f.write(f"<li>🛑 Differences found: {len(differences)}</li>\n")
+        f.write(f"</ul><p>{get_assessment(similarity)}</p></div>\n")
+
+        if not len(differences):
+            f.write("<p>✨ No differences found - files are identical!</p>\n")
+
+        section_index = 0
+        rows = []
+        count = 0
+        first_line = None
+        previous_line = None
+
+        for diff in differences:
+            line_num = diff['line_num']
+            if first_line is None:
+                first_line = line_num
+
+            # Start a new hunk whenever the differing lines are not consecutive
+            if previous_line is None or line_num != previous_line + 1:
+                rows.append(f"<tr class=\"hunk\"><td colspan=\"3\">@@ line {line_num} @@</td></tr>\n")
+            rows.append(render_difference_row(diff))
+            count += 1
+            previous_line = line_num
+
+            if count >= section_size:
+                _write_section(f, section_index, rows, count, first_line, line_num)
+                section_index += 1
+                rows = []
+                count = 0
+                first_line = None
+                previous_line = None
+
+        if rows:
+            _write_section(f, section_index, rows, count, first_line, previous_line)
+
+        f.write("</body></html>\n")
+
+    return str(output_path)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Line Index
+Persistent inverted index from line hashes to the library documents that
+contain them, used to find the stored documents closest to a new one
+Candidates are ranked by shared lines and only the best few are compared
+with the full line-by-line engine
+"""
+
+import os
+import sqlite3
+
+from diff_engine import DEFAULT_KERNEL, MAX_PAIR_COST, compare_lines, extract_text_from_file
+from fingerprints import normalize_lines, stable_hash
+from similarity_matrix import extract_documents
+
+# Candidates compared with the full engine per query
+DEFAULT_QUERY_CANDIDATES = 5
+
+# Lines found in more than this fraction of a library (headers, boilerplate)
+# are not used for ranking; their postings would dominate the query cost
+COMMON_LINE_FRACTION = 0.5
+
+# Libraries smaller than this use every line for ranking
+COMMON_LINE_MIN_DOCUMENTS = 20
+
+# Documents extracted and committed together when adding to the library
+INDEX_CHUNK_SIZE = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    lines INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    line_hash INTEGER NOT NULL,
+    document_id INTEGER NOT NULL REFERENCES documents(id)
+);
+CREATE TABLE IF NOT EXISTS line_counts (
+    line_hash INTEGER PRIMARY KEY,
+    documents INTEGER NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS postings_line ON postings(line_hash, document_id);
+CREATE INDEX IF NOT EXISTS postings_document ON postings(document_id);
+"""
+
+
+def line_hashes(lines):
+    """
+    Hash the distinct normalized lines of a document
+
+    Hashes are folded into SQLite's signed 64-bit integer range.
+
+    Returns:
+        set: Line hashes
+    """
+    hashes = set()
+    for line in normalize_lines(lines):
+        value = stable_hash(line)
+        hashes.add(value - (1 << 64) if value >= (1 << 63) else value)
+    return hashes
+
+
+class LineIndex:
+    """
+    SQLite-backed library of documents indexed by their line hashes
+
+    Adding a document stores one posting per distinct line. A query looks
+    up the postings of its own lines, counts the shared lines per library
+    document in SQL and compares only the top candidates line by line, so
+    its cost depends on the query document, not on the library size.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def _remove(self, document_id):
+        self.connection.execute(
+            "UPDATE line_counts SET documents = documents - 1 WHERE line_hash IN "
+            "(SELECT line_hash FROM postings WHERE document_id = ?)", (document_id,)
+        )
+        self.connection.execute("DELETE FROM line_counts WHERE documents <= 0")
+        self.connection.execute("DELETE FROM postings WHERE document_id = ?", (document_id,))
+        self.connection.execute("DELETE FROM documents WHERE id = ?", (document_id,))
+
+    def _insert(self, path, stat, lines):
+        hashes = line_hashes(lines)
+        cursor = self.connection.execute(
+            "INSERT INTO documents (path, size, mtime_ns, lines) VALUES (?, ?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns, len(lines))
+        )
+        document_id = cursor.lastrowid
+        self.connection.executemany(
+            "INSERT INTO postings (line_hash, document_id) VALUES (?, ?)",
+            ((value, document_id) for value in hashes)
+        )
+        self.connection.executemany(
+            "INSERT INTO line_counts (line_hash, documents) VALUES (?, 1) "
+            "ON CONFLICT(line_hash) DO UPDATE SET documents = documents + 1",
+            ((value,) for value in hashes)
+        )
+
+    def add_documents(self, paths, chunk_size=INDEX_CHUNK_SIZE):
+        """
+        Extract and index documents, skipping those already indexed unchanged
+
+        A document whose size or modification time changed is re-indexed.
+        Documents are extracted and committed chunk_size at a time, so memory
+        use is bounded by the chunk and an interrupted run keeps the chunks
+        already written.
+
+        Args:
+            paths (list): Document paths
+            chunk_size (int): Documents extracted and committed together
+
+        Returns:
+            tuple: (added, unchanged, errors) where errors maps paths to
+                error messages
+        """
+        pending = []
+        unchanged = 0
+        errors = {}
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                errors[path] = str(e)
+                continue
+            row = self.connection.execute(
+                "SELECT id, size, mtime_ns FROM documents WHERE path = ?", (path,)
+            ).fetchone()
+            if row is not None and (row[1], row[2]) == (stat.st_size, stat.st_mtime_ns):
+                unchanged += 1
+            else:
+                pending.append((path, stat, row[0] if row is not None else None))
+
+        added = 0
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            documents, extraction_errors = extract_documents([path for path, _, _ in chunk])
+            with self.connection:
+                for index, ((path, stat, document_id), lines) in enumerate(zip(chunk, documents)):
+                    if index in extraction_errors:
+                        errors[path] = extraction_errors[index]
+                        continue
+                    if document_id is not None:
+                        self._remove(document_id)
+                    self._insert(path, stat, lines)
+                    added += 1
+
+        return added, unchanged, errors
+
+    def candidates(self, lines, limit=DEFAULT_QUERY_CANDIDATES):
+        """
+        Rank library documents by the number of lines they share with a document
+
+        Args:
+            lines (list): Lines of the query document
+            limit (int): Number of candidates returned
+
+        Returns:
+            list: (path, shared_lines, line_count) tuples, most shared first
+        """
+        hashes = line_hashes(lines)
+        if not hashes:
+            return []
+
+        library_size = len(self)
+        max_documents = library_size
+        if library_size >= COMMON_LINE_MIN_DOCUMENTS:
+            max_documents = int(library_size * COMMON_LINE_FRACTION)
+
+        self.connection.execute("CREATE TEMP TABLE IF NOT EXISTS query_lines (line_hash INTEGER PRIMARY KEY)")
+        self.connection.execute("DELETE FROM query_lines")
+        self.connection.executemany("INSERT INTO query_lines (line_hash) VALUES (?)",
+                                    ((value,) for value in hashes))
+        rows = self.connection.execute(
+            "SELECT documents.path, COUNT(*) AS shared, documents.lines "
+            "FROM query_lines "
+            "JOIN line_counts ON line_counts.line_hash = query_lines.line_hash "
+            "JOIN postings ON postings.line_hash = query_lines.line_hash "
+            "JOIN documents ON documents.id = postings.document_id "
+            "WHERE line_counts.documents <= ? "
+            "GROUP BY postings.document_id ORDER BY shared DESC, documents.lines, documents.path "
+            "LIMIT ?",
+            (max_documents, limit)
+        ).fetchall()
+        self.connection.commit()
+        return rows
+
+    def query(self, file_path, limit=DEFAULT_QUERY_CANDIDATES, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST,
+              segment=False):
+        """
+        Find the library documents closest to a file
+
+        Args:
+            file_path (str): Query document
+            limit (int): Number of candidates compared with the full engine
+            kernel (str): Name of the line similarity kernel
+            max_cost (int): Cost cap per line pair (None for no cap)
+            segment (bool): Split long paragraphs into aligned sentences before scoring
+
+        Returns:
+            list: Records with path, shared_lines, similarity, differences
+                and error, best similarity first
+        """
+        lines = extract_text_from_file(file_path)
+        records = []
+        for path, shared, _ in self.candidates(lines, limit):
+            record = {'path': path, 'shared_lines': shared, 'similarity': None,
+                      'differences': None, 'error': None}
+            try:
+                record['similarity'], record['differences'] = compare_lines(lines, extract_text_from_file(path),
+                                                                            kernel, max_cost, segment)
+            except Exception as e:
+                record['error'] = str(e)
+            records.append(record)
+
+        records.sort(key=lambda record: (record['similarity'] is None, -(record['similarity'] or 0)))
+        return records
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Result Store
+Writes batch and directory comparison results to a local SQLite database
+so large runs can be queried afterwards without comparing files again
+"""
+
+import sqlite3
+from datetime import datetime
+
+# Pairs written per transaction
+STORE_BATCH_SIZE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    started TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    source TEXT NOT NULL,
+    compared INTEGER,
+    errors INTEGER,
+    differences INTEGER,
+    similarity REAL
+);
+CREATE TABLE IF NOT EXISTS pairs (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    path TEXT NOT NULL,
+    file1 TEXT NOT NULL,
+    file2 TEXT NOT NULL,
+    similarity REAL,
+    differences INTEGER,
+    lines1 INTEGER,
+    lines2 INTEGER,
+    identical INTEGER NOT NULL,
+    error TEXT,
+    containment_1_in_2 REAL,
+    containment_2_in_1 REAL,
+    jaccard REAL
+);
+CREATE TABLE IF NOT EXISTS differences (
+    pair_id INTEGER NOT NULL REFERENCES pairs(id),
+    line_num INTEGER NOT NULL,
+    line1 TEXT NOT NULL,
+    line2 TEXT NOT NULL,
+    similarity REAL NOT NULL,
+    approximate INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS pairs_run_path ON pairs(run_id, path);
+CREATE INDEX IF NOT EXISTS pairs_similarity ON pairs(similarity);
+CREATE INDEX IF NOT EXISTS differences_pair ON differences(pair_id, line_num);
+CREATE INDEX IF NOT EXISTS differences_similarity ON differences(similarity);
+"""
+
+# Columns added to the schema after its first release, as (version, table,
+# column definition); databases created earlier get them with ALTER TABLE
+MIGRATIONS = [
+    (1, 'pairs', 'containment_1_in_2 REAL'),
+    (1, 'pairs', 'containment_2_in_1 REAL'),
+    (1, 'pairs', 'jaccard REAL'),
+    (2, 'differences', 'approximate INTEGER NOT NULL DEFAULT 0'),
+]
+
+# Stored in PRAGMA user_version once a database has every column
+SCHEMA_VERSION = max(version for version, _, _ in MIGRATIONS)
+
+
+class ResultStore:
+    """
+    SQLite database of comparison runs, file pairs and differing lines
+
+    Records are buffered and inserted STORE_BATCH_SIZE pairs per
+    transaction, which keeps inserts fast without holding a whole run in
+    memory. Every run written to a database is kept; queries default to
+    the latest one. Databases written by older versions are upgraded in
+    place when opened (see MIGRATIONS).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SCHEMA)
+        self._migrate()
+        self.run_id = None
+        self._pending = []
+
+    def _migrate(self):
+        """Add the columns a database created by an older version is missing"""
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version >= SCHEMA_VERSION:
+            return
+        with self.connection:
+            for migration_version, table, column in MIGRATIONS:
+                if migration_version <= version:
+                    continue
+                # New databases already have the column from SCHEMA
+                existing = {row[1] for row in self.connection.execute(f"PRAGMA table_info({table})")}
+                if column.split()[0] not in existing:
+                    self.connection.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+            self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def start_run(self, mode, source):
+        """
+        Start recording a new run
+
+        Args:
+            mode (str): 'batch' or 'directory'
+            source (str): Manifest path or compared directories
+        """
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (started, mode, source) VALUES (?, ?, ?)",
+                (datetime.now().isoformat(timespec='seconds'), mode, source)
+            )
+        self.run_id = cursor.lastrowid
+        return self.run_id
+
+    def latest_run(self):
+        """Return the id of the most recent run, or None for an empty database"""
+        return self.connection.execute("SELECT MAX(id) FROM runs").fetchone()[0]
+
+    def add(self, record):
+        """
+        Queue a compare_file_pair record for insertion
+
+        The record's 'line_differences' (from collect_differences=True) are
+        moved out of the record and stored as its per-line differences;
+        records without them, such as identical pairs or pairs taken from a
+        journal, only get a pairs row.
+        """
+        line_differences = record.pop('line_differences', None)
+        self._pending.append((dict(record), line_differences))
+        if len(self._pending) >= STORE_BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        """Insert all queued records in a single transaction"""
+        if not self._pending:
+            return
+
+        with self.connection:
+            for record, line_differences in self._pending:
+                cursor = self.connection.execute(
+                    "INSERT INTO pairs (run_id, path, file1, file2, similarity, differences, "
+                    "lines1, lines2, identical, error, containment_1_in_2, containment_2_in_1, "
+                    "jaccard) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (self.run_id, record.get('path', f"{record['file1']} vs {record['file2']}"),
+                     record['file1'], record['file2'], record['similarity'], record['differences'],
+                     record['lines1'], record['lines2'], int(record['identical']), record['error'],
+                     record.get('containment_1_in_2'), record.get('containment_2_in_1'),
+                     record.get('jaccard'))
+                )
+                if line_differences:
+                    pair_id = cursor.lastrowid
+                    self.connection.executemany(
+                        "INSERT INTO differences (pair_id, line_num, line1, line2, similarity, approximate) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        ((pair_id,) + tuple(difference) for difference in line_differences)
+                    )
+        self._pending = []
+
+    def finish(self, summary):
+        """
+        Write the remaining records and the run's totals
+
+        Args:
+            summary (dict): compared, errors, differences and similarity
+        """
+        self.flush()
+        with self.connection:
+            self.connection.execute(
+                "UPDATE runs SET compared = ?, errors = ?, differences = ?, similarity = ? WHERE id = ?",
+                (summary['compared'], summary['errors'], summary['differences'],
+                 summary['similarity'], self.run_id)
+            )
+
+    def pairs_below(self, similarity, run_id=None):
+        """
+        Return the pairs of a run scoring below a similarity percentage
+
+        Returns:
+            list: (path, similarity, differences) tuples, least similar first
+        """
+        return self.connection.execute(
+            "SELECT path, similarity, differences FROM pairs "
+            "WHERE run_id = ? AND similarity < ? ORDER BY similarity, path",
+            (run_id or self.latest_run(), similarity)
+        ).fetchall()
+
+    def search_differences(self, text, run_id=None):
+        """
+        Return the differing lines of a run that contain a text in either file
+
+        Returns:
+            list: (path, line_num, line1, line2, similarity) tuples
+        """
+        pattern = '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return self.connection.execute(
+            "SELECT pairs.path, differences.line_num, differences.line1, differences.line2, "
+            "differences.similarity FROM differences JOIN pairs ON pairs.id = differences.pair_id "
+            "WHERE pairs.run_id = ? AND (differences.line1 LIKE ? ESCAPE '\\' "
+            "OR differences.line2 LIKE ? ESCAPE '\\') "
+            "ORDER BY pairs.path, differences.line_num",
+            (run_id or self.latest_run(), pattern, pattern)
+        ).fetchall()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
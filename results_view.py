@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Results Views
+Tkinter widgets that display comparison results without rendering them all
+"""
+
+import tkinter as tk
+from tkinter import ttk, font as tkfont
+from difflib import SequenceMatcher
+
+# Text lines used by each difference row (header, file 1, file 2, separator)
+ROW_LINES = 4
+
+# Longest part of a line that is shown; Tk slows down badly on huge lines
+MAX_DISPLAY_CHARS = 1000
+
+# Lines inserted into the side-by-side panes per event-loop turn
+LOAD_CHUNK_LINES = 2000
+
+
+def truncate_for_display(text):
+    """Shorten very long lines before inserting them into a Text widget"""
+    if len(text) > MAX_DISPLAY_CHARS:
+        return text[:MAX_DISPLAY_CHARS] + f" … ({len(text)} characters)"
+    return text
+
+
+class VirtualResultsView(ttk.Frame):
+    """
+    Scrollable list of differences that only renders the visible rows
+
+    The source is any sequence of difference dicts (for example a
+    ComparisonResult); rows are fetched from it as the view scrolls, so the
+    cost of a redraw depends on the window height, not on the result size.
+    """
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.source = None
+        self.top = 0
+
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        self.text = tk.Text(self, wrap=tk.NONE, height=20, font=("Consolas", 10),
+                            state=tk.DISABLED, cursor="arrow")
+        self.text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        self.text.tag_configure("header", font=("Consolas", 10, "bold"))
+        self.text.tag_configure("low", foreground="#b00020")
+        self.text.tag_configure("medium", foreground="#b36b00")
+        self.text.tag_configure("high", foreground="#2e7d32")
+
+        self.vbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.vbar.grid(row=0, column=1, sticky=(tk.N, tk.S))
+        hbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=self.text.xview)
+        hbar.grid(row=1, column=0, sticky=(tk.W, tk.E))
+        self.text.configure(xscrollcommand=hbar.set)
+
+        # Navigation bar
+        nav_frame = ttk.Frame(self)
+        nav_frame.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E), pady=(5, 0))
+
+        ttk.Button(nav_frame, text="◀ Prev page",
+                   command=lambda: self.scroll_pages(-1)).pack(side=tk.LEFT)
+        ttk.Button(nav_frame, text="Next page ▶",
+                   command=lambda: self.scroll_pages(1)).pack(side=tk.LEFT, padx=(5, 0))
+
+        self.position_var = tk.StringVar(value="No differences to show")
+        ttk.Label(nav_frame, textvariable=self.position_var).pack(side=tk.LEFT, padx=10)
+
+        self.jump_var = tk.StringVar()
+        ttk.Button(nav_frame, text="Go", command=self.jump_to_line).pack(side=tk.RIGHT)
+        jump_entry = ttk.Entry(nav_frame, textvariable=self.jump_var, width=10)
+        jump_entry.pack(side=tk.RIGHT, padx=5)
+        jump_entry.bind("<Return>", lambda event: self.jump_to_line())
+        ttk.Label(nav_frame, text="Go to line:").pack(side=tk.RIGHT)
+
+        self.line_height = tkfont.Font(font=self.text["font"]).metrics("linespace")
+
+        self.text.bind("<Configure>", lambda event: self.refresh())
+        self.text.bind("<MouseWheel>", self._on_mousewheel)
+        self.text.bind("<Button-4>", lambda event: self._scroll_by(-3))
+        self.text.bind("<Button-5>", lambda event: self._scroll_by(3))
+        self.text.bind("<Prior>", lambda event: self.scroll_pages(-1))
+        self.text.bind("<Next>", lambda event: self.scroll_pages(1))
+        self.text.bind("<Home>", lambda event: self.scroll_to(0))
+        self.text.bind("<End>", lambda event: self.scroll_to(self.row_count))
+
+    @property
+    def row_count(self):
+        return len(self.source) if self.source is not None else 0
+
+    @property
+    def rows_per_page(self):
+        """Number of difference rows that fit in the visible area"""
+        visible_lines = max(1, self.text.winfo_height() // self.line_height)
+        return max(1, visible_lines // ROW_LINES)
+
+    def set_source(self, source):
+        """Show a new sequence of differences, starting at the top"""
+        self.source = source
+        self.top = 0
+        self.refresh()
+
+    def clear(self):
+        """Remove all rows from the view"""
+        self.set_source(None)
+
+    def scroll_to(self, row):
+        """Make the given difference row the first visible one"""
+        last_top = max(0, self.row_count - self.rows_per_page)
+        self.top = min(max(0, int(row)), last_top)
+        self.refresh()
+        return "break"
+
+    def _scroll_by(self, rows):
+        return self.scroll_to(self.top + rows)
+
+    def scroll_pages(self, pages):
+        """Scroll by whole pages (negative values scroll up)"""
+        return self._scroll_by(pages * self.rows_per_page)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == tk.MOVETO:
+            self.scroll_to(float(amount) * self.row_count)
+        elif unit == tk.PAGES:
+            self.scroll_pages(int(amount))
+        else:
+            self._scroll_by(int(amount))
+
+    def _on_mousewheel(self, event):
+        return self._scroll_by(-3 if event.delta > 0 else 3)
+
+    def jump_to_line(self):
+        """Scroll to the first difference at or after the line number in the entry"""
+        try:
+            line_num = int(self.jump_var.get())
+        except ValueError:
+            self.bell()
+            return
+        self.show_line(line_num)
+
+    def show_line(self, line_num):
+        """Scroll to the first difference at or after a 1-based line number"""
+        if self.source is not None:
+            self.scroll_to(self.source.find_line(line_num))
+
+    def refresh(self):
+        """Render the rows currently in the viewport"""
+        total = self.row_count
+        page = self.rows_per_page
+        end = min(total, self.top + page + 1)
+
+        self.text.configure(state=tk.NORMAL)
+        self.text.delete("1.0", tk.END)
+
+        for position in range(self.top, end):
+            diff = self.source[position]
+            similarity = diff['similarity']
+            level = "high" if similarity >= 80 else "medium" if similarity >= 50 else "low"
+
+            approximate = " ≈ approximate" if diff.get('approximate') else ""
+            self.text.insert(tk.END, f"Line {diff['line_num']} (Similarity: {similarity}%{approximate}):\n",
+                             ("header", level))
+            self.text.insert(tk.END, f"  File 1: {truncate_for_display(diff['line1']) or '(empty line)'}\n")
+            self.text.insert(tk.END, f"  File 2: {truncate_for_display(diff['line2']) or '(empty line)'}\n\n")
+
+        self.text.configure(state=tk.DISABLED)
+
+        if total:
+            self.vbar.set(self.top / total, min(1.0, (self.top + page) / total))
+            self.position_var.set(
+                f"Differences {self.top + 1:,}–{min(total, self.top + page):,} of {total:,}"
+                f" (page {self.top // page + 1:,} of {(total - 1) // page + 1:,})"
+            )
+        else:
+            self.vbar.set(0.0, 1.0)
+            self.position_var.set("No differences to show")
+
+
+class SideBySideView(ttk.Frame):
+    """
+    Two synchronized panes showing both files line by line
+
+    Lines are inserted a chunk at a time from the event loop, so opening a
+    huge result does not freeze the window. Intra-line highlights are
+    computed only for lines that scroll into view; lines that were already
+    highlighted keep their tags, so each line is diffed at most once per result.
+    """
+
+    def __init__(self, parent, **kwargs):
+        super().__init__(parent, **kwargs)
+        self.result = None
+        self.loaded = False
+        self.loaded_count = 0
+        self._load_job = None
+        self.highlighted = set()
+        self._highlight_pending = False
+        self._pending_line = None
+
+        self.columnconfigure(0, weight=1)
+        self.columnconfigure(1, weight=1)
+        self.rowconfigure(1, weight=1)
+
+        ttk.Label(self, text="File 1").grid(row=0, column=0, sticky=tk.W)
+        ttk.Label(self, text="File 2").grid(row=0, column=1, sticky=tk.W)
+
+        self.left = self._create_pane(0)
+        self.right = self._create_pane(1)
+
+        self.vbar = ttk.Scrollbar(self, orient=tk.VERTICAL, command=self._on_scrollbar)
+        self.vbar.grid(row=1, column=2, sticky=(tk.N, tk.S))
+
+        self.left.configure(yscrollcommand=lambda first, last: self._on_pane_scroll(self.left, first, last))
+        self.right.configure(yscrollcommand=lambda first, last: self._on_pane_scroll(self.right, first, last))
+
+        self.bind("<Map>", lambda event: self._load())
+
+    def _create_pane(self, column):
+        pane = tk.Text(self, wrap=tk.NONE, font=("Consolas", 10), state=tk.DISABLED)
+        pane.grid(row=1, column=column, sticky=(tk.W, tk.E, tk.N, tk.S), padx=(0, 2))
+        hbar = ttk.Scrollbar(self, orient=tk.HORIZONTAL, command=pane.xview)
+        hbar.grid(row=2, column=column, sticky=(tk.W, tk.E))
+        pane.configure(xscrollcommand=hbar.set)
+
+        pane.tag_configure("changed", background="#fff6d5")
+        pane.tag_configure("removed", background="#f8cbcb")
+        pane.tag_configure("added", background="#c8f0c8")
+        return pane
+
+    def set_result(self, result):
+        """Show a ComparisonResult; the panes are filled the first time they are visible"""
+        if self._load_job is not None:
+            self.after_cancel(self._load_job)
+            self._load_job = None
+        self.result = result
+        self.loaded = False
+        self.loaded_count = 0
+        self.highlighted = set()
+        self._pending_line = None
+        if self.winfo_ismapped():
+            self._load()
+
+    def clear(self):
+        """Remove the current result from both panes"""
+        self.set_result(None)
+        self._fill_panes([], [])
+
+    def _load(self):
+        if self.loaded or self.result is None:
+            return
+        self.loaded = True
+        self._fill_panes([], [])
+        self._load_chunk()
+
+    def _load_chunk(self):
+        """Append the next chunk of lines to both panes and schedule the one after it"""
+        self._load_job = None
+        start = self.loaded_count
+        end = min(start + LOAD_CHUNK_LINES, len(self.result.similarities))
+
+        lines1 = []
+        lines2 = []
+        for index in range(start, end):
+            line1, line2 = self.result.get_line(index)
+            lines1.append(truncate_for_display(line1))
+            lines2.append(truncate_for_display(line2))
+
+        # Both panes always hold the same number of lines, so scroll
+        # fractions map to the same line in each of them
+        separator = '\n' if start else ''
+        for pane, lines in ((self.left, lines1), (self.right, lines2)):
+            pane.configure(state=tk.NORMAL)
+            pane.insert("end-1c", separator + '\n'.join(lines))
+            pane.configure(state=tk.DISABLED)
+        self.loaded_count = end
+        finished = end == len(self.result.similarities)
+
+        if self._pending_line is not None and (self._pending_line <= end or finished):
+            line_num, self._pending_line = self._pending_line, None
+            self.show_line(line_num)
+        self._schedule_highlight()
+
+        if not finished:
+            self._load_job = self.after(1, self._load_chunk)
+
+    def _fill_panes(self, lines1, lines2):
+        for pane, lines in ((self.left, lines1), (self.right, lines2)):
+            pane.configure(state=tk.NORMAL)
+            pane.delete("1.0", tk.END)
+            pane.insert("1.0", '\n'.join(lines))
+            pane.configure(state=tk.DISABLED)
+
+    def show_line(self, line_num):
+        """Scroll both panes so a 1-based line number is at the top"""
+        if not self.loaded or (self._load_job is not None and line_num > self.loaded_count):
+            # Applied once the line has been inserted, so hidden panes stay empty
+            self._pending_line = line_num
+            return
+        self.left.yview(f"{line_num}.0")
+        self.right.yview(f"{line_num}.0")
+
+    def _on_scrollbar(self, *args):
+        self.left.yview(*args)
+        self.right.yview(*args)
+
+    def _on_pane_scroll(self, pane, first, last):
+        self.vbar.set(first, last)
+        other = self.right if pane is self.left else self.left
+        if other.yview()[0] != float(first):
+            other.yview_moveto(first)
+        self._schedule_highlight()
+
+    def _schedule_highlight(self):
+        if not self._highlight_pending:
+            self._highlight_pending = True
+            self.after_idle(self._highlight_visible)
+
+    def _highlight_visible(self):
+        """Tag the character changes of differing lines in the viewport"""
+        self._highlight_pending = False
+        if self.result is None or not self.loaded:
+            return
+
+        first = int(self.left.index("@0,0").split('.')[0])
+        last = int(self.left.index(f"@0,{self.left.winfo_height()}").split('.')[0])
+        similarities = self.result.similarities
+
+        for line_num in range(first, min(last, self.loaded_count) + 1):
+            index = line_num - 1
+            if index in self.highlighted or similarities[index] >= 1.0:
+                continue
+            self.highlighted.add(index)
+
+            line1, line2 = self.result.get_line(index)
+            self._tag_line(line_num, line1, line2)
+
+    def _tag_line(self, line_num, line1, line2):
+        for pane in (self.left, self.right):
+            pane.tag_add("changed", f"{line_num}.0", f"{line_num}.end")
+
+        limit = MAX_DISPLAY_CHARS
+        for tag, i1, i2, j1, j2 in SequenceMatcher(None, line1, line2).get_opcodes():
+            if tag == 'equal':
+                continue
+            if i1 < i2 and i1 < limit:
+                self.left.tag_add("removed", f"{line_num}.{i1}", f"{line_num}.{min(i2, limit)}")
+            if j1 < j2 and j1 < limit:
+                self.right.tag_add("added", f"{line_num}.{j1}", f"{line_num}.{min(j2, limit)}")
+
+
+def downsample_similarities(similarities, bucket_count):
+    """
+    Average per-line similarities into at most bucket_count consecutive buckets
+
+    Args:
+        similarities: Sequence of similarity ratios (0-1), one per line
+        bucket_count (int): Maximum number of buckets
+
+    Returns:
+        list: Average ratio of each bucket
+    """
+    line_count = len(similarities)
+    bucket_count = min(bucket_count, line_count)
+
+    buckets = []
+    for bucket in range(bucket_count):
+        start = bucket * line_count // bucket_count
+        end = (bucket + 1) * line_count // bucket_count
+        buckets.append(sum(similarities[start:end]) / (end - start))
+    return buckets
+
+
+def similarity_color(ratio):
+    """Map a similarity ratio (0-1) to a red-yellow-green heat color"""
+    ratio = min(1.0, max(0.0, ratio))
+    if ratio < 0.5:
+        red, green = 230, int(60 + 340 * ratio)
+    else:
+        red, green = int(230 - 360 * (ratio - 0.5)), 230
+    return f"#{max(red, 50):02x}{min(green, 230):02x}40"
+
+
+class SimilarityMinimap(tk.Canvas):
+    """
+    Narrow heat strip of per-line similarity for the whole document
+
+    The similarity array is downsampled into one bucket per pixel row; the
+    buckets are kept until the result or the canvas height changes, so
+    redraws never touch the individual lines. Clicking calls on_jump with the
+    1-based line number under the cursor.
+    """
+
+    def __init__(self, parent, on_jump=None, width=18, **kwargs):
+        super().__init__(parent, width=width, highlightthickness=0,
+                         background="#e0e0e0", cursor="hand2", **kwargs)
+        self.on_jump = on_jump
+        self.result = None
+        self._buckets = None
+
+        self.bind("<Configure>", lambda event: self.redraw())
+        self.bind("<Button-1>", self._on_click)
+
+    def set_result(self, result):
+        """Show a ComparisonResult, or clear the strip with None"""
+        self.result = result
+        self._buckets = None
+        self.redraw()
+
+    def redraw(self):
+        self.delete("all")
+        height = self.winfo_height()
+        if self.result is None or not self.result.similarities or height <= 1:
+            return
+
+        if self._buckets is None or self._buckets[0] != height:
+            self._buckets = (height, downsample_similarities(self.result.similarities, height))
+        buckets = self._buckets[1]
+
+        width = self.winfo_width()
+        row_height = height / len(buckets)
+        for bucket, ratio in enumerate(buckets):
+            top = bucket * row_height
+            self.create_rectangle(0, top, width, top + row_height,
+                                  fill=similarity_color(ratio), outline="")
+
+    def _on_click(self, event):
+        if self.result is None or self.on_jump is None or not self.result.similarities:
+            return
+        line_count = len(self.result.similarities)
+        fraction = min(max(event.y / max(1, self.winfo_height()), 0.0), 1.0)
+        self.on_jump(min(line_count, int(fraction * line_count) + 1))
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Segmentation
+Splits long paragraphs into sentences or bounded-length chunks, aligns the
+segments of two paragraphs and aggregates their scores back into one
+paragraph similarity
+Keeps the cost of each scored unit small and shows which sentences changed
+"""
+
+import re
+from difflib import SequenceMatcher
+
+# Lines shorter than this are scored whole
+SEGMENT_MIN_LENGTH = 400
+
+# Longest segment; longer sentences are cut into chunks at word boundaries
+SEGMENT_MAX_LENGTH = 200
+
+SENTENCE_END = re.compile(r"(?<=[.!?;:])\s+")
+
+
+def split_segments(text, max_length=SEGMENT_MAX_LENGTH):
+    """
+    Split a paragraph into sentences of at most max_length characters
+
+    Sentences end at '.', '!', '?', ';' or ':' followed by whitespace.
+    Longer sentences are cut into chunks between words, and words longer
+    than max_length into pieces of max_length characters.
+
+    Returns:
+        list: Non-empty segments in order
+    """
+    segments = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        if len(sentence) <= max_length:
+            if sentence:
+                segments.append(sentence)
+            continue
+
+        chunk = ''
+        for word in sentence.split():
+            while len(word) > max_length:
+                if chunk:
+                    segments.append(chunk)
+                    chunk = ''
+                segments.append(word[:max_length])
+                word = word[max_length:]
+            if chunk and len(chunk) + 1 + len(word) > max_length:
+                segments.append(chunk)
+                chunk = word
+            else:
+                chunk = f"{chunk} {word}" if chunk else word
+        if chunk:
+            segments.append(chunk)
+    return segments
+
+
+def align_segments(segments1, segments2):
+    """
+    Align the segments of two paragraphs
+
+    Equal segments are matched as whole units (so a moved or inserted
+    sentence does not shift the rest); segments in a changed region are
+    paired in order, and the surplus of the longer side is paired with None.
+
+    Returns:
+        list: (segment1, segment2) tuples, None for a missing side
+    """
+    pairs = []
+    matcher = SequenceMatcher(None, segments1, segments2, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            pairs.extend(zip(segments1[i1:i2], segments2[j1:j2]))
+            continue
+        for offset in range(max(i2 - i1, j2 - j1)):
+            pairs.append((segments1[i1 + offset] if i1 + offset < i2 else None,
+                          segments2[j1 + offset] if j1 + offset < j2 else None))
+    return pairs
+
+
+def segmented_similarity(line1, line2, score, max_length=SEGMENT_MAX_LENGTH):
+    """
+    Score two paragraphs segment by segment
+
+    Each aligned segment pair is scored with `score` and weighted by the
+    length of both segments, the same weighting as the 2 * matches /
+    total_length ratios, so an edit in one sentence of a long paragraph
+    lowers the paragraph score in proportion to that sentence's size.
+    Unpaired segments score 0.
+
+    Args:
+        line1 (str): First paragraph
+        line2 (str): Second paragraph
+        score (callable): score(segment1, segment2) returning (similarity
+            in 0-1, approximate)
+        max_length (int): Longest segment
+
+    Returns:
+        tuple: (similarity, approximate, differences) where approximate is
+            True when any segment was scored approximately and differences
+            lists the (segment1, segment2, similarity) of the segments that
+            differ, None for a missing side
+    """
+    total_weight = 0
+    total_similarity = 0.0
+    approximate = False
+    differences = []
+
+    for segment1, segment2 in align_segments(split_segments(line1, max_length), split_segments(line2, max_length)):
+        weight = len(segment1 or '') + len(segment2 or '')
+        if segment1 is None or segment2 is None:
+            similarity = 0.0
+        else:
+            similarity, segment_approximate = score(segment1, segment2)
+            approximate = approximate or segment_approximate
+        total_weight += weight
+        total_similarity += similarity * weight
+        if similarity < 1.0:
+            differences.append((segment1, segment2, similarity))
+
+    if not total_weight:
+        return (1.0 if line1 == line2 else 0.0), approximate, differences
+    return total_similarity / total_weight, approximate, differences
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher SimHash - 64-bit document fingerprints
+Similar documents get fingerprints that differ in few bits, so two
+documents can be compared approximately by the Hamming distance of two
+integers; fingerprints can be saved next to the documents and reused
+"""
+
+import json
+import os
+from collections import Counter
+
+from batch_compare import score_file_pair
+from diff_engine import DEFAULT_KERNEL, MAX_PAIR_COST, extract_text_from_file
+from fingerprints import WORD_PATTERN, stable_hash
+
+SIMHASH_BITS = 64
+
+# Consecutive words per SimHash feature
+SIMHASH_SHINGLE_SIZE = 3
+
+# Longest run of lines fingerprinted as one block
+SIMHASH_BLOCK_LINES = 20
+
+# Fingerprints at most this many bits apart are near-identical, and at
+# least this many bits apart clearly different; anything in between is
+# borderline and goes to the exact engine
+SIMHASH_DUPLICATE_DISTANCE = 3
+SIMHASH_DIFFERENT_DISTANCE = 24
+
+# Documents with fewer features than this are too short for a reliable
+# fingerprint and are always compared exactly (which is cheap for them)
+SIMHASH_MIN_FEATURES = 32
+
+# Blocks at most this many bits apart count as matching
+BLOCK_MATCH_DISTANCE = 3
+
+# Block fingerprints are indexed by this many bands of bits; two
+# fingerprints at most BLOCK_MATCH_DISTANCE bits apart agree on at least
+# one whole band (pigeonhole), so only blocks sharing a band are compared
+BLOCK_BANDS = BLOCK_MATCH_DISTANCE + 1
+BLOCK_BAND_BITS = -(-SIMHASH_BITS // BLOCK_BANDS)
+
+# Suffix of the fingerprint file saved next to a document
+FINGERPRINT_SUFFIX = '.simhash'
+
+
+def simhash_features(lines, shingle_size=SIMHASH_SHINGLE_SIZE):
+    """Count every run of `shingle_size` lowercase words"""
+    words = WORD_PATTERN.findall(' '.join(lines).lower())
+    if len(words) <= shingle_size:
+        return Counter([' '.join(words)]) if words else Counter()
+    return Counter(' '.join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1))
+
+
+def simhash(features):
+    """
+    Compute the 64-bit SimHash of weighted features
+
+    Each bit of the fingerprint is set when the features whose hash has
+    that bit set outweigh the others.
+
+    Args:
+        features (Counter): Feature -> weight, e.g. from simhash_features
+
+    Returns:
+        int: Fingerprint (0 without features)
+    """
+    weighted = [(stable_hash(feature), weight) for feature, weight in features.items()]
+    total = sum(features.values())
+    fingerprint = 0
+    for bit in range(SIMHASH_BITS):
+        positive = sum(weight for value, weight in weighted if value >> bit & 1)
+        if 2 * positive > total:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def text_blocks(lines, max_lines=SIMHASH_BLOCK_LINES):
+    """
+    Split lines into paragraph blocks
+
+    Blocks are runs of non-empty lines separated by empty lines, cut after
+    `max_lines` lines so documents without blank lines still get several.
+    """
+    blocks = []
+    current = []
+    for line in lines:
+        if line.strip():
+            current.append(line)
+            if len(current) >= max_lines:
+                blocks.append(current)
+                current = []
+        elif current:
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def hamming_distance(fingerprint1, fingerprint2):
+    """Number of differing bits between two fingerprints"""
+    return bin(fingerprint1 ^ fingerprint2).count('1')
+
+
+def simhash_similarity(fingerprint1, fingerprint2):
+    """
+    Approximate similarity percentage of two fingerprints
+
+    Unrelated documents agree on about half the bits by chance, so the
+    share of agreeing bits is rescaled from 50-100% to 0-100%.
+    """
+    agreeing = SIMHASH_BITS - hamming_distance(fingerprint1, fingerprint2)
+    return round(max(0.0, 2 * agreeing / SIMHASH_BITS - 1) * 100, 2)
+
+
+def _block_bands(fingerprint):
+    mask = (1 << BLOCK_BAND_BITS) - 1
+    return [(band, fingerprint >> (band * BLOCK_BAND_BITS) & mask) for band in range(BLOCK_BANDS)]
+
+
+def block_similarity(blocks1, blocks2):
+    """
+    Percentage of blocks that have a near match in the other document
+
+    The blocks of the other document are indexed by exact fingerprint and
+    by BLOCK_BANDS bands of bits, so each block is only compared with the
+    few blocks sharing a band instead of with every block.
+
+    Args:
+        blocks1 (list): Block fingerprints of the first document
+        blocks2 (list): Block fingerprints of the second document
+    """
+    if not blocks1 and not blocks2:
+        return 100.0
+
+    def matched(blocks, others):
+        exact = set(others)
+        bands = {}
+        for other in exact:
+            for band in _block_bands(other):
+                bands.setdefault(band, []).append(other)
+
+        matches = {}
+        for block in blocks:
+            if block not in matches:
+                matches[block] = block in exact or any(
+                    hamming_distance(block, other) <= BLOCK_MATCH_DISTANCE
+                    for band in _block_bands(block) for other in bands.get(band, ())
+                )
+        return sum(1 for block in blocks if matches[block])
+
+    total = len(blocks1) + len(blocks2)
+    return round((matched(blocks1, blocks2) + matched(blocks2, blocks1)) / total * 100, 2)
+
+
+def fingerprint_lines(lines):
+    """
+    Fingerprint a document and each of its paragraph blocks
+
+    Returns:
+        dict: 'simhash' (int), 'features' (number of distinct features) and
+            'blocks' (list of int)
+    """
+    features = simhash_features(lines)
+    return {
+        'simhash': simhash(features),
+        'features': len(features),
+        'blocks': [simhash(simhash_features(block)) for block in text_blocks(lines)],
+    }
+
+
+def fingerprint_path(file_path):
+    """Return the path of the fingerprint file saved next to a document"""
+    return str(file_path) + FINGERPRINT_SUFFIX
+
+
+def load_fingerprint(file_path, save=False):
+    """
+    Return the fingerprint of a document, reusing its saved fingerprint file
+
+    A saved fingerprint is only used while the document keeps the size and
+    modification time it was computed for; otherwise the document is
+    extracted and fingerprinted again.
+
+    Args:
+        file_path (str): Document path
+        save (bool): Write a fresh fingerprint next to the document; a
+            document in a read-only location simply keeps none
+
+    Returns:
+        dict: Fingerprint as from fingerprint_lines
+    """
+    stat = os.stat(file_path)
+    try:
+        with open(fingerprint_path(file_path), 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+        if (saved['size'], saved['mtime_ns']) == (stat.st_size, stat.st_mtime_ns):
+            return {'simhash': int(saved['simhash'], 16), 'features': saved['features'],
+                    'blocks': [int(block, 16) for block in saved['blocks']]}
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    fingerprint = fingerprint_lines(extract_text_from_file(file_path))
+    if save:
+        try:
+            with open(fingerprint_path(file_path), 'w', encoding='utf-8') as f:
+                json.dump({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                           'simhash': f"{fingerprint['simhash']:016x}",
+                           'features': fingerprint['features'],
+                           'blocks': [f"{block:016x}" for block in fingerprint['blocks']]}, f)
+        except OSError:
+            pass
+    return fingerprint
+
+
+def approximate_compare(file1, file2, save=False, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Compare two files by fingerprint, using the exact engine only when borderline
+
+    Fingerprints at most SIMHASH_DUPLICATE_DISTANCE bits apart or at least
+    SIMHASH_DIFFERENT_DISTANCE bits apart settle the comparison on their
+    own; in between, and for documents too short to fingerprint reliably,
+    the files are compared line by line.
+
+    Args:
+        file1 (str): Path to first file
+        file2 (str): Path to second file
+        save (bool): Save fingerprints next to the documents for later runs
+        kernel (str): Line similarity kernel of the exact comparison
+        max_cost (int): Cost cap per line pair of the exact comparison
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+
+    Returns:
+        dict: compare_file_pair record with 'approximate', 'distance' and
+            'block_similarity' keys; approximate records have no line counts
+            or shingle overlap scores
+    """
+    record = {
+        'file1': str(file1),
+        'file2': str(file2),
+        'similarity': None,
+        'differences': None,
+        'lines1': None,
+        'lines2': None,
+        'identical': False,
+        'error': None,
+        'containment_1_in_2': None,
+        'containment_2_in_1': None,
+        'jaccard': None,
+        'approximate': True,
+        'distance': None,
+        'block_similarity': None,
+    }
+
+    try:
+        fingerprint1 = load_fingerprint(file1, save)
+        fingerprint2 = load_fingerprint(file2, save)
+    except Exception as e:
+        record['error'] = str(e)
+        return record
+
+    record['distance'] = hamming_distance(fingerprint1['simhash'], fingerprint2['simhash'])
+    record['block_similarity'] = block_similarity(fingerprint1['blocks'], fingerprint2['blocks'])
+
+    borderline = SIMHASH_DUPLICATE_DISTANCE < record['distance'] < SIMHASH_DIFFERENT_DISTANCE
+    too_short = min(fingerprint1['features'], fingerprint2['features']) < SIMHASH_MIN_FEATURES
+    if borderline or too_short:
+        record.update(score_file_pair(file1, file2, check_identical=True, kernel=kernel,
+                                      max_cost=max_cost, segment=segment), approximate=False)
+    else:
+        record['similarity'] = simhash_similarity(fingerprint1['simhash'], fingerprint2['simhash'])
+    return record
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Similarity Estimate
+Estimates the average line similarity of very large files from a
+stratified random sample of line positions, with a confidence interval
+The sample grows until the interval is as narrow as requested
+"""
+
+import math
+import random
+from statistics import NormalDist
+
+from diff_engine import DEFAULT_KERNEL, MAX_PAIR_COST, compare_lines, line_similarity
+
+# Target half-width of the confidence interval, in percentage points
+DEFAULT_PRECISION = 1.0
+
+DEFAULT_CONFIDENCE = 95.0
+
+# Contiguous regions sampled separately, so every part of the files is
+# represented and a region full of changes cannot be missed by chance
+STRATA = 20
+
+# Line positions scored per stratum in the first round; each further round
+# doubles the sample
+INITIAL_SAMPLES_PER_STRATUM = 20
+
+# Files whose sample would cover this fraction of the lines are scored exactly
+EXACT_FRACTION = 0.5
+
+# Pseudo-observations of similarity 0 and of similarity 1 added to every
+# stratum's variance (as in the Agresti-Coull interval), so a stratum whose
+# sample happens to miss a small cluster of changes does not report zero
+# variance and stop the sampling early
+PSEUDO_OBSERVATIONS = 1
+
+
+def _line_similarity(lines1, lines2, index, kernel, max_cost, segment):
+    line1 = lines1[index].strip() if index < len(lines1) else ''
+    line2 = lines2[index].strip() if index < len(lines2) else ''
+    similarity, _ = line_similarity(line1, line2, kernel, max_cost, segment)
+    return similarity
+
+
+def estimate_similarity(lines1, lines2, precision=DEFAULT_PRECISION, confidence=DEFAULT_CONFIDENCE,
+                        seed=None, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Estimate the average line similarity of two files
+
+    Line positions are split into STRATA equal regions and drawn at random
+    (with replacement) from every region in proportion to its size. The
+    stratified mean and its standard error give a normal confidence
+    interval; while it is wider than `precision`, the sample is doubled.
+    The variance of each stratum includes PSEUDO_OBSERVATIONS at 0 and at 1,
+    which keeps the interval honest when every sampled line matched.
+    Files small enough that the sample would cover most lines are scored
+    exactly instead.
+
+    Args:
+        lines1 (list): Lines of the first file
+        lines2 (list): Lines of the second file
+        precision (float): Target half-width of the interval in percentage points
+        confidence (float): Confidence level of the interval in percent
+        seed (int): Optional seed for a reproducible sample
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+
+    Returns:
+        dict: similarity, lower, upper and half_width (percentages),
+            samples, total_lines and exact
+    """
+    total = max(len(lines1), len(lines2))
+    strata = min(STRATA, total)
+
+    def exact_result():
+        similarity, _ = compare_lines(lines1, lines2, kernel, max_cost, segment)
+        return {'similarity': similarity, 'lower': similarity, 'upper': similarity, 'half_width': 0.0,
+                'samples': total, 'total_lines': total, 'exact': True}
+
+    if total == 0 or precision <= 0 or strata * INITIAL_SAMPLES_PER_STRATUM >= total * EXACT_FRACTION:
+        return exact_result()
+
+    rng = random.Random(seed)
+    z = NormalDist().inv_cdf((1 + confidence / 100) / 2)
+    bounds = [(total * stratum // strata, total * (stratum + 1) // strata) for stratum in range(strata)]
+    counts = [0] * strata
+    sums = [0.0] * strata
+    squares = [0.0] * strata
+    samples_per_stratum = INITIAL_SAMPLES_PER_STRATUM
+
+    while True:
+        for stratum, (start, end) in enumerate(bounds):
+            for _ in range(samples_per_stratum - counts[stratum]):
+                similarity = _line_similarity(lines1, lines2, rng.randrange(start, end), kernel, max_cost, segment)
+                counts[stratum] += 1
+                sums[stratum] += similarity
+                squares[stratum] += similarity * similarity
+
+        mean = 0.0
+        variance = 0.0
+        for stratum, (start, end) in enumerate(bounds):
+            weight = (end - start) / total
+            n = counts[stratum]
+            stratum_mean = sums[stratum] / n
+            padded = n + 2 * PSEUDO_OBSERVATIONS
+            padded_mean = (sums[stratum] + PSEUDO_OBSERVATIONS) / padded
+            padded_squares = squares[stratum] + PSEUDO_OBSERVATIONS
+            stratum_variance = max(0.0, (padded_squares - padded * padded_mean * padded_mean) / (padded - 1))
+            mean += weight * stratum_mean
+            variance += weight * weight * stratum_variance / n
+
+        half_width = z * math.sqrt(variance) * 100
+        samples = sum(counts)
+        if half_width <= precision:
+            break
+        samples_per_stratum *= 2
+        if samples_per_stratum * strata >= total * EXACT_FRACTION:
+            return exact_result()
+
+    similarity = mean * 100
+    return {
+        'similarity': round(similarity, 2),
+        'lower': round(max(0.0, similarity - half_width), 2),
+        'upper': round(min(100.0, similarity + half_width), 2),
+        'half_width': round(half_width, 2),
+        'samples': samples,
+        'total_lines': total,
+        'exact': False,
+    }
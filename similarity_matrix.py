@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Similarity Matrix
+Compares every pair of N documents with the line-by-line engine
+Each document is extracted once and only the upper triangle is scored,
+spread over a pool of worker processes
+"""
+
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import combinations
+from pathlib import Path
+
+from diff_engine import DEFAULT_KERNEL, MAX_PAIR_COST, compare_lines, extract_text_from_file
+
+# Pairs sent to a worker process per task
+MATRIX_CHUNK_SIZE = 64
+
+# Documents extracted concurrently
+EXTRACTION_THREADS = 8
+
+# Extracted documents, kernel and cost cap of the current worker process,
+# set by _init_worker
+_documents = None
+_kernel = DEFAULT_KERNEL
+_max_cost = MAX_PAIR_COST
+_segment = False
+
+
+def _extract(path):
+    try:
+        return extract_text_from_file(path), None
+    except Exception as e:
+        return None, str(e)
+
+
+def _init_worker(documents, kernel, max_cost, segment):
+    global _documents, _kernel, _max_cost, _segment
+    _documents = documents
+    _kernel = kernel
+    _max_cost = max_cost
+    _segment = segment
+
+
+def _score_pair(pair):
+    i, j = pair
+    similarity, _ = compare_lines(_documents[i], _documents[j], _kernel, _max_cost, _segment)
+    return i, j, similarity
+
+
+def extract_documents(paths):
+    """
+    Extract every document once
+
+    Returns:
+        tuple: (documents, errors) where documents holds the lines of each
+            path (None when it could not be read) and errors maps the index
+            of each unreadable path to its error message
+    """
+    with ThreadPoolExecutor(max_workers=EXTRACTION_THREADS) as executor:
+        results = list(executor.map(_extract, paths))
+
+    documents = [lines for lines, _ in results]
+    errors = {index: error for index, (_, error) in enumerate(results) if error is not None}
+    return documents, errors
+
+
+def compute_similarity_matrix(paths, workers=None, kernel=DEFAULT_KERNEL, max_cost=MAX_PAIR_COST, segment=False):
+    """
+    Compute the pairwise similarity matrix of a list of documents
+
+    The extracted documents are handed to each worker process once, when it
+    starts, so tasks only carry document indices. Similarity is symmetric,
+    so each unordered pair is scored once and mirrored.
+
+    Args:
+        paths (list): Document paths
+        workers (int): Number of worker processes (default: CPU count)
+        kernel (str): Name of the line similarity kernel
+        max_cost (int): Cost cap per line pair (None for no cap)
+        segment (bool): Split long paragraphs into aligned sentences before scoring
+
+    Returns:
+        tuple: (matrix, errors) where matrix is an N x N list of similarity
+            percentages (None for rows and columns of unreadable documents)
+            and errors maps document indices to error messages
+    """
+    documents, errors = extract_documents(paths)
+    count = len(paths)
+    matrix = [[None] * count for _ in range(count)]
+
+    for index in range(count):
+        if index not in errors:
+            matrix[index][index] = 100.0
+
+    pairs = [(i, j) for i, j in combinations(range(count), 2)
+             if i not in errors and j not in errors]
+    if not pairs:
+        return matrix, errors
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(documents, kernel, max_cost, segment)) as executor:
+        for i, j, similarity in executor.map(_score_pair, pairs, chunksize=MATRIX_CHUNK_SIZE):
+            matrix[i][j] = matrix[j][i] = similarity
+
+    return matrix, errors
+
+
+def write_matrix(output_path, names, matrix):
+    """
+    Write a similarity matrix as JSON (.json) or CSV (any other extension)
+
+    The CSV has a header row and a first column with the document names;
+    the JSON holds {"documents": [...], "matrix": [[...], ...]}.
+    """
+    output_path = Path(output_path)
+    names = [str(name) for name in names]
+
+    if output_path.suffix.lower() == '.json':
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump({'documents': names, 'matrix': matrix}, f, ensure_ascii=False)
+        return
+
+    with open(output_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['document'] + names)
+        for name, row in zip(names, matrix):
+            writer.writerow([name] + ['' if value is None else value for value in row])
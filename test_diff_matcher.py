@@ -5,8 +5,15 @@ Creates test files and runs basic functionality tests
 Includes Word document testing if python-docx is available
 """
 
+import json
 import os
+import queue
+import random
+import sqlite3
 import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sys
 
@@ -14,6 +21,26 @@ import sys
 sys.path.append(str(Path(__file__).parent))
 
 from cli_diff_matcher import compare_files_line_by_line, extract_text_from_file
+from batch_compare import ResultJournal, compare_batch, read_manifest
+from comparison_result import ComparisonResult
+from corpus_similarity import corpus_top_matches, shortlist_pairs
+import dedupe as dedupe_module
+from dedupe import find_duplicate_clusters
+from diff_engine import (BATCH_KERNELS, LINE_KERNELS, collect_line_differences, compare_lines,
+                         iter_line_similarities, lcs_length, lcs_ratio, levenshtein_distance, line_similarity,
+                         register_kernel, score_line_pairs, token_jaccard, word_overlap_ratio)
+from directory_compare import compare_directories, detect_renames, pair_directories
+from fingerprints import estimate_jaccard, line_shingles, minhash_signature, overlap_scores
+from html_report import write_html_report
+from line_index import LineIndex
+from result_store import SCHEMA_VERSION, ResultStore
+from segmentation import SEGMENT_MAX_LENGTH, align_segments, split_segments
+from vectorized_scoring import NUMPY_AVAILABLE, batch_lcs_ratios
+import simhash as simhash_module
+from simhash import approximate_compare, block_similarity, fingerprint_path, hamming_distance, simhash, simhash_features
+from similarity_estimate import estimate_similarity
+from similarity_matrix import compute_similarity_matrix, write_matrix
+from results_view import downsample_similarities
 
 # Check for Word document support
 try:
@@ -238,13 +265,870 @@ def test_mixed_file_types():
             pass
 
 
+def test_html_report():
+    """Test that HTML reports are split into lazily rendered sections"""
+    print("🧪 Testing HTML report...")
+    
+    temp_dir = Path(tempfile.mkdtemp())
+    report_path = temp_dir / "report.html"
+    
+    differences = [
+        {'line_num': i, 'line1': f"value <{i}>", 'line2': f"value <{i + 1}>", 'similarity': 80.0}
+        for i in range(1, 8)
+    ]
+    
+    write_html_report(str(report_path), "a.txt", "b.txt", 80.0, differences, 7, 7, section_size=3)
+    report = report_path.read_text(encoding='utf-8')
+    
+    # 7 differences in sections of 3: one eager section and two lazy ones
+    assert report.count("<details") == 3, "Expected three report sections"
+    assert report.count('<script type="text/x-diff-section">') == 2, "Expected two lazily rendered sections"
+    assert "&lt;" in report and "<del>" in report and "<ins>" in report, "Expected escaped, highlighted lines"
+    print("✅ HTML report test passed")
+    
+    # Cleanup
+    os.unlink(report_path)
+    os.rmdir(temp_dir)
+
+
+def test_comparison_result():
+    """Test that the columnar result behaves like a list of differences"""
+    print("🧪 Testing comparison result...")
+    
+    result = ComparisonResult(["same\n", "old\n", "same\n", "gone\n"], ["same\n", "new\n", "same\n"])
+    for similarity in (1.0, 0.5, 1.0, 0.0):
+        result.add_line(similarity)
+    
+    assert len(result) == 2, f"Expected 2 differences, got {len(result)}"
+    assert result.similarity == 62.5, f"Expected 62.5% similarity, got {result.similarity}%"
+    assert result[0] == {'line_num': 2, 'line1': 'old', 'line2': 'new', 'similarity': 50.0, 'approximate': False}
+    assert result[1]['line2'] == '', "Expected missing line to be empty"
+    assert result.find_line(3) == 1, "Expected line 3 to map to the second difference"
+    print("✅ Comparison result test passed")
+
+
+def test_result_filters():
+    """Test in-memory filtering and search of a comparison result"""
+    print("🧪 Testing result filters...")
+    
+    lines1 = ["alpha beta\n", "gamma  delta\n", "contract clause 1\n", "same\n"]
+    lines2 = ["alpha gamma\n", "gamma delta\n", "contract clause 2\n", "same\n"]
+    result = ComparisonResult(lines1, lines2)
+    for similarity in (0.6, 0.95, 0.9, 1.0):
+        result.add_line(similarity)
+    
+    below = result.filter(max_similarity=80)
+    assert [diff['line_num'] for diff in below] == [1], "Expected only line 1 below 80%"
+    
+    no_whitespace = result.filter(hide_whitespace=True)
+    assert [diff['line_num'] for diff in no_whitespace] == [1, 3], "Expected whitespace-only line 2 hidden"
+    
+    searched = result.filter(text="contr CLAUSE")
+    assert [diff['line_num'] for diff in searched] == [3], "Expected prefix search to find line 3"
+    assert searched.find_line(2) == 0, "Expected line 2 to map to the first filtered difference"
+    assert len(result.filter(text="missing")) == 0, "Expected no matches for unknown word"
+    print("✅ Result filters test passed")
+
+
+def test_similarity_downsampling():
+    """Test that per-line similarities are averaged into minimap buckets"""
+    print("🧪 Testing similarity downsampling...")
+    
+    buckets = downsample_similarities([1.0, 1.0, 0.0, 0.0, 0.5, 0.5], 3)
+    assert buckets == [1.0, 0.0, 0.5], f"Expected [1.0, 0.0, 0.5], got {buckets}"
+    
+    # Never more buckets than lines
+    assert downsample_similarities([0.25, 0.75], 100) == [0.25, 0.75]
+    print("✅ Similarity downsampling test passed")
+
+
+def test_minhash_signatures():
+    """Test that MinHash signatures estimate shingle overlap"""
+    print("🧪 Testing MinHash signatures...")
+    
+    lines = [f"Line {i} of the document\n" for i in range(200)]
+    edited = lines[:150] + [f"Rewritten line {i}\n" for i in range(50)]
+    
+    signature = minhash_signature(line_shingles(lines))
+    assert estimate_jaccard(signature, minhash_signature(line_shingles(lines))) == 1.0
+    
+    estimate = estimate_jaccard(signature, minhash_signature(line_shingles(edited)))
+    assert 0.4 < estimate < 0.9, f"Expected roughly 60% estimated overlap, got {estimate}"
+    assert minhash_signature(line_shingles(["\n", "   \n"])) is None, "Expected no signature for blank files"
+    print("✅ MinHash signatures test passed")
+
+
+def test_directory_comparison():
+    """Test pairing and comparing two directory trees"""
+    print("🧪 Testing directory comparison...")
+    
+    temp_dir = Path(tempfile.mkdtemp())
+    dir1 = temp_dir / "release1"
+    dir2 = temp_dir / "release2"
+    (dir1 / "docs").mkdir(parents=True)
+    (dir2 / "docs").mkdir(parents=True)
+    
+    (dir1 / "same.txt").write_text("Line 1\nLine 2\n", encoding='utf-8')
+    (dir2 / "same.txt").write_text("Line 1\nLine 2\n", encoding='utf-8')
+    (dir1 / "docs" / "changed.txt").write_text("Line 1\nLine 2\n", encoding='utf-8')
+    (dir2 / "docs" / "changed.txt").write_text("Line 1\nLine two\n", encoding='utf-8')
+    (dir1 / "removed.txt").write_text("old\n", encoding='utf-8')
+    (dir2 / "added.txt").write_text("new\n", encoding='utf-8')
+    
+    try:
+        pairs, only_in_dir1, only_in_dir2 = pair_directories(dir1, dir2)
+        assert [rel for rel, _, _ in pairs] == ["same.txt", "docs/changed.txt"], f"Unexpected pairs: {pairs}"
+        assert only_in_dir1 == ["removed.txt"] and only_in_dir2 == ["added.txt"]
+        
+        records = {record['path']: record for record in compare_directories(pairs, workers=2)}
+        assert records["same.txt"]['identical'], "Expected identical files to be skipped"
+        assert 0 < records["docs/changed.txt"]['similarity'] < 100, "Expected partial similarity"
+        print("✅ Directory comparison test passed")
+        
+        # A renamed file with a small edit should be matched by content
+        contract = "".join(f"Clause {i}: the parties agree to term {i}\n" for i in range(40))
+        (dir1 / "contract.txt").write_text(contract, encoding='utf-8')
+        (dir2 / "contract_final.txt").write_text(contract.replace("term 7", "term seven"), encoding='utf-8')
+        
+        renamed, still_only1, still_only2 = detect_renames(
+            dir1, dir2, ["contract.txt", "removed.txt"], ["added.txt", "contract_final.txt"], workers=2
+        )
+        assert [(r['renamed_from'], r['renamed_to']) for r in renamed] == [("contract.txt", "contract_final.txt")]
+        assert 0 < renamed[0]['containment_1_in_2'] < 100 and 0 < renamed[0]['jaccard'] < 100, \
+            f"Expected shingle overlap scores on the renamed pair, got {renamed[0]}"
+        assert still_only1 == ["removed.txt"] and still_only2 == ["added.txt"]
+        print("✅ Rename detection test passed")
+    
+    finally:
+        # Cleanup
+        for file in sorted(temp_dir.rglob("*"), reverse=True):
+            if file.is_dir():
+                os.rmdir(file)
+            else:
+                os.unlink(file)
+        os.rmdir(temp_dir)
+
+
+def test_batch_manifest():
+    """Test reading CSV and JSON Lines manifests and comparing their pairs"""
+    print("🧪 Testing batch manifest...")
+    
+    file1, file2, temp_dir = create_test_files()
+    csv_manifest = temp_dir / "pairs.csv"
+    jsonl_manifest = temp_dir / "pairs.jsonl"
+    
+    csv_manifest.write_text("file1,file2\ntest_file_1.txt,test_file_2.txt\n"
+                            "test_file_1.txt,test_file_1.txt\n", encoding='utf-8')
+    jsonl_manifest.write_text('{"file1": "test_file_1.txt", "file2": "test_file_2.txt"}\n',
+                              encoding='utf-8')
+    
+    try:
+        pairs = list(read_manifest(csv_manifest))
+        assert pairs == [(file1, file2), (file1, file1)], f"Unexpected CSV pairs: {pairs}"
+        assert list(read_manifest(jsonl_manifest)) == [(file1, file2)], "Unexpected JSONL pairs"
+        
+        records = sorted(compare_batch(pairs, workers=2), key=lambda record: record['index'])
+        assert 0 < records[0]['similarity'] < 100, "Expected partial similarity for first pair"
+        assert records[1]['identical'], "Expected identical pair to be skipped"
+        print("✅ Batch manifest test passed")
+    
+    finally:
+        # Cleanup
+        for file in temp_dir.glob("*"):
+            os.unlink(file)
+        os.rmdir(temp_dir)
+
+
+def test_journal_resume():
+    """Test that a resumed batch skips journaled pairs with unchanged inputs"""
+    print("🧪 Testing journal resume...")
+    
+    file1, file2, temp_dir = create_test_files()
+    file3 = temp_dir / "test_file_3.txt"
+    file3.write_text("Line 1: Identical\n", encoding='utf-8')
+    journal_path = temp_dir / "run.journal"
+    pairs = [(file1, file2), (file1, str(file3))]
+    
+    try:
+        with ResultJournal(journal_path) as journal:
+            first_run = list(compare_batch(pairs, workers=2, journal=journal))
+        assert not any(record.get('resumed') for record in first_run)
+        
+        # Change one input; only that pair should be compared again
+        file3.write_text("Line 1: Changed\n", encoding='utf-8')
+        os.utime(file3, ns=(0, 0))
+        
+        with ResultJournal(journal_path, resume=True) as journal:
+            second_run = {record['index']: record for record in compare_batch(pairs, workers=2, journal=journal)}
+        assert second_run[0].get('resumed'), "Expected unchanged pair to come from the journal"
+        assert not second_run[1].get('resumed'), "Expected changed pair to be compared again"
+        
+        # Scores from another metric are not reused
+        with ResultJournal(journal_path, resume=True) as journal:
+            third_run = list(compare_batch(pairs, workers=2, journal=journal, kernel='tokens'))
+        assert not any(record.get('resumed') for record in third_run), "Expected a new metric to rescore"
+        with ResultJournal(journal_path, resume=True) as journal:
+            fourth_run = list(compare_batch(pairs, workers=2, journal=journal, kernel='tokens'))
+        assert all(record.get('resumed') for record in fourth_run)
+        assert all('options' not in record for record in fourth_run)
+        
+        # A record cut off by a crash is compared again once, then resumed
+        lines = journal_path.read_text(encoding='utf-8').splitlines()
+        journal_path.write_text('\n'.join(lines[:-1]) + '\n' + lines[-1][:40], encoding='utf-8')
+        cut_index = 1 if Path(json.loads(lines[-1])['file2']).name == file3.name else 0
+        for expected in ([index != cut_index for index in range(2)], [True, True]):
+            with ResultJournal(journal_path, resume=True) as journal:
+                run = sorted(compare_batch(pairs, workers=2, journal=journal, kernel='tokens'),
+                             key=lambda record: record['index'])
+            assert [bool(record.get('resumed')) for record in run] == expected, \
+                f"Expected resumed flags {expected}, got {[record.get('resumed') for record in run]}"
+        print("✅ Journal resume test passed")
+    
+    finally:
+        # Cleanup
+        for file in temp_dir.glob("*"):
+            os.unlink(file)
+        os.rmdir(temp_dir)
+
+
+def test_result_store():
+    """Test storing batch results in SQLite and querying them afterwards"""
+    print("🧪 Testing result store...")
+    
+    file1, file2, temp_dir = create_test_files()
+    database = temp_dir / "results.sqlite"
+    
+    try:
+        with ResultStore(str(database)) as store:
+            store.start_run('batch', 'test')
+            for record in compare_batch([(file1, file2), (file1, file1)], workers=2,
+                                        collect_differences=True):
+                store.add(record)
+                assert 'line_differences' not in record, "Expected differences to move into the store"
+        
+        # Reopen the database as a later query would
+        with ResultStore(str(database)) as store:
+            below = store.pairs_below(90)
+            assert len(below) == 1, f"Expected one pair below 90%, got {below}"
+            assert below[0][2] == 3, f"Expected 3 differences, got {below[0][2]}"
+            
+            lines = store.search_differences("different")
+            assert [line[1] for line in lines] == [3], f"Expected line 3, got {lines}"
+            assert len(store.search_differences("Additional")) == 1
+            assert store.search_differences("100%") == []
+        
+        # Pairs resumed from a journal keep their differing lines in the store
+        journal_path = temp_dir / "run.journal"
+        for resume in (False, True):
+            with ResultJournal(journal_path, resume=resume) as journal, ResultStore(str(database)) as store:
+                store.start_run('batch', 'test')
+                records = list(compare_batch([(file1, file2)], workers=1, journal=journal,
+                                             collect_differences=True))
+                for record in records:
+                    store.add(record)
+                assert records[0].get('resumed', False) == resume
+                store.flush()
+                assert [line[1] for line in store.search_differences("different")] == [3]
+        with ResultJournal(journal_path, resume=True) as journal:
+            record, = compare_batch([(file1, file2)], workers=1, journal=journal)
+            assert record['resumed'] and 'line_differences' not in record
+        
+        # A database written before the overlap and approximate columns existed is upgraded
+        legacy = temp_dir / "legacy.sqlite"
+        connection = sqlite3.connect(legacy)
+        connection.executescript("""
+            CREATE TABLE runs (id INTEGER PRIMARY KEY, started TEXT NOT NULL, mode TEXT NOT NULL,
+                source TEXT NOT NULL, compared INTEGER, errors INTEGER, differences INTEGER, similarity REAL);
+            CREATE TABLE pairs (id INTEGER PRIMARY KEY, run_id INTEGER NOT NULL REFERENCES runs(id),
+                path TEXT NOT NULL, file1 TEXT NOT NULL, file2 TEXT NOT NULL, similarity REAL,
+                differences INTEGER, lines1 INTEGER, lines2 INTEGER, identical INTEGER NOT NULL, error TEXT);
+            CREATE TABLE differences (pair_id INTEGER NOT NULL REFERENCES pairs(id), line_num INTEGER NOT NULL,
+                line1 TEXT NOT NULL, line2 TEXT NOT NULL, similarity REAL NOT NULL);
+            INSERT INTO runs (started, mode, source) VALUES ('2024-01-01T00:00:00', 'batch', 'old');
+        """)
+        connection.close()
+        with ResultStore(str(legacy)) as store:
+            store.start_run('batch', 'test')
+            for record in compare_batch([(file1, file2)], workers=1, collect_differences=True):
+                store.add(record)
+        with ResultStore(str(legacy)) as store:
+            assert [line[1] for line in store.search_differences("different")] == [3]
+            assert store.connection.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+            assert store.connection.execute("SELECT COUNT(*) FROM runs").fetchone()[0] == 2
+            assert len(store.pairs_below(90)) == 1, "Expected the new run to be stored in the old database"
+        print("✅ Result store test passed")
+    
+    finally:
+        # Cleanup
+        for file in temp_dir.glob("*"):
+            os.unlink(file)
+        os.rmdir(temp_dir)
+
+
+def test_similarity_matrix():
+    """Test the pairwise similarity matrix of several documents"""
+    print("🧪 Testing similarity matrix...")
+    
+    file1, file2, temp_dir = create_test_files()
+    documents = [file1, file2, file1, str(temp_dir / "missing.txt")]
+    
+    try:
+        matrix, errors = compute_similarity_matrix(documents, workers=2)
+        single = compare_files_line_by_line(file1, file2, verbose=False)
+        
+        assert list(errors) == [3], f"Expected only the missing document to fail, got {errors}"
+        assert matrix[0][1] == matrix[1][0] == single, "Expected the engine's similarity, mirrored"
+        assert matrix[0][2] == 100.0 and matrix[1][1] == 100.0
+        assert matrix[3] == [None] * 4 and matrix[0][3] is None
+        
+        output = temp_dir / "matrix.csv"
+        write_matrix(output, documents, matrix)
+        rows = output.read_text(encoding='utf-8').splitlines()
+        assert len(rows) == 5, f"Expected a header and 4 rows, got {len(rows)}"
+        print("✅ Similarity matrix test passed")
+    
+    finally:
+        # Cleanup
+        for file in temp_dir.glob("*"):
+            os.unlink(file)
+        os.rmdir(temp_dir)
+
+
+def test_corpus_screening():
+    """Test that TF-IDF screening shortlists the near-duplicate documents"""
+    print("🧪 Testing corpus screening...")
+    
+    file1, file2, temp_dir = create_test_files()
+    other = temp_dir / "unrelated.txt"
+    other.write_text("Quarterly revenue grew everywhere\nExpenses were flat\n", encoding='utf-8')
+    documents = [file1, str(other), file2]
+    
+    try:
+        matches, errors = corpus_top_matches(documents, top_n=1)
+        assert not errors, f"Unexpected errors: {errors}"
+        assert matches[0][0][0] == 2, f"Expected file 2 as the best match of file 1, got {matches[0]}"
+        assert matches[2][0][0] == 0, f"Expected file 1 as the best match of file 2, got {matches[2]}"
+        assert matches[1] == [], f"Expected no match for the unrelated document, got {matches[1]}"
+        
+        shortlist = shortlist_pairs(matches)
+        assert [(i, j) for i, j, _ in shortlist] == [(0, 2)], f"Expected one shortlisted pair, got {shortlist}"
+        assert 50 < shortlist[0][2] < 100
+        print("✅ Corpus screening test passed")
+    
+    finally:
+        # Cleanup
+        for file in temp_dir.glob("*"):
+            os.unlink(file)
+        os.rmdir(temp_dir)
+
+
+def test_line_index():
+    """Test finding the closest library document through the line index"""
+    print("🧪 Testing line index...")
+    
+    file1, file2, temp_dir = create_test_files()
+    other = temp_dir / "unrelated.txt"
+    other.write_text("Quarterly revenue grew everywhere\nExpenses were flat\n", encoding='utf-8')
+    
+    try:
+        with LineIndex(str(temp_dir / "library.idx")) as index:
+            added, unchanged, errors = index.add_documents([file2, str(other)])
+            assert (added, unchanged, errors) == (2, 0, {})
+            assert index.add_documents([file2])[:2] == (0, 1), "Expected unchanged document to be skipped"
+            
+            records = index.query(file1)
+            assert len(records) == 1, f"Expected only file 2 as a candidate, got {records}"
+            assert records[0]['path'] == os.path.abspath(file2)
+            assert records[0]['shared_lines'] == 3, f"Expected 3 shared lines, got {records[0]['shared_lines']}"
+            assert records[0]['similarity'] == compare_files_line_by_line(file1, file2, verbose=False)
+            
+            # Re-indexing a changed document replaces its postings
+            Path(file2).write_text("Quarterly revenue grew everywhere\n", encoding='utf-8')
+            os.utime(file2, ns=(0, 0))
+            assert index.add_documents([file2])[0] == 1
+            assert index.query(file1) == [], "Expected no candidate after file 2 changed"
+            assert len(index) == 2
+            
+            # Small chunks index the same documents, one transaction each
+            assert index.add_documents([file1, file2, str(other)], chunk_size=1)[:2] == (1, 2)
+            assert [record['path'] for record in index.query(file1)] == [os.path.abspath(file1)]
+        print("✅ Line index test passed")
+    
+    finally:
+        # Cleanup
+        for file in temp_dir.glob("*"):
+            os.unlink(file)
+        os.rmdir(temp_dir)
+
+
+def test_dedupe_clusters():
+    """Test that near-duplicates are clustered and unrelated documents are not"""
+    print("🧪 Testing near-duplicate clusters...")
+    
+    temp_dir = Path(tempfile.mkdtemp())
+    lines = [f"Clause {i}: the supplier shall deliver item {i} on time\n" for i in range(40)]
+    documents = {
+        "original.txt": lines,
+        "copy.txt": lines,
+        "edited.txt": lines[:-1] + ["Clause 39: amended by the parties\n"],
+        "rewrapped.txt": [' '.join(line.strip() for line in lines[i:i + 2]) + '\n' for i in range(0, 40, 2)],
+        "unrelated.txt": [f"Invoice line {i}: {i * 3} units\n" for i in range(40)],
+        "empty.txt": [],
+    }
+    paths = []
+    for name, content in documents.items():
+        (temp_dir / name).write_text(''.join(content), encoding='utf-8')
+        paths.append(str(temp_dir / name))
+    
+    try:
+        clusters, skipped = find_duplicate_clusters(paths, threshold=80, workers=2)
+        assert skipped == [str(temp_dir / "empty.txt")], f"Expected the empty file to be skipped, got {skipped}"
+        assert len(clusters) == 1, f"Expected one cluster, got {clusters}"
+        names = sorted(Path(path).name for path, _ in clusters[0])
+        assert names == ["copy.txt", "edited.txt", "original.txt"], f"Unexpected cluster {names}"
+        
+        # Word shingles also match the re-wrapped copy
+        clusters, _ = find_duplicate_clusters(paths, threshold=80, workers=2, shingle_type='words')
+        names = sorted(Path(path).name for path, _ in clusters[0])
+        assert "rewrapped.txt" in names and "unrelated.txt" not in names, f"Unexpected cluster {names}"
+        
+        # Many exact copies are grouped without comparing every pair
+        for i in range(300):
+            (temp_dir / f"copy_{i}.txt").write_text(''.join(lines), encoding='utf-8')
+        copies = paths + [str(temp_dir / f"copy_{i}.txt") for i in range(300)]
+        calls = []
+        dedupe_module.estimate_jaccard = lambda a, b: calls.append(1) or estimate_jaccard(a, b)
+        try:
+            clusters, _ = find_duplicate_clusters(copies, threshold=80, workers=2)
+        finally:
+            dedupe_module.estimate_jaccard = estimate_jaccard
+        assert len(clusters[0]) == 303, f"Expected every copy in one cluster, got {len(clusters[0])}"
+        assert len(calls) < 2 * len(copies), f"Expected a linear number of comparisons, got {len(calls)}"
+        print("✅ Near-duplicate clusters test passed")
+    
+    finally:
+        # Cleanup
+        for file in temp_dir.glob("*"):
+            os.unlink(file)
+        os.rmdir(temp_dir)
+
+
+def test_simhash_fingerprints():
+    """Test SimHash distances and the approximate comparison mode"""
+    print("🧪 Testing SimHash fingerprints...")
+    
+    temp_dir = Path(tempfile.mkdtemp())
+    lines = [f"Clause {i}: the supplier shall deliver item {i} on time\n" for i in range(40)]
+    edited = lines[:-1] + ["Clause 39: amended by the parties\n"]
+    unrelated = [f"Invoice line {i}: {i * 3} units of product {i % 7}\n" for i in range(40)]
+    
+    base = simhash(simhash_features(lines))
+    assert base == simhash(simhash_features(list(lines))), "Expected a deterministic fingerprint"
+    assert hamming_distance(base, simhash(simhash_features(edited))) <= 3, "Expected a small edit to flip few bits"
+    assert hamming_distance(base, simhash(simhash_features(unrelated))) >= 16, "Expected unrelated text to differ"
+    
+    paths = {}
+    for name, content in (("original.txt", lines), ("edited.txt", edited), ("unrelated.txt", unrelated)):
+        paths[name] = str(temp_dir / name)
+        Path(paths[name]).write_text(''.join(content), encoding='utf-8')
+    
+    try:
+        record = approximate_compare(paths["original.txt"], paths["edited.txt"], save=True)
+        assert record['approximate'] and record['similarity'] >= 90, f"Unexpected record {record}"
+        assert Path(fingerprint_path(paths["original.txt"])).exists(), "Expected a saved fingerprint"
+        
+        record = approximate_compare(paths["original.txt"], paths["unrelated.txt"])
+        assert record['similarity'] < 50, f"Unexpected record {record}"
+        
+        # Documents too short to fingerprint fall back to the exact engine
+        paths["short.txt"] = str(temp_dir / "short.txt")
+        Path(paths["short.txt"]).write_text(lines[0], encoding='utf-8')
+        record = approximate_compare(paths["short.txt"], paths["edited.txt"])
+        assert not record['approximate'] and record['containment_1_in_2'] == 100.0, f"Unexpected record {record}"
+        
+        # Block matching uses the band index instead of comparing every pair
+        rng = random.Random(5)
+        blocks1 = [rng.getrandbits(64) for _ in range(3000)]
+        blocks2 = [block ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for block in blocks1[:1000]]
+        blocks2 += [block ^ (0b1111 << rng.randrange(60)) for block in blocks1[1000:2000]]
+        blocks2 += [rng.getrandbits(64) for _ in range(1000)]
+        calls = []
+        counted = lambda a, b: calls.append(1) or hamming_distance(a, b)
+        simhash_module.hamming_distance = counted
+        try:
+            similarity = block_similarity(blocks1, blocks2)
+        finally:
+            simhash_module.hamming_distance = hamming_distance
+        assert similarity == round(2000 / 6000 * 100, 2), f"Expected only the 2-bit edits to match, got {similarity}"
+        assert len(calls) < 20000, f"Expected few candidate comparisons, got {len(calls)}"
+        print("✅ SimHash fingerprints test passed")
+    
+    finally:
+        # Cleanup
+        for file in temp_dir.glob("*"):
+            os.unlink(file)
+        os.rmdir(temp_dir)
+
+
+def test_overlap_scores():
+    """Test containment and Jaccard overlap of hashed shingles"""
+    print("🧪 Testing overlap scores...")
+    
+    lines = [f"Clause {i}: the supplier shall deliver item {i} on time\n" for i in range(40)]
+    
+    # The first half survives unchanged, but moved to the end of the new document
+    new_document = [f"New clause {i}: payment is due within {i} days\n" for i in range(40)] + lines[:20]
+    overlap = overlap_scores(lines[:20], new_document)
+    assert overlap['containment_1_in_2'] == 100.0, f"Expected full containment, got {overlap}"
+    assert overlap['containment_2_in_1'] < 50, f"Expected partial reverse containment, got {overlap}"
+    assert overlap['jaccard'] == overlap['containment_2_in_1'], "Expected Jaccard of a subset to equal its share"
+    assert overlap_scores([], []) == {'containment_1_in_2': 100.0, 'containment_2_in_1': 100.0, 'jaccard': 100.0}
+    
+    file1, file2, temp_dir = create_test_files()
+    try:
+        record, = compare_batch([(file1, file2)], workers=1)
+        assert 0 < record['jaccard'] < 100, f"Expected overlap scores in batch records, got {record}"
+        print("✅ Overlap scores test passed")
+    
+    finally:
+        # Cleanup
+        for file in temp_dir.glob("*"):
+            os.unlink(file)
+        os.rmdir(temp_dir)
+
+
+def test_similarity_estimate():
+    """Test the sampled similarity estimate against the exact score"""
+    print("🧪 Testing similarity estimate...")
+    
+    lines1 = [f"Record {i}: status active, owner team {i % 13}\n" for i in range(20000)]
+    lines2 = [line if i % 5 else f"Record {i}: status closed\n" for i, line in enumerate(lines1)]
+    exact, _ = compare_lines(lines1, lines2)
+    
+    estimate = estimate_similarity(lines1, lines2, precision=1.0, seed=7)
+    assert not estimate['exact'], "Expected a sampled estimate for a large file"
+    assert estimate['samples'] < len(lines1) / 2, f"Expected a small sample, got {estimate['samples']}"
+    assert estimate['half_width'] <= 1.0, f"Expected the target precision, got {estimate}"
+    assert estimate['lower'] - 1 <= exact <= estimate['upper'] + 1, f"Exact {exact} far outside {estimate}"
+    
+    # One cluster of changes that most samples miss must not give a
+    # zero-width interval that excludes the exact score
+    lines2 = [f"Changed {i}\n" if 10000 <= i < 10100 else line for i, line in enumerate(lines1)]
+    exact, _ = compare_lines(lines1, lines2)
+    estimates = [estimate_similarity(lines1, lines2, seed=seed) for seed in range(40)]
+    assert all(estimate['half_width'] > 0 for estimate in estimates), "Expected no zero-width interval"
+    covered = sum(1 for estimate in estimates if estimate['lower'] <= exact <= estimate['upper'])
+    assert covered >= 36, f"Expected about 95% coverage, got {covered}/40"
+    
+    small = estimate_similarity(lines1[:50], lines2[:50])
+    assert small['exact'] and small['samples'] == 50, f"Expected small files to be scored exactly, got {small}"
+    print("✅ Similarity estimate test passed")
+
+
+def test_lcs_kernel():
+    """Test the bit-parallel LCS kernel against a dynamic programming reference"""
+    print("🧪 Testing LCS kernel...")
+    
+    def reference_lcs(text1, text2):
+        row = [0] * (len(text2) + 1)
+        for char in text1:
+            previous = 0
+            for j, other in enumerate(text2):
+                current = row[j + 1]
+                row[j + 1] = previous + 1 if char == other else max(row[j + 1], row[j])
+                previous = current
+        return row[-1]
+    
+    rng = random.Random(3)
+    for _ in range(200):
+        text1 = ''.join(rng.choice('abcd ') for _ in range(rng.randrange(0, 90)))
+        text2 = ''.join(rng.choice('abcd ') for _ in range(rng.randrange(0, 90)))
+        assert lcs_length(text1, text2) == reference_lcs(text1, text2), f"LCS mismatch for {text1!r}, {text2!r}"
+    
+    # A long paragraph with one edited word stays near-identical
+    paragraph = ' '.join(f"clause {i} applies to the parties" for i in range(60))
+    edited = paragraph.replace("clause 30 ", "section 30 ")
+    assert lcs_ratio(paragraph, edited) > 0.99, f"Expected a near-identical LCS ratio, got {lcs_ratio(paragraph, edited)}"
+    assert lcs_ratio("same", "same") == 1.0 and lcs_ratio("", "abc") == 0.0
+    
+    similarity, differences = compare_lines([paragraph, "Line two"], [edited, "Line two"], kernel='lcs')
+    assert similarity > 99 and differences == 1, f"Expected one near-identical difference, got {similarity}, {differences}"
+    print("✅ LCS kernel test passed")
+
+
+def test_batch_scoring():
+    """Test that vectorized LCS scoring matches the scalar kernel exactly"""
+    if not NUMPY_AVAILABLE:
+        print("🧪 Skipping batch scoring test - NumPy not available")
+        return True
+    
+    print("🧪 Testing batch scoring...")
+    
+    rng = random.Random(5)
+    lines1 = []
+    lines2 = []
+    for _ in range(600):
+        line = ''.join(rng.choice('abc é✓') for _ in range(rng.randrange(0, 140)))
+        edited = list(line)
+        for _ in range(rng.randrange(0, 6)):
+            if edited:
+                edited[rng.randrange(len(edited))] = rng.choice('xyz')
+        lines1.append(line)
+        lines2.append(''.join(edited)[:rng.randrange(0, 140)])
+    
+    expected = [lcs_ratio(line1, line2) for line1, line2 in zip(lines1, lines2)]
+    assert batch_lcs_ratios(lines1, lines2) == expected, "Batch ratios differ from lcs_ratio"
+    
+    # Large files go through the batched path automatically (lines are stripped there)
+    expected = [lcs_ratio(line1.strip(), line2.strip()) for line1, line2 in zip(lines1, lines2)]
+    scored = [similarity for _, _, _, similarity, _ in iter_line_similarities(lines1, lines2, kernel='lcs')]
+    assert scored == expected, "Batched line similarities differ from the scalar kernel"
+    print("✅ Batch scoring test passed")
+
+
+def test_kernel_registry():
+    """Test the built-in metrics, custom registration and the batch API"""
+    print("🧪 Testing metric registry...")
+    
+    def reference_levenshtein(text1, text2):
+        row = list(range(len(text2) + 1))
+        for i, char in enumerate(text1, 1):
+            previous, row[0] = row[0], i
+            for j, other in enumerate(text2, 1):
+                previous, row[j] = row[j], min(row[j] + 1, row[j - 1] + 1, previous + (char != other))
+        return row[-1]
+    
+    rng = random.Random(11)
+    for _ in range(200):
+        text1 = ''.join(rng.choice('abc ') for _ in range(rng.randrange(0, 90)))
+        text2 = ''.join(rng.choice('abc ') for _ in range(rng.randrange(0, 90)))
+        assert levenshtein_distance(text1, text2) == reference_levenshtein(text1, text2), \
+            f"Edit distance mismatch for {text1!r}, {text2!r}"
+    
+    assert token_jaccard("The cat sat", "sat, the dog") == 0.5
+    for kernel in LINE_KERNELS:
+        assert compare_lines(["Same line"], ["Same line"], kernel) == (100.0, 0), f"{kernel} failed on equal lines"
+    
+    calls = []
+    
+    def batch_length_ratio(lines1, lines2):
+        calls.append(len(lines1))
+        return [min(len(a), len(b)) / max(len(a), len(b), 1) for a, b in zip(lines1, lines2)]
+    
+    register_kernel('length', lambda a, b: min(len(a), len(b)) / max(len(a), len(b), 1), batch_length_ratio)
+    try:
+        lines1 = [f"line {i}" for i in range(600)]
+        lines2 = [f"line {i}!" if i % 2 else f"line {i}" for i in range(600)]
+        stats = {}
+        similarities, approximate = score_line_pairs(lines1, lines2, 'length', stats=stats)
+        assert approximate == [], f"Expected no approximate pairs, got {approximate}"
+        assert calls == [300], f"Expected one batch of the 300 differing pairs, got {calls}"
+        assert stats == {'batched': True}, f"Expected the batch to be reported, got {stats}"
+        score_line_pairs(lines1[:10], lines2[:10], 'length', stats=stats)
+        assert stats == {'batched': False}, "Expected a small input to be scored pair by pair"
+        assert similarities[0] == 1.0 and similarities[1] == len("line 1") / len("line 1!")
+        
+        try:
+            register_kernel('length', len)
+            assert False, "Expected duplicate metric names to be rejected"
+        except ValueError:
+            pass
+    finally:
+        LINE_KERNELS.pop('length', None)
+        BATCH_KERNELS.pop('length', None)
+    print("✅ Metric registry test passed")
+
+
+def test_cost_caps():
+    """Test that line pairs over the cost cap are approximated and flagged"""
+    print("🧪 Testing cost caps...")
+    
+    paragraph = ' '.join(f"cell {i} value {i * 7}" for i in range(100))
+    edited = paragraph.replace("cell 50 value", "cell 50 total")
+    lines1 = ["Title", paragraph, "Short line"]
+    lines2 = ["Title", edited, "Short lines"]
+    
+    similarity, differences = collect_line_differences(lines1, lines2, max_cost=10_000)
+    flags = {line_num: approximate for line_num, _, _, _, approximate in differences}
+    assert flags == {2: True, 3: False}, f"Expected only the paragraph to be approximated, got {flags}"
+    assert differences[0][3] > 99, f"Expected a near-identical approximation, got {differences[0][3]}"
+    
+    _, differences = collect_line_differences(lines1, lines2, max_cost=None)
+    assert not any(difference[4] for difference in differences), "Expected exact scores without a cap"
+    
+    # The batch API reports the same pairs
+    similarities, approximate = score_line_pairs(lines1, lines2, 'lcs', max_cost=10_000)
+    assert approximate == [1], f"Expected pair 1 to be approximated, got {approximate}"
+    assert similarities[1] == word_overlap_ratio(paragraph, edited)
+    assert word_overlap_ratio(paragraph, paragraph) == 1.0
+    print("✅ Cost caps test passed")
+
+
+def test_segmentation():
+    """Test that long paragraphs are split, aligned and scored by sentence"""
+    print("🧪 Testing paragraph segmentation...")
+    
+    sentences = [f"Clause {i} binds the supplier to deliver batch {i} within {i + 10} days." for i in range(20)]
+    sentences.append("x" * (SEGMENT_MAX_LENGTH * 2 + 5))
+    segments = split_segments(' '.join(sentences))
+    assert all(0 < len(segment) <= SEGMENT_MAX_LENGTH for segment in segments), "Expected bounded segments"
+    assert segments[:20] == sentences[:20], "Expected one segment per short sentence"
+    assert ''.join(segments[20:]) == sentences[20], "Expected the long word cut into pieces"
+    
+    # An inserted sentence does not shift the alignment of the others
+    pairs = align_segments(sentences[:5], sentences[:2] + ["A new clause."] + sentences[2:5])
+    assert pairs.count((None, "A new clause.")) == 1, f"Expected the insertion unpaired, got {pairs}"
+    assert sum(1 for segment1, segment2 in pairs if segment1 == segment2) == 5
+    
+    paragraph = ' '.join(sentences[:20])
+    edited = paragraph.replace("batch 7 within 17 days", "batch 7 within 30 days")
+    differences = []
+    similarity, approximate = line_similarity(paragraph, edited, segment=True, sentence_differences=differences)
+    assert not approximate
+    assert len(differences) == 1 and differences[0][0] == sentences[7], \
+        f"Expected one changed sentence, got {differences}"
+    assert similarity > 0.99, f"Expected a near-identical paragraph, got {similarity}"
+    
+    # Short lines are scored whole; segmented scores are flagged like any other
+    lines1 = [paragraph, "Short line"]
+    lines2 = [edited, "Short lines"]
+    sentences = {}
+    segmented, _ = score_line_pairs(lines1, lines2, segment=True, sentence_differences=sentences)
+    whole, _ = score_line_pairs(lines1, lines2)
+    assert segmented[0] == similarity and segmented[1] == whole[1]
+    assert sentences == {0: differences}, f"Expected the changed sentences of pair 0, got {sentences}"
+    sentences = {}
+    for _ in iter_line_similarities(lines1 * 200, lines2 * 200, 'lcs', segment=True, sentence_differences=sentences):
+        pass
+    assert sorted(sentences) == list(range(0, 400, 2)), "Expected the changed sentences of every paragraph"
+    _, differences = collect_line_differences(lines1, lines2, segment=True)
+    assert [difference[0] for difference in differences] == [1, 2]
+    print("✅ Segmentation test passed")
+
+
+def create_gui_stub():
+    """Create a DiffMatcher whose engine works without a Tk root window"""
+    import diff_matcher
+    
+    gui = diff_matcher.DiffMatcher.__new__(diff_matcher.DiffMatcher)
+    gui.root = None
+    gui.worker_queue = queue.Queue()
+    gui.cancel_event = threading.Event()
+    gui.prefetch_executor = ThreadPoolExecutor(max_workers=2)
+    gui.extraction_cache = OrderedDict()
+    gui.extraction_lock = threading.Lock()
+    return gui
+
+
+def test_gui_worker():
+    """Test the GUI comparison worker's progress reports and cancellation"""
+    print("🧪 Testing GUI comparison worker...")
+    
+    from diff_matcher import PROGRESS_STEPS, ComparisonCancelled
+    
+    temp_dir = Path(tempfile.mkdtemp())
+    file1 = temp_dir / "many_1.txt"
+    file2 = temp_dir / "many_2.txt"
+    file1.write_text(''.join(f"Line {i}\n" for i in range(1000)), encoding='utf-8')
+    file2.write_text(''.join(f"Line {i if i % 10 else 'x'}\n" for i in range(1000)), encoding='utf-8')
+    gui = create_gui_stub()
+    
+    try:
+        progress = []
+        similarity, result, lines1, lines2 = gui.compare_files_line_by_line(
+            str(file1), str(file2), progress_callback=lambda done, total: progress.append((done, total))
+        )
+        done = [step for step, _ in progress]
+        assert len(progress) > PROGRESS_STEPS / 2, f"Expected one report per step, got {len(progress)}"
+        assert done == sorted(done), "Expected monotonic progress"
+        assert progress[-1] == (1000, 1000), f"Expected progress to reach the total, got {progress[-1]}"
+        assert (lines1, lines2, len(result)) == (1000, 1000, 100)
+        
+        # Cancelling mid-way stops the engine
+        def cancel_after_first_step(done, total):
+            if done:
+                gui.cancel_event.set()
+        gui.cancel_event.clear()
+        try:
+            gui.compare_files_line_by_line(str(file1), str(file2), progress_callback=cancel_after_first_step,
+                                           cancel_event=gui.cancel_event)
+            raise AssertionError("Expected ComparisonCancelled")
+        except ComparisonCancelled:
+            pass
+        
+        # The worker body reports through the queue
+        gui.cancel_event.clear()
+        gui._run_comparison(str(file1), str(file2))
+        messages = []
+        while not gui.worker_queue.empty():
+            messages.append(gui.worker_queue.get_nowait())
+        assert messages[0][0] == 'progress' and messages[-1][0] == 'done'
+        assert messages[-1][3][0] == similarity
+        
+        gui.cancel_event.set()
+        gui._run_comparison(str(file1), str(file2))
+        assert gui.worker_queue.get_nowait() == ('cancelled',)
+        print("✅ GUI comparison worker test passed")
+    
+    finally:
+        gui.prefetch_executor.shutdown()
+        for file in temp_dir.glob("*"):
+            os.unlink(file)
+        os.rmdir(temp_dir)
+
+
+def test_gui_extraction_cache():
+    """Test the GUI's cache of prefetched extractions"""
+    print("🧪 Testing GUI extraction cache...")
+    
+    from diff_matcher import EXTRACTION_CACHE_SIZE
+    
+    temp_dir = Path(tempfile.mkdtemp())
+    files = [temp_dir / f"cached_{i}.txt" for i in range(EXTRACTION_CACHE_SIZE + 1)]
+    for i, file in enumerate(files):
+        file.write_text(f"File {i}\n", encoding='utf-8')
+    gui = create_gui_stub()
+    extracted = []
+    extract = gui.extract_text_from_file
+    gui.extract_text_from_file = lambda path: extracted.append(Path(path).name) or extract(path)
+    
+    try:
+        # A second request reuses the prefetched extraction
+        gui.prefetch_file(str(files[0]))
+        assert gui.get_file_lines(str(files[0])) == ["File 0\n"]
+        assert gui.get_file_lines(str(files[0])) == ["File 0\n"]
+        assert extracted == ["cached_0.txt"], f"Expected one extraction, got {extracted}"
+        
+        # Past EXTRACTION_CACHE_SIZE files the least recently used one is evicted
+        for file in files[1:]:
+            gui.get_file_lines(str(file))
+        assert len(gui.extraction_cache) == EXTRACTION_CACHE_SIZE
+        gui.get_file_lines(str(files[0]))
+        assert extracted.count("cached_0.txt") == 2, "Expected the evicted file to be extracted again"
+        gui.get_file_lines(str(files[-1]))
+        assert extracted.count(files[-1].name) == 1, "Expected a recent file to stay cached"
+        
+        # A modified file is extracted again
+        files[0].write_text("File 0 edited\n", encoding='utf-8')
+        os.utime(files[0], ns=(0, 0))
+        assert gui.get_file_lines(str(files[0])) == ["File 0 edited\n"]
+        assert extracted.count("cached_0.txt") == 3
+        print("✅ GUI extraction cache test passed")
+    
+    finally:
+        gui.prefetch_executor.shutdown()
+        for file in temp_dir.glob("*"):
+            os.unlink(file)
+        os.rmdir(temp_dir)
+
+
 def run_all_tests():
     """Run all tests"""
     print("🚀 Running DiffMatcher Tests (including Word document support)")
     print("=" * 60)
     
     tests_passed = 0
-    total_tests = 6  # Updated total
+    total_tests = 29  # Updated total
     
     try:
         test_identical_files()
@@ -282,6 +1166,144 @@ def run_all_tests():
     except Exception as e:
         print(f"❌ Mixed file types test failed: {e}")
     
+    try:
+        test_html_report()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ HTML report test failed: {e}")
+    
+    try:
+        test_comparison_result()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Comparison result test failed: {e}")
+    
+    try:
+        test_result_filters()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Result filters test failed: {e}")
+    
+    try:
+        test_similarity_downsampling()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Similarity downsampling test failed: {e}")
+    
+    try:
+        test_minhash_signatures()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ MinHash signatures test failed: {e}")
+    
+    try:
+        test_directory_comparison()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Directory comparison test failed: {e}")
+    
+    try:
+        test_batch_manifest()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Batch manifest test failed: {e}")
+    
+    try:
+        test_journal_resume()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Journal resume test failed: {e}")
+    
+    try:
+        test_result_store()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Result store test failed: {e}")
+    
+    try:
+        test_similarity_matrix()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Similarity matrix test failed: {e}")
+    
+    try:
+        test_corpus_screening()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Corpus screening test failed: {e}")
+    
+    try:
+        test_line_index()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Line index test failed: {e}")
+    
+    try:
+        test_dedupe_clusters()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Near-duplicate clusters test failed: {e}")
+    
+    try:
+        test_simhash_fingerprints()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ SimHash fingerprints test failed: {e}")
+    
+    try:
+        test_overlap_scores()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Overlap scores test failed: {e}")
+    
+    try:
+        test_similarity_estimate()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Similarity estimate test failed: {e}")
+    
+    try:
+        test_lcs_kernel()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ LCS kernel test failed: {e}")
+    
+    try:
+        test_batch_scoring()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Batch scoring test failed: {e}")
+    
+    try:
+        test_kernel_registry()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Metric registry test failed: {e}")
+    
+    try:
+        test_cost_caps()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Cost caps test failed: {e}")
+    
+    try:
+        test_segmentation()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ Segmentation test failed: {e}")
+    
+    try:
+        test_gui_worker()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ GUI comparison worker test failed: {e}")
+    
+    try:
+        test_gui_extraction_cache()
+        tests_passed += 1
+    except Exception as e:
+        print(f"❌ GUI extraction cache test failed: {e}")
+    
     print("\n" + "=" * 60)
     print(f"📊 Test Results: {tests_passed}/{total_tests} tests passed")
     
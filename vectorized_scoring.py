@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+DiffMatcher Vectorized Scoring
+Scores many short line pairs at once with NumPy instead of one pair per
+Python call: the pairs are packed into padded code-point arrays and the
+bit-parallel LCS recurrence runs over the whole batch in each step
+"""
+
+# NumPy is optional; without it every pair is scored by the scalar kernel
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Lines longer than this are left to the scalar kernel; longer lines need
+# more words per bit vector and gain little from batching
+BATCH_LINE_LENGTH = 128
+
+# Fewer short pairs than this are not worth packing into arrays
+BATCH_MIN_PAIRS = 256
+
+# Pairs scored together in one vectorized pass
+BATCH_PAIRS = 4096
+
+# Upper bound on the number of entries of one batch's match mask table
+BATCH_TABLE_ELEMENTS = 1 << 23
+
+WORD_BITS = 64
+
+
+def _code_points(texts):
+    return np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+
+
+def _encode(texts, width, alphabet, pad):
+    """Pack strings into a padded array of alphabet indices"""
+    lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+    codes = np.full((len(texts), max(width, 1)), pad, dtype=np.int64)
+    if lengths.sum():
+        codes[np.arange(codes.shape[1]) < lengths[:, None]] = alphabet[_code_points(texts)]
+    return codes, lengths
+
+
+def _popcount(values):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(values).sum(axis=1).astype(np.int64)
+    bits = np.unpackbits(values.view(np.uint8).reshape(len(values), -1), axis=1)
+    return bits.sum(axis=1).astype(np.int64)
+
+
+def _batch_lcs_lengths(shorter, longer, alphabet, pad):
+    """
+    LCS lengths of aligned lists of strings, each shorter[i] <= longer[i]
+
+    `alphabet` maps code points to table columns 0 to pad - 1; column pad
+    stands for the padding after the end of a string.
+
+    The match masks of every pair are kept in a (pairs, alphabet, words)
+    table: bit j of a character's mask is set where shorter[i] has that
+    character at position j. Each character position of the longer strings
+    then updates the DP rows of all pairs with a few array operations,
+    propagating the addition carry from word to word.
+    """
+    count = len(shorter)
+    short_width = max(len(text) for text in shorter)
+    long_width = max(len(text) for text in longer)
+    words = max(1, -(-short_width // WORD_BITS))
+
+    short_codes, short_lengths = _encode(shorter, short_width, alphabet, pad)
+    long_codes, _ = _encode(longer, long_width, alphabet, pad)
+
+    rows = np.arange(count)
+    table = np.zeros((count, pad + 1, words), dtype=np.uint64)
+    for position in range(short_width):
+        table[rows, short_codes[:, position], position // WORD_BITS] |= np.uint64(1 << position % WORD_BITS)
+    table[:, pad, :] = 0
+
+    # Bits of every word that fall inside the shorter string
+    full = np.zeros((count, words), dtype=np.uint64)
+    for word in range(words):
+        bits = np.clip(short_lengths - word * WORD_BITS, 0, WORD_BITS)
+        partial = (np.uint64(1) << np.minimum(bits, WORD_BITS - 1).astype(np.uint64)) - np.uint64(1)
+        full[:, word] = np.where(bits == WORD_BITS, np.uint64((1 << WORD_BITS) - 1), partial)
+
+    row = full.copy()
+    for position in range(long_width):
+        matches = row & table[rows, long_codes[:, position]]
+        carry = np.zeros(count, dtype=np.uint64)
+        for word in range(words):
+            current = row[:, word]
+            match = matches[:, word]
+            total = current + match
+            with_carry = total + carry
+            carry = ((total < current) | (with_carry < total)).astype(np.uint64)
+            # match is a subset of current, so current - match never borrows
+            row[:, word] = (with_carry | (current ^ match)) & full[:, word]
+
+    return short_lengths - _popcount(row)
+
+
+def batch_lcs_ratios(lines1, lines2):
+    """
+    LCS similarity ratios of many line pairs in vectorized passes
+
+    Gives exactly the values of diff_engine.lcs_ratio. Pairs are sorted by
+    length so each batch only runs as many steps as its longest line, and
+    batches are sized to keep the match mask table below
+    BATCH_TABLE_ELEMENTS entries.
+
+    Args:
+        lines1 (list): First line of each pair
+        lines2 (list): Second line of each pair, same length as lines1
+
+    Returns:
+        list: Similarity per pair (0-1)
+    """
+    count = len(lines1)
+    if not count:
+        return []
+
+    shorter = [line1 if len(line1) <= len(line2) else line2 for line1, line2 in zip(lines1, lines2)]
+    longer = [line2 if len(line1) <= len(line2) else line1 for line1, line2 in zip(lines1, lines2)]
+    # Number the characters that occur, so the mask table has one column per
+    # character of the input rather than per Unicode code point
+    present = np.bincount(_code_points(lines1 + lines2)) > 0
+    alphabet = np.cumsum(present) - 1
+    pad = int(present.sum())
+
+    order = sorted(range(count), key=lambda index: len(longer[index]))
+    words = max(1, -(-max(len(text) for text in shorter) // WORD_BITS))
+    batch_size = max(1, min(BATCH_PAIRS, BATCH_TABLE_ELEMENTS // ((pad + 1) * words)))
+
+    lengths = np.zeros(count, dtype=np.int64)
+    for start in range(0, count, batch_size):
+        batch = order[start:start + batch_size]
+        lengths[batch] = _batch_lcs_lengths([shorter[index] for index in batch],
+                                            [longer[index] for index in batch], alphabet, pad)
+
+    totals = np.fromiter((len(line1) + len(line2) for line1, line2 in zip(lines1, lines2)),
+                         dtype=np.int64, count=count)
+    ratios = np.divide(2 * lengths, totals, out=np.ones(count), where=totals > 0)
+    return ratios.tolist()